@@ -65,8 +65,16 @@ String lastStatusText = "";
 String lastElevatorStatus = "";
 String lastElevatorDirection = "";
 
+// 序列埠設定（需與 Python 端 status_protocol.BAUD_RATE 相同）
+#define SERIAL_BAUD 115200
+#define SERIAL_BUFFER_SIZE 64
+
+// 逐字元接收的指令緩衝區（避免 String 的動態配置）
+char serialBuffer[SERIAL_BUFFER_SIZE];
+int serialLength = 0;
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(SERIAL_BAUD);
   Serial.println("ELEVATOR_SYSTEM_READY");
   
   // 初始化隨機數種子
@@ -210,58 +218,127 @@ void handleButtons() {
 }
 
 void handleSerialCommunication() {
-  if (Serial.available() > 0) {
-    String command = Serial.readStringUntil('\n');
-    command.trim();
-    
-    // 解析來自 Python 的指令
-    if (command.startsWith("STATUS:")) {
-      // 處理狀態更新指令
-      Serial.print("RECEIVED: ");
-      Serial.println(command);
-      
-      // 解析狀態指令
-      if (command.indexOf("STATUS:FULL") != -1) {
-        // Python 要求進入自動緊急模式
-        elevatorStatus = "FULL";
-        Serial.println("AUTO EMERGENCY MODE ACTIVATED BY PYTHON");
-      } else if (command.indexOf("STATUS:EMERGENCY") != -1) {
-        // Python 要求進入手動緊急模式
-        elevatorStatus = "EMERGENCY";
-        Serial.println("MANUAL EMERGENCY MODE ACTIVATED BY PYTHON");
-      } else if (command.indexOf("STATUS:NORMAL") != -1) {
-        // Python 要求解除緊急模式
-        elevatorStatus = "NORMAL";
-        Serial.println("NORMAL MODE ACTIVATED BY PYTHON");
-      }
+  // 一次讀完目前收到的所有字元，遇到換行就處理一行指令
+  while (Serial.available() > 0) {
+    char c = Serial.read();
+    if (c == '\r') {
+      continue;
     }
-    
-    // 解析樓層和方向資訊
-    if (command.indexOf("FLOOR:") != -1) {
-      int floorStart = command.indexOf("FLOOR:") + 6;
-      int floorEnd = command.indexOf(";", floorStart);
-      if (floorEnd != -1) {
-        String floorStr = command.substring(floorStart, floorEnd);
-        currentFloor = floorStr.toInt();
+    if (c != '\n') {
+      if (serialLength < SERIAL_BUFFER_SIZE - 1) {
+        serialBuffer[serialLength++] = c;
       }
+      continue;
     }
-    
-    if (command.indexOf("DIR:") != -1) {
-      int dirStart = command.indexOf("DIR:") + 4;
-      int dirEnd = command.indexOf(";", dirStart);
-      if (dirEnd != -1) {
-        elevatorDirection = command.substring(dirStart, dirEnd);
-      }
+    serialBuffer[serialLength] = '\0';
+    if (serialBuffer[0] == '@') {
+      handleCompactFrame(serialBuffer, serialLength);
+    } else if (strncmp(serialBuffer, "STATUS:", 7) == 0) {
+      handleLegacyCommand(String(serialBuffer));
     }
-    
-    // 解析目標樓層
-    if (command.indexOf("TARGET:") != -1) {
-      int targetStart = command.indexOf("TARGET:") + 7;
-      int targetEnd = command.indexOf(";", targetStart);
-      if (targetEnd != -1) {
-        String targetStr = command.substring(targetStart, targetEnd);
-        targetFloor = targetStr.toInt();
-      }
+    serialLength = 0;
+  }
+}
+
+int hexValue(char c) {
+  if (c >= '0' && c <= '9') return c - '0';
+  if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+  return -1;
+}
+
+int hexByte(const char *p) {
+  int high = hexValue(p[0]);
+  int low = hexValue(p[1]);
+  if (high < 0 || low < 0) return -1;
+  return high * 16 + low;
+}
+
+// 精簡狀態訊框（第 1 版）：@1 S D FF TT * CC
+// S：N/E/F（NORMAL/EMERGENCY/FULL），D：U/D/I，FF/TT：十六進位樓層，CC：@ 與 * 之間的 XOR
+void handleCompactFrame(const char *frame, int length) {
+  if (length != 11 || frame[1] != '1' || frame[8] != '*') {
+    Serial.println("NAK");
+    return;
+  }
+  uint8_t sum = 0;
+  for (int i = 1; i < 8; i++) {
+    sum ^= (uint8_t)frame[i];
+  }
+  int expected = hexByte(frame + 9);
+  int floorValue = hexByte(frame + 4);
+  int targetValue = hexByte(frame + 6);
+  if (expected != sum || floorValue < 0 || targetValue < 0) {
+    Serial.println("NAK");
+    return;
+  }
+
+  switch (frame[2]) {
+    case 'F': elevatorStatus = "FULL"; break;
+    case 'E': elevatorStatus = "EMERGENCY"; break;
+    default: elevatorStatus = "NORMAL"; break;
+  }
+  switch (frame[3]) {
+    case 'U': elevatorDirection = "UP"; break;
+    case 'D': elevatorDirection = "DOWN"; break;
+    default: elevatorDirection = "IDLE"; break;
+  }
+  currentFloor = floorValue;
+  targetFloor = targetValue;
+
+  Serial.print("ACK:");
+  Serial.print(frame[9]);
+  Serial.println(frame[10]);
+
+  // 狀態改變時立即重繪，不等下一次定時更新
+  updateTFTDisplay();
+}
+
+// 舊版文字指令：STATUS:...;FLOOR:...;DIR:...;TARGET:...;
+void handleLegacyCommand(String command) {
+  // 處理狀態更新指令
+  Serial.print("RECEIVED: ");
+  Serial.println(command);
+
+  // 解析狀態指令
+  if (command.indexOf("STATUS:FULL") != -1) {
+    // Python 要求進入自動緊急模式
+    elevatorStatus = "FULL";
+    Serial.println("AUTO EMERGENCY MODE ACTIVATED BY PYTHON");
+  } else if (command.indexOf("STATUS:EMERGENCY") != -1) {
+    // Python 要求進入手動緊急模式
+    elevatorStatus = "EMERGENCY";
+    Serial.println("MANUAL EMERGENCY MODE ACTIVATED BY PYTHON");
+  } else if (command.indexOf("STATUS:NORMAL") != -1) {
+    // Python 要求解除緊急模式
+    elevatorStatus = "NORMAL";
+    Serial.println("NORMAL MODE ACTIVATED BY PYTHON");
+  }
+
+  // 解析樓層和方向資訊
+  if (command.indexOf("FLOOR:") != -1) {
+    int floorStart = command.indexOf("FLOOR:") + 6;
+    int floorEnd = command.indexOf(";", floorStart);
+    if (floorEnd != -1) {
+      String floorStr = command.substring(floorStart, floorEnd);
+      currentFloor = floorStr.toInt();
+    }
+  }
+
+  if (command.indexOf("DIR:") != -1) {
+    int dirStart = command.indexOf("DIR:") + 4;
+    int dirEnd = command.indexOf(";", dirStart);
+    if (dirEnd != -1) {
+      elevatorDirection = command.substring(dirStart, dirEnd);
+    }
+  }
+
+  // 解析目標樓層
+  if (command.indexOf("TARGET:") != -1) {
+    int targetStart = command.indexOf("TARGET:") + 7;
+    int targetEnd = command.indexOf(";", targetStart);
+    if (targetEnd != -1) {
+      String targetStr = command.substring(targetStart, targetEnd);
+      targetFloor = targetStr.toInt();
     }
   }
 }
@@ -0,0 +1,187 @@
+"""預先載入的音效引擎：啟動時解碼所有音效，播放交給混音執行緒。
+
+音效以檔名（不含副檔名）稱呼，例如 "1f"、"do"、"em"。Code/music/ 中的語言版本
+以字尾區分（1f.mp3 中文、1f_e.mp3 英文、1f_j.mp3 日文），選定語言後找不到的
+版本退回中文；em_1.25x 之類的變體可直接用完整名稱播放。
+ALIASES 把舊名稱對應到實際的檔案：Arduino 送出的 em 原本播放 Code/em.mp3，
+與 music/em_1.25x.mp3 是同一份錄音（music/em.mp3 是較慢的另一個版本）。
+優先順序依底線前的基本名稱決定，em_1.25x 與 em 同樣是緊急音效。
+
+播放請求依優先順序排隊：緊急音效會中斷正在播放的樓層提示音並清掉排隊中較低
+優先順序的音效。沒有 pygame 或沒有音效裝置時使用 NullSink，在 Linux 無頭環境也能執行。
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+pygame = None  # 第一次呼叫 default_sink() 時才載入，啟動時不必等待
+
+MUSIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "music")
+LANGUAGES = {"zh": "", "en": "_e", "ja": "_j"}
+ALIASES = {"em": "em_1.25x"}
+PRIORITIES = {"em": 2}  # 以基本名稱（底線前）查詢，其餘音效為 1
+DEFAULT_PRIORITY = 1
+
+
+class NullSink:
+    """不發出聲音的輸出端，只記錄播放過的音效。"""
+
+    def __init__(self):
+        self.played = []
+
+    def load(self, path):
+        return path
+
+    def play(self, clip):
+        self.played.append(os.path.basename(clip))
+
+    def stop(self):
+        pass
+
+    def busy(self):
+        return False
+
+
+class PygameSink:
+    """以 pygame.mixer 播放，所有音效載入時即解碼到記憶體。"""
+
+    def __init__(self):
+        pygame.mixer.init()
+        self.channel = pygame.mixer.Channel(0)
+
+    def load(self, path):
+        return pygame.mixer.Sound(path)
+
+    def play(self, clip):
+        self.channel.play(clip)
+
+    def stop(self):
+        self.channel.stop()
+
+    def busy(self):
+        return self.channel.get_busy()
+
+
+def default_sink():
+    """有 pygame 與音效裝置時使用 PygameSink，否則使用 NullSink。"""
+    global pygame
+    try:
+        import pygame
+    except ImportError:  # 沒有 pygame 時只能使用 NullSink
+        pygame = None
+    if pygame is None:
+        logger.warning("未安裝 pygame，音效停用")
+        return NullSink()
+    try:
+        return PygameSink()
+    except pygame.error as e:
+        logger.warning(f"無法開啟音效裝置（{e}），音效停用")
+        return NullSink()
+
+
+class AudioEngine:
+    """音效引擎。
+
+    language：LANGUAGES 中的語言代碼，可用 set_language() 切換
+    sink：輸出端，預設由 default_sink() 決定
+    """
+
+    POLL_INTERVAL = 0.02  # 混音執行緒檢查播放狀態的間隔（秒）
+
+    def __init__(self, language="zh", sink=None, music_dir=MUSIC_DIR):
+        self.sink = default_sink() if sink is None else sink
+        self.set_language(language)
+        self.clips = {}
+        for filename in sorted(os.listdir(music_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() in (".mp3", ".wav", ".ogg"):
+                self.clips[name] = self.sink.load(os.path.join(music_dir, filename))
+
+        self._queue = []  # (-priority, seq, name)
+        self._seq = itertools.count()
+        self._current_priority = None
+        self._preempt = False
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.clips_played = 0
+        self.clips_preempted = 0
+        self.clips_missing = 0
+
+    def set_language(self, language):
+        if language not in LANGUAGES:
+            raise ValueError(f"不支援的語言：{language}（可用：{', '.join(LANGUAGES)}）")
+        self.language = language
+
+    def resolve(self, name):
+        """依目前語言找出實際的音效名稱，找不到時回傳 None。"""
+        name = ALIASES.get(name, name)
+        localized = name + LANGUAGES[self.language]
+        if localized in self.clips:
+            return localized
+        return name if name in self.clips else None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="audio-mixer", daemon=True)
+        self._thread.start()
+        return self
+
+    def play(self, name, priority=None):
+        """排入音效；優先順序高於正在播放的音效時中斷它。"""
+        clip = self.resolve(name)
+        if clip is None:
+            self.clips_missing += 1
+            logger.debug(f"音效不存在: {name}")  # 超過 3 樓的樓層沒有提示音，每次抵達都會發生
+            return False
+        if priority is None:
+            priority = PRIORITIES.get(clip.split("_")[0], DEFAULT_PRIORITY)
+        with self._cond:
+            if any(queued == clip for _, _, queued in self._queue):
+                return True  # 相同音效已在排隊
+            if self._current_priority is not None and priority > self._current_priority:
+                self._preempt = True
+            if priority > DEFAULT_PRIORITY:
+                self._queue = [item for item in self._queue if -item[0] >= priority]
+                heapq.heapify(self._queue)
+            heapq.heappush(self._queue, (-priority, next(self._seq), clip))
+            self._cond.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    break
+                if self._preempt:
+                    self._preempt = False
+                    self.sink.stop()
+                    self.clips_preempted += 1
+                    self._current_priority = None
+                if self._current_priority is not None and not self.sink.busy():
+                    self._current_priority = None
+                if self._current_priority is None and self._queue:
+                    neg_priority, _, clip = heapq.heappop(self._queue)
+                    self._current_priority = -neg_priority
+                    self.sink.play(self.clips[clip])
+                    self.clips_played += 1
+                if self._current_priority is None and not self._queue:
+                    self._cond.wait()  # 閒置時等待下一個播放請求
+                else:
+                    self._cond.wait(self.POLL_INTERVAL)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._queue.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.sink.stop()
@@ -0,0 +1,404 @@
+"""NumPy 向量化批次模擬：同時推進 N 台互相獨立的模擬車廂。
+
+每台車廂的狀態（位置、方向、請求點陣圖、緊急旗標）都存放在形狀為 (N,) 或 (N, 樓層數)
+的陣列裡，所有車廂以相同時間步長同步前進，派車與抵達邏輯都以陣列運算完成。
+用來大量評分隨機交通情境，以調整 penetration_threshold、停靠時間與 SCAN 規則。
+
+派車、緊急模式與暫存外部請求的規則與 elevator_core.ElevatorController 相同
+（上下距離相同時同樣取排列在前面的請求；同一時間步內按下的請求無法分先後，取較低樓層），
+移動模型則是較早的簡化版本，結果只適合比較設定之間的相對差異：
+- 每趟固定 movement_time 秒、等速移動；控制器改用 motion.MotionProfile 的
+  jerk 限制軌跡，移動時間隨距離而定
+- 中途停靠每 check_interval 秒檢查一次、只要還沒經過該樓層就攔截；
+  控制器在請求加入時立即檢查，而且只攔截煞車距離之外的樓層
+
+樓層在內部以 0 起算的索引表示，對外（呼叫與結果）使用 1 起算的樓層號碼。
+"""
+import time
+
+import numpy as np
+
+# 呼叫種類（對應 ButtonType）
+CALL_INTERNAL = 0
+CALL_UP = 1
+CALL_DOWN = 2
+
+
+class BatchElevatorSim:
+    """N 台獨立車廂的向量化模擬器。"""
+
+    def __init__(self, n_cars, n_floors=3, movement_time=7.5, check_interval=1.0,
+                 dwell_time=0.5, penetration_threshold=0.50, keep_direction=False):
+        self.n = n_cars
+        self.n_floors = n_floors
+        self.floor_idx = np.arange(n_floors)
+        self.movement_time = movement_time
+        self.check_interval = check_interval
+        # 以下參數可以是純量或每台車廂一個值的陣列，方便一次掃描多組設定
+        self.dwell_time = np.broadcast_to(np.asarray(dwell_time, dtype=float), (n_cars,))
+        self.penetration_threshold = np.broadcast_to(np.asarray(penetration_threshold, dtype=float), (n_cars,))
+        # 原始控制器抵達後方向會重設為 IDLE；keep_direction=True 時保留行進方向以評估 SCAN 規則
+        self.keep_direction = keep_direction
+
+        self.now = 0.0
+        self.position = np.zeros(n_cars)
+        self.current = np.zeros(n_cars, dtype=np.int64)
+        self.target = np.zeros(n_cars, dtype=np.int64)
+        self.start = np.zeros(n_cars, dtype=np.int64)
+        self.direction = np.zeros(n_cars, dtype=np.int8)
+        self.last_direction = np.zeros(n_cars, dtype=np.int8)
+        self.velocity = np.zeros(n_cars)
+        self.trip_elapsed = np.zeros(n_cars)
+        self.dwell_left = np.zeros(n_cars)
+        self.moving = np.zeros(n_cars, dtype=bool)
+
+        # 請求點陣圖與對應的按下時間（無請求時為 inf）
+        shape = (n_cars, n_floors)
+        self.internal = np.zeros(shape, dtype=bool)
+        self.hall_up = np.zeros(shape, dtype=bool)
+        self.hall_down = np.zeros(shape, dtype=bool)
+        self.pending_up = np.zeros(shape, dtype=bool)
+        self.pending_down = np.zeros(shape, dtype=bool)
+        self.internal_time = np.full(shape, np.inf)
+        self.up_time = np.full(shape, np.inf)
+        self.down_time = np.full(shape, np.inf)
+        self.pending_up_time = np.full(shape, np.inf)
+        self.pending_down_time = np.full(shape, np.inf)
+
+        self.manual_emergency = np.zeros(n_cars, dtype=bool)
+        self.auto_emergency = np.zeros(n_cars, dtype=bool)
+        self.auto_emergency_active = np.zeros(n_cars, dtype=bool)
+        self.full_load = np.zeros(n_cars, dtype=bool)
+        self.penetration_ratio = np.zeros(n_cars)
+
+        # 評分統計
+        self.wait_sum = np.zeros(n_cars)
+        self.wait_max = np.zeros(n_cars)
+        self.served = np.zeros(n_cars, dtype=np.int64)
+        self.trips = np.zeros(n_cars, dtype=np.int64)
+        self.emergency_activations = np.zeros(n_cars, dtype=np.int64)
+
+        self._calls = None
+        self._call_cursor = 0
+
+    # --- 輸入 ---
+
+    def load_calls(self, times, cars, floors, kinds):
+        """載入整段情境的呼叫（時間、車廂索引、樓層 1..F、種類），依時間排序後逐步注入。"""
+        order = np.argsort(times, kind="stable")
+        self._calls = (np.asarray(times, dtype=float)[order],
+                       np.asarray(cars, dtype=np.int64)[order],
+                       np.asarray(floors, dtype=np.int64)[order] - 1,
+                       np.asarray(kinds, dtype=np.int64)[order])
+        self._call_cursor = 0
+
+    def add_calls(self, cars, floors, kinds):
+        """立即加入一批呼叫（樓層 1..F），規則同 ElevatorController.add_request。"""
+        cars = np.asarray(cars, dtype=np.int64)
+        floors = np.asarray(floors, dtype=np.int64) - 1
+        kinds = np.asarray(kinds, dtype=np.int64)
+        now = self.now
+
+        # 內部請求：忽略當前樓層；緊急模式下只接受一筆
+        sel = (kinds == CALL_INTERNAL) & (floors != self.current[cars])
+        if sel.any():
+            c, f = cars[sel], floors[sel]
+            emergency = self.full_load[c]
+            normal = ~emergency
+            self.internal[c[normal], f[normal]] = True
+            np.minimum.at(self.internal_time, (c[normal], f[normal]), now)
+            if emergency.any():
+                ce, fe = c[emergency], f[emergency]
+                # 同一步內的多筆緊急請求只保留第一筆
+                ce, first = np.unique(ce, return_index=True)
+                fe = fe[first]
+                free = ~self.internal[ce].any(axis=1)
+                self.internal[ce[free], fe[free]] = True
+                self.internal_time[ce[free], fe[free]] = now
+
+        for kind, calls, call_time, pending, pending_time in (
+                (CALL_UP, self.hall_up, self.up_time, self.pending_up, self.pending_up_time),
+                (CALL_DOWN, self.hall_down, self.down_time, self.pending_down, self.pending_down_time)):
+            sel = kinds == kind
+            if not sel.any():
+                continue
+            c, f = cars[sel], floors[sel]
+            emergency = self.full_load[c]
+            normal = ~emergency
+            calls[c[normal], f[normal]] = True
+            np.minimum.at(call_time, (c[normal], f[normal]), now)
+            # 緊急模式：外部請求暫存，解除後再處理
+            pending[c[emergency], f[emergency]] = True
+            np.minimum.at(pending_time, (c[emergency], f[emergency]), now)
+
+    def set_manual_emergency(self, enabled):
+        """設定每台車廂的手動緊急旗標（純量或 (N,) 陣列）。"""
+        self.manual_emergency[:] = enabled
+        self._update_emergency_mode()
+
+    def update_penetration(self, penetration_ratio):
+        """輸入每台車廂的最新突破量（百分比），依各自閾值切換自動緊急模式。"""
+        self.penetration_ratio[:] = penetration_ratio
+        over = self.penetration_ratio / 100 >= self.penetration_threshold
+        activate = over & ~self.auto_emergency
+        self.emergency_activations += activate
+        self.auto_emergency |= activate
+        self.auto_emergency_active |= activate
+        # 只有在電梯靜止且自動緊急模式已啟動時才解除
+        release = ~over & self.auto_emergency & ~self.moving & self.auto_emergency_active
+        self.auto_emergency &= ~release
+        self.auto_emergency_active &= ~release
+        self._update_emergency_mode()
+
+    def _update_emergency_mode(self):
+        prev = self.full_load.copy()
+        self.full_load[:] = self.manual_emergency | self.auto_emergency
+        resumed = prev & ~self.full_load
+        if resumed.any():
+            # 緊急模式解除：把暫存的外部請求放回
+            for calls, call_time, pending, pending_time in (
+                    (self.hall_up, self.up_time, self.pending_up, self.pending_up_time),
+                    (self.hall_down, self.down_time, self.pending_down, self.pending_down_time)):
+                calls[resumed] |= pending[resumed]
+                call_time[resumed] = np.minimum(call_time[resumed], pending_time[resumed])
+                pending[resumed] = False
+                pending_time[resumed] = np.inf
+
+    # --- 派車 ---
+
+    def active_requests(self):
+        """(N, F) 有效請求點陣圖；緊急模式只看內部請求。"""
+        return self.internal | ((self.hall_up | self.hall_down) & ~self.full_load[:, None])
+
+    def next_stop(self, cars):
+        """向量化的 get_next_stop，回傳每台車廂的下一站索引（無請求為 -1）。"""
+        active = self.active_requests()[cars]
+        current = self.current[cars]
+        rows = np.arange(len(cars))
+        has_any = active.any(axis=1)
+        result = np.full(len(cars), -1, dtype=np.int64)
+
+        above = active & (self.floor_idx[None, :] > current[:, None])
+        below = active & (self.floor_idx[None, :] < current[:, None])
+        has_above = above.any(axis=1)
+        has_below = below.any(axis=1)
+        nearest_above = above.argmax(axis=1)
+        nearest_below = self.n_floors - 1 - below[:, ::-1].argmax(axis=1)
+
+        # 最近樓層；上下距離相同時與 RequestIndex.nearest 一樣取排列在前面的請求：
+        # 內部請求優先，其次是較早按下的（同一時間步內按下的取較低樓層）
+        order = np.where(self.internal[cars], self.internal_time[cars],
+                         np.minimum(self.up_time[cars], self.down_time[cars]) + 1e12)
+        d_above = nearest_above - current
+        d_below = current - nearest_below
+        pick_above = has_above & (~has_below | (d_above < d_below)
+                                  | ((d_above == d_below)
+                                     & (order[rows, nearest_above] < order[rows, nearest_below])))
+        result[has_below] = nearest_below[has_below]
+        result[pick_above] = nearest_above[pick_above]
+        here = active[rows, current]
+        result[here] = current[here]
+
+        direction = self.last_direction[cars] if self.keep_direction else self.direction[cars]
+        use_up = (direction == 1) & has_above
+        use_down = (direction == -1) & has_below
+        result[use_up] = nearest_above[use_up]
+        result[use_down] = nearest_below[use_down]
+
+        # 緊急模式：前往最早的內部請求
+        emergency = self.full_load[cars] & has_any
+        if emergency.any():
+            result[emergency] = self.internal_time[cars[emergency]].argmin(axis=1)
+        return result
+
+    def _dispatch_idle(self):
+        idle = np.flatnonzero(~self.moving & (self.dwell_left <= 0))
+        if len(idle) == 0:
+            return
+        stops = self.next_stop(idle)
+        go = stops >= 0
+        self.direction[idle[~go]] = 0
+        cars, stops = idle[go], stops[go]
+        if len(cars) == 0:
+            return
+        self.target[cars] = stops
+        self.start[cars] = self.current[cars]
+        self.direction[cars] = np.sign(stops - self.current[cars])
+        self.last_direction[cars] = np.where(self.direction[cars] != 0, self.direction[cars], self.last_direction[cars])
+        self.velocity[cars] = (stops - self.position[cars]) / self.movement_time
+        self.trip_elapsed[cars] = 0.0
+        self.moving[cars] = True
+        self.trips[cars] += 1
+
+    def _intercept(self, due):
+        """中途停靠：行進方向前方、同方向的呼叫改為先停。"""
+        cars = np.flatnonzero(due & self.moving & ~self.full_load)
+        if len(cars) == 0:
+            return
+        floors = self.floor_idx[None, :]
+        pos = self.position[cars][:, None]
+        start = self.start[cars][:, None]
+        target = self.target[cars][:, None]
+        up = (self.direction[cars] == 1)[:, None]
+        down = (self.direction[cars] == -1)[:, None]
+
+        up_cand = up & (self.internal[cars] | self.hall_up[cars]) & (start < floors) & (floors < target) & (pos < floors)
+        down_cand = down & (self.internal[cars] | self.hall_down[cars]) & (start > floors) & (floors > target) & (pos > floors)
+        has_up = up_cand.any(axis=1)
+        has_down = down_cand.any(axis=1)
+        new_target = self.target[cars].copy()
+        new_target[has_up] = up_cand.argmax(axis=1)[has_up]
+        new_target[has_down] = (self.n_floors - 1 - down_cand[:, ::-1].argmax(axis=1))[has_down]
+
+        changed = has_up | has_down
+        if changed.any():
+            c = cars[changed]
+            self.target[c] = new_target[changed]
+            # 保持原有移動時間，不延長總時間
+            remaining = np.maximum(self.movement_time - self.trip_elapsed[c], 1e-9)
+            self.velocity[c] = (self.target[c] - self.position[c]) / remaining
+
+    def _arrive(self, cars):
+        target = self.target[cars]
+        self.position[cars] = target
+        self.current[cars] = target
+        self.moving[cars] = False
+        self.direction[cars] = 0
+
+        # 統計並清除在本樓層完成的請求
+        now = self.now
+        normal = ~self.full_load[cars]
+        waits = [self.internal_time[cars, target]]
+        self.internal[cars, target] = False
+        self.internal_time[cars, target] = np.inf
+        for calls, call_time in ((self.hall_up, self.up_time), (self.hall_down, self.down_time)):
+            c, f = cars[normal], target[normal]
+            waits.append(np.where(normal, call_time[cars, target], np.inf))
+            calls[c, f] = False
+            call_time[c, f] = np.inf
+        for wait_time in waits:
+            served = np.isfinite(wait_time)
+            wait = np.where(served, now - wait_time, 0.0)
+            self.wait_sum[cars] += wait
+            self.wait_max[cars] = np.maximum(self.wait_max[cars], wait)
+            self.served[cars] += served
+
+        # 自動緊急模式：抵達後重置，突破量已降低則解除
+        active = self.auto_emergency_active[cars]
+        self.auto_emergency_active[cars] = False
+        release = active & (self.penetration_ratio[cars] / 100 < self.penetration_threshold[cars])
+        self.auto_emergency[cars[release]] = False
+        self._update_emergency_mode()
+
+        # 緊急救援完成：清除內部請求並在此樓層待命
+        rescued = cars[self.full_load[cars]]
+        self.internal[rescued] = False
+        self.internal_time[rescued] = np.inf
+
+        self.dwell_left[cars] = self.dwell_time[cars]
+
+    # --- 推進 ---
+
+    def step(self, dt):
+        """所有車廂同步前進 dt 秒。"""
+        self.now += dt
+        if self._calls is not None:
+            times, cars, floors, kinds = self._calls
+            end = np.searchsorted(times, self.now, side="right")
+            if end > self._call_cursor:
+                sl = slice(self._call_cursor, end)
+                self.add_calls(cars[sl], floors[sl] + 1, kinds[sl])
+                self._call_cursor = end
+
+        self.dwell_left = np.maximum(self.dwell_left - dt, 0.0)
+        self._dispatch_idle()
+
+        moving = self.moving
+        if moving.any():
+            # 每 check_interval 秒（以及出發時）檢查一次中途停靠
+            before = self.trip_elapsed // self.check_interval
+            due = moving & ((self.trip_elapsed == 0) | ((self.trip_elapsed + dt) // self.check_interval != before))
+            self._intercept(due)
+
+            self.position[moving] += self.velocity[moving] * dt
+            self.trip_elapsed[moving] += dt
+            up = moving & (self.direction == 1)
+            down = moving & (self.direction == -1)
+            self.current[up] = np.floor(self.position[up] + 1e-9).astype(np.int64)
+            self.current[down] = np.ceil(self.position[down] - 1e-9).astype(np.int64)
+            np.clip(self.current, 0, self.n_floors - 1, out=self.current)
+
+            arrived = np.flatnonzero(moving & (self.trip_elapsed >= self.movement_time - 1e-9))
+            if len(arrived):
+                self._arrive(arrived)
+
+    def run(self, duration, dt=0.25):
+        steps = int(round(duration / dt))
+        for _ in range(steps):
+            self.step(dt)
+
+    def scores(self):
+        """每台車廂（情境）的平均等待時間、最長等待時間與服務數。"""
+        mean_wait = np.divide(self.wait_sum, self.served, out=np.full(self.n, np.nan), where=self.served > 0)
+        return {
+            "mean_wait": mean_wait,
+            "max_wait": self.wait_max.copy(),
+            "served": self.served.copy(),
+            "trips": self.trips.copy(),
+            "emergency_activations": self.emergency_activations.copy(),
+        }
+
+
+def random_calls(n_cars, n_floors, duration, mean_interval, seed=None):
+    """產生每台車廂獨立的 Poisson 隨機呼叫（時間、車廂、樓層 1..F、種類）。"""
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(duration / mean_interval, size=n_cars)
+    total = int(counts.sum())
+    cars = np.repeat(np.arange(n_cars), counts)
+    times = rng.uniform(0, duration, size=total)
+    floors = rng.integers(1, n_floors + 1, size=total)
+    kinds = rng.integers(0, 3, size=total)
+    # 最低層只有向上、最高層只有向下
+    kinds[(kinds == CALL_DOWN) & (floors == 1)] = CALL_UP
+    kinds[(kinds == CALL_UP) & (floors == n_floors)] = CALL_DOWN
+    return times, cars, floors, kinds
+
+
+def random_penetration(n_cars, n_steps, step_std=5.0, seed=None):
+    """產生每台車廂獨立的突破量序列（百分比），形狀為 (n_steps, n_cars)。
+
+    每一步在上一步加上常態分佈的變化（標準差 step_std），限制在 0–100 之間。
+    """
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 60, size=n_cars)
+    steps = rng.normal(0, step_std, size=(n_steps, n_cars))
+    ratios = np.empty((n_steps, n_cars))
+    ratio = start
+    for i in range(n_steps):
+        ratio = np.clip(ratio + steps[i], 0, 100)
+        ratios[i] = ratio
+    return ratios
+
+
+if __name__ == "__main__":
+    n_scenarios = 4096
+    duration = 300.0
+    thresholds = np.linspace(0.3, 0.7, n_scenarios)
+    sim = BatchElevatorSim(n_scenarios, penetration_threshold=thresholds)
+    sim.load_calls(*random_calls(n_scenarios, sim.n_floors, duration, mean_interval=20.0, seed=1))
+    # 每秒輸入一次突破量，讓不同的閾值實際影響緊急模式
+    penetration = random_penetration(n_scenarios, int(duration), seed=2)
+    start = time.time()
+    for ratio in penetration:
+        sim.update_penetration(ratio)
+        sim.run(1.0)
+    elapsed = time.time() - start
+    scores = sim.scores()
+    print(f"{n_scenarios} 個情境 × {duration:.0f} 秒，耗時 {elapsed:.2f} 秒"
+          f"（{n_scenarios / elapsed:.0f} 情境/秒）")
+    print(f"平均等待 {np.nanmean(scores['mean_wait']):.1f} 秒，最長等待 {scores['max_wait'].max():.1f} 秒")
+    print(f"{'閾值':<12}{'平均等待':>8}{'最長等待':>8}{'緊急次數':>8}")
+    for band in np.array_split(np.arange(n_scenarios), 5):
+        print(f"{thresholds[band[0]]:.2f}–{thresholds[band[-1]]:.2f}"
+              f"{np.nanmean(scores['mean_wait'][band]):>10.1f}{scores['max_wait'][band].max():>10.1f}"
+              f"{scores['emergency_activations'][band].mean():>10.2f}")
@@ -0,0 +1,90 @@
+"""背景執行緒擷取攝影機畫面，只保留最新一張。
+
+cap.read() 會阻塞到驅動程式交出下一張畫面；放在 Tk 主執行緒上時，攝影機一卡住
+動畫與序列埠輪詢就跟著停住，而且驅動程式內排隊的舊畫面會讓突破量落後。
+LatestFrameCapture 在背景執行緒不斷讀取，新畫面直接覆蓋舊畫面，
+latest() 不阻塞，偵測端永遠拿到最新的一張。
+"""
+import threading
+import time
+
+import cv2
+
+
+class LatestFrameCapture:
+    """包裝 cv2.VideoCapture 的擷取執行緒。
+
+    frames_captured：讀到的畫面總數
+    frames_dropped：還沒被 latest() 取走就被新畫面覆蓋的張數
+    read_failures：cap.read() 失敗的次數
+    """
+
+    RETRY_DELAY = 0.05  # 讀取失敗後等待多久再試（秒）
+
+    def __init__(self, source=0):
+        self.cap = cv2.VideoCapture(source)
+        # 讓驅動程式只保留一張畫面，避免讀到排隊中的舊畫面（不支援的後端會忽略）
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0
+        self._consumed_seq = 0
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                with self._lock:
+                    self.read_failures += 1
+                time.sleep(self.RETRY_DELAY)
+                continue
+            timestamp = time.time()
+            with self._lock:
+                if self._seq > self._consumed_seq:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.frames_captured += 1
+
+    def latest(self):
+        """回傳 (frame, timestamp, seq)；尚未有畫面時回傳 (None, None, 0)。
+
+        不會阻塞；seq 與上次相同代表還沒有新畫面。
+        """
+        with self._lock:
+            self._consumed_seq = self._seq
+            return self._frame, self._timestamp, self._seq
+
+    def stats(self):
+        with self._lock:
+            return {
+                "captured": self.frames_captured,
+                "dropped": self.frames_dropped,
+                "read_failures": self.read_failures,
+                "age": None if self._timestamp is None else time.time() - self._timestamp,
+            }
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.cap.release()
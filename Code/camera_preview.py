@@ -0,0 +1,52 @@
+"""攝影機預覽：重複使用同一個 PhotoImage，更新頻率與偵測頻率分開設定。
+
+原本每次偵測都建立新的 PIL.Image 與 ImageTk.PhotoImage 再換進 Label；
+CameraPreview 在第一次顯示時建立一個固定大小的 PhotoImage，之後只把新的像素
+paste 進去。due() 讓呼叫端在還沒到更新時間時連預覽影像都不必畫。
+fps 為 0 時預覽完全關閉，適合無人觀看的正式環境。
+"""
+import time
+
+from PIL import Image, ImageTk
+
+
+class CameraPreview:
+    """顯示在 Tk Label 上的攝影機預覽。
+
+    label：顯示預覽的 tk.Label
+    size：預覽大小 (寬, 高)，需與偵測器的 preview_size 相同
+    fps：每秒最多更新幾次，0 表示關閉預覽
+    """
+
+    def __init__(self, label, size=(240, 180), fps=10.0):
+        self.label = label
+        self.size = tuple(size)
+        self.interval = 1.0 / fps if fps > 0 else None
+        self.photo = None
+        self._last_shown = None
+        self.frames_shown = 0
+
+    @property
+    def enabled(self):
+        return self.interval is not None
+
+    def due(self, now=None):
+        """是否到了下一次更新預覽的時間。"""
+        if self.interval is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return self._last_shown is None or now - self._last_shown >= self.interval
+
+    def show(self, rgb, now=None):
+        """把 RGB 預覽影像（numpy 陣列）顯示出來；未到更新時間或影像為 None 時略過。"""
+        now = time.monotonic() if now is None else now
+        if rgb is None or not self.due(now):
+            return False
+        image = Image.fromarray(rgb)
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage("RGB", self.size)
+            self.label.config(image=self.photo)
+        self.photo.paste(image)
+        self._last_shown = now
+        self.frames_shown += 1
+        return True
@@ -0,0 +1,214 @@
+"""錄製攝影機辨識區域的畫面並離線重播，用來重現誤判與評估偵測器效能。
+
+錄製檔格式（小端序）：
+- 檔頭 32 bytes：MAGIC（8 bytes）＋ 高、寬、通道數（各 uint32），其餘補 0
+- 之後為固定大小的紀錄：timestamp（float64）、ratio（float64，基準建立期間為 NaN）、
+  原始解析度的辨識區域畫面（uint8，高 × 寬 × 通道）
+
+錄製時直接附加寫入；讀取時以 np.memmap 對應整個檔案，紀錄數由檔案大小推得，
+程式中途結束留下的檔案也能讀取（不完整的最後一筆會被忽略）。
+"""
+import math
+import os
+import struct
+import time
+
+import numpy as np
+
+from detection_scheduler import ChangeGate
+from occupancy import ENGINES
+from penetration_detector import PenetrationDetector
+
+MAGIC = b"ELVREC1\0"
+HEADER = struct.Struct("<8s3I")
+HEADER_SIZE = 32
+
+
+def record_dtype(shape):
+    return np.dtype([("timestamp", "<f8"), ("ratio", "<f8"), ("frame", np.uint8, shape)])
+
+
+class SessionRecorder:
+    """把辨識區域畫面與當下的突破量附加寫入錄製檔。
+
+    第一張畫面決定檔案的畫面尺寸，之後尺寸不同的畫面會被略過。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.frames_written = 0
+        self.frames_skipped = 0
+        self._file = None
+        self._record = None
+        self._shape = None
+
+    def write(self, roi_frame, ratio, timestamp=None):
+        """寫入一筆紀錄；ratio 為 None 時記為 NaN。"""
+        if self._file is None:
+            self._open(roi_frame.shape)
+        elif roi_frame.shape != self._shape:
+            self.frames_skipped += 1
+            return
+        record = self._record[0]
+        record["timestamp"] = time.time() if timestamp is None else timestamp
+        record["ratio"] = math.nan if ratio is None else ratio
+        record["frame"] = roi_frame.reshape(record["frame"].shape)
+        self._file.write(self._record.tobytes())
+        self.frames_written += 1
+
+    def _open(self, shape):
+        self._shape = shape
+        if len(shape) == 2:
+            shape = shape + (1,)
+        self._file = open(self.path, "wb")
+        self._file.write(HEADER.pack(MAGIC, *shape).ljust(HEADER_SIZE, b"\0"))
+        self._record = np.zeros(1, record_dtype(shape))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ReplaySource:
+    """以 np.memmap 讀取錄製檔，依序提供 (frame, ratio, timestamp)。"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, height, width, channels = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是電梯攝影機錄製檔")
+        shape = (height, width, channels)
+        dtype = record_dtype(shape)
+        self.frame_shape = shape if channels > 1 else shape[:2]
+        count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for record in self.records:
+            yield record["frame"].reshape(self.frame_shape), record["ratio"], record["timestamp"]
+
+
+def benchmark(path, detection_scale=0.5, threshold=0.50, gate_threshold=None):
+    """以最快速度把錄製的畫面送進偵測器，回傳效能與突破量差異的統計。
+
+    錄製的已經是辨識區域，因此重播時不再裁切邊界（roi_margins=(0, 0)）。
+    gate_threshold 不為 None 時先以 ChangeGate 判斷畫面是否有變化，沒有變化的畫面
+    沿用上一次的突破量（gated 為略過的張數），用來評估變化判斷對準確度的影響。
+    divergence 比較重播與錄製時的突破量（兩者皆有值的畫面）；
+    decision_mismatches 為兩者對是否超過 threshold 判斷不同的畫面數。
+    """
+    source = ReplaySource(path)
+    detector = PenetrationDetector(detection_scale=detection_scale, roi_margins=(0, 0), profile=True)
+    gate = ChangeGate(threshold=gate_threshold) if gate_threshold is not None else None
+    diffs = []
+    mismatches = 0
+    gated = 0
+    ratio = None
+    start = time.perf_counter()
+    for frame, recorded, _ in source:
+        if gate is not None and detector.baseline_established and not gate.changed(frame):
+            gated += 1
+        else:
+            ratio = detector.process(frame, threshold)
+            if gate is not None:
+                gate.changed(frame)
+                gate.update_reference()
+        if ratio is None or math.isnan(recorded):
+            continue
+        diffs.append(abs(ratio - recorded))
+        if (ratio / 100 >= threshold) != (recorded / 100 >= threshold):
+            mismatches += 1
+    elapsed = time.perf_counter() - start
+
+    frames = len(source)
+    return {
+        "frames": frames,
+        "elapsed": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else math.inf,
+        "stage_ms": {stage: total / frames * 1000 if frames else 0.0
+                     for stage, total in detector.stage_times.items()},
+        "compared": len(diffs),
+        "mean_divergence": float(np.mean(diffs)) if diffs else 0.0,
+        "max_divergence": float(max(diffs, default=0.0)),
+        "decision_mismatches": mismatches,
+        "gated": gated,
+    }
+
+
+def compare_engines(path, engines=tuple(ENGINES), reference="mog2", detection_scale=0.5, threshold=0.50):
+    """以相同的重播畫面比較各佔用估計引擎，回傳 {引擎: 統計}。
+
+    ms_per_frame 為 process() 的平均耗時；與 reference 引擎比較（兩者皆有值的畫面）：
+    mean_divergence 為突破量的平均差異（百分點），decision_agreement 為是否超過
+    threshold 判斷相同的比例，grid_divergence 為各格佔用比例的平均差異。
+    """
+    source = ReplaySource(path)
+    names = list(dict.fromkeys((reference,) + tuple(engines)))
+    detectors = {name: PenetrationDetector(detection_scale=detection_scale, roi_margins=(0, 0), engine=name)
+                 for name in names}
+    elapsed = dict.fromkeys(names, 0.0)
+    stats = {name: {"diffs": [], "grid_diffs": [], "agree": 0} for name in names}
+    for frame, _, _ in source:
+        ratios = {}
+        for name, detector in detectors.items():
+            start = time.perf_counter()
+            ratios[name] = detector.process(frame, threshold, draw_preview=False)
+            elapsed[name] += time.perf_counter() - start
+        expected = ratios[reference]
+        if expected is None:
+            continue
+        for name in names:
+            if ratios[name] is None:
+                continue
+            stats[name]["diffs"].append(abs(ratios[name] - expected))
+            stats[name]["grid_diffs"].append(float(np.abs(detectors[name].grid - detectors[reference].grid).mean()))
+            stats[name]["agree"] += (ratios[name] / 100 >= threshold) == (expected / 100 >= threshold)
+
+    frames = len(source)
+    results = {}
+    for name in names:
+        compared = len(stats[name]["diffs"])
+        results[name] = {
+            "ms_per_frame": elapsed[name] / frames * 1000 if frames else 0.0,
+            "compared": compared,
+            "mean_divergence": float(np.mean(stats[name]["diffs"])) if compared else 0.0,
+            "decision_agreement": stats[name]["agree"] / compared if compared else 1.0,
+            "grid_divergence": float(np.mean(stats[name]["grid_diffs"])) if compared else 0.0,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重播攝影機錄製檔並評估突破量偵測")
+    parser.add_argument("path", help="錄製檔路徑（main.py --record 產生）")
+    parser.add_argument("--scale", type=float, default=0.5, help="偵測時辨識區域的縮小倍率")
+    parser.add_argument("--threshold", type=float, default=0.50, help="緊急模式閾值（0~1）")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES),
+                        help="比較這些佔用估計引擎與 MOG2 的耗時與一致性")
+    parser.add_argument("--gate", type=float, metavar="DIFF", help="以畫面差異判斷略過沒有變化的畫面（平均灰階差異閾值）")
+    args = parser.parse_args()
+
+    if args.engines:
+        results = compare_engines(args.path, args.engines, detection_scale=args.scale, threshold=args.threshold)
+        print(f"{'引擎':<10}{'ms/張':>8}{'突破量差異':>12}{'判斷一致':>10}{'分區差異':>10}")
+        for name, r in results.items():
+            print(f"{name:<12}{r['ms_per_frame']:>8.3f}{r['mean_divergence']:>14.3f}"
+                  f"{r['decision_agreement']:>12.1%}{r['grid_divergence']:>12.3f}")
+    else:
+        result = benchmark(args.path, detection_scale=args.scale, threshold=args.threshold, gate_threshold=args.gate)
+        print(f"重播 {result['frames']} 張畫面，耗時 {result['elapsed']:.2f} 秒（{result['fps']:.1f} fps）")
+        for stage, ms in result["stage_ms"].items():
+            print(f"  {stage:<9}{ms:.3f} ms/張")
+        print(f"突破量差異（{result['compared']} 張）：平均 {result['mean_divergence']:.3f}%，"
+              f"最大 {result['max_divergence']:.3f}%，判斷不同 {result['decision_mismatches']} 張")
+        if args.gate is not None:
+            print(f"畫面沒有變化而略過 {result['gated']} 張")
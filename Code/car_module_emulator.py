@@ -0,0 +1,233 @@
+"""以虛擬序列埠（pty）模擬 arduino_car_module.ino，不需硬體即可測試序列通訊。
+
+CarModuleEmulator 開一組 pty，在 port 上說和車廂模組相同的協定：啟動訊息、
+BUTTON:n、BUTTON:EMERGENCY_ON/OFF、PLAY_SOUND:、精簡狀態訊框的 ACK/NAK、
+舊版 STATUS: 指令的 RECEIVED: 回音，以及每 2 秒一次的緊急按鈕狀態。
+
+python main.py --port <pty> 可以把 GUI 接到模擬器；
+python car_module_emulator.py --rate 50 會以每秒 50 次的按鈕風暴測量
+從模擬器送出 BUTTON:n 到 add_request 收到請求的延遲。
+"""
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+
+from status_protocol import BAUD_RATE, checksum
+
+
+class CarModuleEmulator:
+    """車廂模組模擬器。
+
+    press_button()／press_emergency() 回傳訊息送出的時間（time.perf_counter()），
+    可用來計算端對端延遲。
+    """
+
+    DEBUG_INTERVAL = 2.0  # 緊急按鈕狀態訊息的間隔（秒）
+
+    def __init__(self, num_floors=3, debug_chatter=True):
+        self.num_floors = num_floors
+        self.debug_chatter = debug_chatter
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self.emergency_mode = False
+        self.status = "NORMAL"
+        self.direction = "IDLE"
+        self.current_floor = 1
+        self.target_floor = 1
+        self.frames_received = 0
+        self.frames_rejected = 0
+
+        self._write_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="car-module-emulator", daemon=True)
+        self._thread.start()
+        self._send("ELEVATOR_SYSTEM_READY", "電梯系統初始化完成！", "車廂運作模組初始化完成", "ARDUINO_READY")
+        return self
+
+    def _send(self, *lines):
+        data = "".join(f"{line}\r\n" for line in lines).encode("utf-8")
+        with self._write_lock:
+            os.write(self._master, data)
+        return time.perf_counter()
+
+    def press_button(self, floor):
+        if not 1 <= floor <= self.num_floors:
+            raise ValueError(f"樓層 {floor} 超出範圍")
+        lines = [f"BUTTON:{floor}"]
+        if self.debug_chatter:
+            lines.append(f"DEBUG: Button {floor} pressed (LOW)")
+        return self._send(*lines)
+
+    def press_emergency(self):
+        """切換緊急模式，與實體緊急按鈕相同。"""
+        self.emergency_mode = not self.emergency_mode
+        if self.emergency_mode:
+            return self._send("BUTTON:EMERGENCY_ON", "PLAY_SOUND:em.mp3", "EMERGENCY MODE ACTIVATED")
+        return self._send("BUTTON:EMERGENCY_OFF", "EMERGENCY MODE DEACTIVATED")
+
+    def _run(self):
+        buffer = b""
+        next_debug = time.monotonic() + self.DEBUG_INTERVAL
+        while self._running:
+            timeout = max(0.0, next_debug - time.monotonic())
+            readable, _, _ = select.select([self._master], [], [], min(timeout, 0.1))
+            if readable:
+                try:
+                    buffer += os.read(self._master, 4096)
+                except OSError:
+                    break
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    self._handle_command(line.decode("ascii", errors="replace").strip())
+            if self.debug_chatter and time.monotonic() >= next_debug:
+                next_debug += self.DEBUG_INTERVAL
+                self._send(f"Emergency Button State: 1, Emergency Mode: {int(self.emergency_mode)}")
+
+    def _handle_command(self, command):
+        if command.startswith("@"):
+            self._handle_compact_frame(command)
+        elif command.startswith("STATUS:"):
+            self._handle_legacy_command(command)
+
+    def _handle_compact_frame(self, frame):
+        payload, _, expected = frame[1:].partition("*")
+        if len(frame) != 11 or payload[0] != "1" or expected != f"{checksum(payload):02X}":
+            self.frames_rejected += 1
+            self._send("NAK")
+            return
+        self.status = {"F": "FULL", "E": "EMERGENCY"}.get(payload[1], "NORMAL")
+        self.direction = {"U": "UP", "D": "DOWN"}.get(payload[2], "IDLE")
+        self.current_floor = int(payload[3:5], 16)
+        self.target_floor = int(payload[5:7], 16)
+        self.frames_received += 1
+        self._send(f"ACK:{expected}")
+
+    def _handle_legacy_command(self, command):
+        lines = [f"RECEIVED: {command}"]
+        fields = dict(part.split(":", 1) for part in command.split(";") if ":" in part)
+        self.status = fields.get("STATUS", self.status)
+        self.direction = fields.get("DIR", self.direction)
+        self.current_floor = int(fields.get("FLOOR", self.current_floor))
+        self.target_floor = int(fields.get("TARGET", self.target_floor))
+        lines.append({"FULL": "AUTO EMERGENCY MODE ACTIVATED BY PYTHON",
+                      "EMERGENCY": "MANUAL EMERGENCY MODE ACTIVATED BY PYTHON"}.get(
+                          self.status, "NORMAL MODE ACTIVATED BY PYTHON"))
+        self.frames_received += 1
+        self._send(*lines)
+
+    def close(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def run_button_storm(rate=20.0, duration=5.0, poll_interval=0.1, num_floors=3, seed=None):
+    """以 rate 次／秒隨機按下樓層按鈕，測量到 add_request 收到請求的延遲。
+
+    接收端與 GUI 相同：SerialReader 在背景讀取，主迴圈每 poll_interval 秒處理一次事件，
+    並持續送出狀態訊框讓模擬器回覆 ACK。回傳延遲（秒）清單與各項計數。
+    """
+    import serial
+
+    from elevator_core import ButtonType, ElevatorController, VirtualClock
+    from serial_reader import SerialReader
+    from status_protocol import StatusLink
+
+    rng = random.Random(seed)
+    emulator = CarModuleEmulator(num_floors=num_floors).start()
+    port = serial.Serial(emulator.port, BAUD_RATE, timeout=0.1)
+    reader = SerialReader(port).start()
+    link = StatusLink(port.write)
+    controller = ElevatorController(VirtualClock(), floors=range(1, num_floors + 1), verbose=False)
+
+    pressed = deque()  # 尚未被處理的按鈕送出時間
+    latencies = []
+
+    def poll():
+        for kind, line in reader.drain():
+            if kind == "ACK":
+                link.acknowledge(line)
+            elif kind == "BUTTON" and line[len("BUTTON:"):].isdigit():
+                controller.add_request(int(line[len("BUTTON:"):]), ButtonType.INTERNAL)
+                latencies.append(time.perf_counter() - pressed.popleft())
+        link.update(controller.get_current_module_status(), controller.current_floor,
+                    controller.direction.name, controller.target_floor or controller.current_floor)
+
+    start = time.perf_counter()
+    next_press = next_poll = start
+    while time.perf_counter() - start < duration:
+        now = time.perf_counter()
+        if now >= next_press:
+            pressed.append(emulator.press_button(rng.randint(1, num_floors)))
+            next_press += rng.expovariate(rate)
+        if now >= next_poll:
+            poll()
+            next_poll += poll_interval
+        time.sleep(max(0.0, min(next_press, next_poll) - time.perf_counter()))
+    deadline = time.perf_counter() + 1.0
+    while pressed and time.perf_counter() < deadline:
+        time.sleep(poll_interval)
+        poll()
+
+    reader.stop()
+    port.close()
+    emulator.close()
+    return latencies, {
+        "pressed": len(latencies) + len(pressed),
+        "handled": len(latencies),
+        "lines_read": reader.lines_read,
+        "lines_ignored": reader.lines_ignored,
+        "lines_unknown": reader.lines_unknown,
+        "events_dropped": reader.events_dropped,
+        "frames_sent": link.frames_sent,
+        "frames_acked": link.frames_acked,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="車廂模組模擬器")
+    parser.add_argument("--serve", action="store_true", help="只啟動模擬器並印出虛擬序列埠，供 main.py --port 使用")
+    parser.add_argument("--floors", type=int, default=3, help="樓層按鈕數")
+    parser.add_argument("--rate", type=float, default=20.0, help="每秒按鈕次數")
+    parser.add_argument("--duration", type=float, default=5.0, help="測試秒數")
+    parser.add_argument("--poll", type=float, default=0.1, help="主迴圈處理事件的間隔（秒）")
+    args = parser.parse_args()
+
+    if args.serve:
+        emulator = CarModuleEmulator(num_floors=args.floors).start()
+        print(f"車廂模組模擬器：{emulator.port}（輸入樓層號碼按按鈕，e 切換緊急模式，q 結束）")
+        try:
+            for command in iter(input, "q"):
+                if command == "e":
+                    emulator.press_emergency()
+                elif command.isdigit():
+                    emulator.press_button(int(command))
+        except (EOFError, KeyboardInterrupt):
+            pass
+        emulator.close()
+    else:
+        latencies, counts = run_button_storm(args.rate, args.duration, args.poll, args.floors)
+        latencies.sort()
+        print(f"按鈕 {counts['pressed']} 次，處理 {counts['handled']} 次，"
+              f"佇列丟棄 {counts['events_dropped']} 次，未知訊息 {counts['lines_unknown']} 行")
+        print(f"狀態訊框送出 {counts['frames_sent']}，確認 {counts['frames_acked']}")
+        if latencies:
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+            print(f"延遲 p50 {percentile(0.5):.1f} ms，p95 {percentile(0.95):.1f} ms，"
+                  f"最大 {latencies[-1] * 1000:.1f} ms")
@@ -0,0 +1,354 @@
+"""區域網路控制介面：以 HTTP 注入請求，以 server-sent events 串流控制器狀態。
+
+只用標準函式庫的 asyncio，伺服器在自己的執行緒執行，不佔用控制迴圈：
+- POST /calls：一次送出多筆呼叫，JSON 為 {"calls": [...]} 或直接是陣列；
+  外部呼叫 {"floor": 3, "direction": "up"}，內部呼叫 {"floor": 5, "car": 0}（車廂索引從 0 開始）
+- GET /state：目前狀態的完整快照
+- GET /events：text/event-stream，連線後先送 snapshot，之後只送 delta
+
+控制器事件只在鎖內更新各車廂的狀態 dict 並標記為已變動；廣播在 asyncio 執行緒
+每 broadcast_interval 秒合併一次，只送出與上一次廣播不同的欄位，每次廣播只編碼一份，
+所有訂閱者共用。跟不上的訂閱者不會拖慢其他人：佇列滿時清空並改送一份新的快照。
+
+收到的呼叫放進佇列，由控制器所在的執行緒呼叫 process_commands() 套用。
+
+    python control_api.py --floors 10 --cars 3 --port 8080
+    curl -X POST localhost:8080/calls -d '[{"floor": 7, "direction": "down"}, {"floor": 2, "car": 1}]'
+    curl -N localhost:8080/events
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+from elevator_core import ButtonType
+
+logger = logging.getLogger(__name__)
+
+HALL_DIRECTIONS = {"up": ButtonType.UP, "down": ButtonType.DOWN}
+MAX_BODY = 1024 * 1024
+MAX_BATCH = 1000  # 一次最多接受的呼叫數
+KEEPALIVE = 15.0  # 沒有狀態變化時送出註解行的間隔（秒），順便發現已斷線的訂閱者
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large"}
+
+
+def _car_state(car):
+    return {
+        "floor": car.current_floor,
+        "position": round(car.position, 2),
+        "direction": car.direction.name,
+        "target": car.target_floor if car.target_floor else car.current_floor,
+        "status": car.get_current_module_status(),
+    }
+
+
+def _sse_frame(event, seq, payload):
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"event: {event}\nid: {seq}\ndata: {data}\n\n".encode("utf-8")
+
+
+def _is_int(value):
+    # bool 是 int 的子類別，JSON 的 true／false 不能當成樓層或車廂
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_calls(payload, building):
+    """把 POST /calls 的內容轉成 [(樓層, ButtonType, 車廂索引或 None)]，回傳 (calls, 錯誤列表)。"""
+    items = payload.get("calls") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ValueError("需要 calls 陣列")
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"一次最多 {MAX_BATCH} 筆呼叫")
+    hall_buttons = set(building.hall_buttons())
+    calls, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("呼叫必須是物件")
+            if "floor" not in item:
+                raise ValueError("缺少 floor")
+            floor = item["floor"]
+            if not _is_int(floor) or floor not in building.floors:
+                raise ValueError(f"樓層 {floor!r} 不存在")
+            if "car" in item:
+                car = item["car"]
+                if not _is_int(car) or not 0 <= car < building.num_cars:
+                    raise ValueError(f"車廂 {car!r} 不存在")
+                calls.append((floor, ButtonType.INTERNAL, car))
+            else:
+                direction = item.get("direction")
+                button_type = HALL_DIRECTIONS.get(direction) if isinstance(direction, str) else None
+                if button_type is None:
+                    raise ValueError("外部呼叫需要 direction（up 或 down）")
+                if (floor, button_type) not in hall_buttons:
+                    raise ValueError(f"{floor} 樓沒有 {direction} 按鈕")
+                calls.append((floor, button_type, None))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    return calls, errors
+
+
+class _Subscriber:
+    def __init__(self, backlog):
+        self.queue = asyncio.Queue(maxsize=backlog)
+        self.resyncs = 0
+
+
+class ControlServer:
+    """GroupController 的 HTTP／SSE 介面。
+
+    broadcast_interval：合併狀態變化後廣播的間隔（秒）
+    backlog：每個訂閱者最多排隊幾則尚未送出的訊息，超過時改送快照
+    """
+
+    def __init__(self, group, host="127.0.0.1", port=8080, broadcast_interval=0.1, backlog=32):
+        self.group = group
+        self.host = host
+        self.port = port
+        self.broadcast_interval = broadcast_interval
+        self.backlog = backlog
+        self.commands = queue.SimpleQueue()
+        self.calls_received = 0
+        self.broadcasts = 0
+
+        self._lock = threading.Lock()
+        self._state = [_car_state(car) for car in group.cars]  # 控制器執行緒寫入
+        self._dirty = set()
+        self._sent = [dict(state) for state in self._state]  # 上一次廣播時的狀態（asyncio 執行緒）
+        self._seq = 0
+        self._snapshot = None  # (seq, 編碼好的快照)
+        self._subscribers = set()
+        self._loop = None
+        self._serve_task = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        group.subscribe(self._on_event)
+
+    # --- 控制器執行緒 ---
+
+    def _on_event(self, car, event, *args):
+        if event == "position":
+            changes = {"position": round(args[0], 2)}
+        elif event == "status":
+            status, floor, direction, target = args
+            changes = {"status": status, "floor": floor, "direction": direction.name, "target": target}
+        elif event == "arrived":
+            changes = {"floor": args[0]}
+        else:
+            return
+        with self._lock:
+            state = self._state[car]
+            if any(state[key] != value for key, value in changes.items()):
+                state.update(changes)
+                self._dirty.add(car)
+
+    def process_commands(self):
+        """套用佇列中的呼叫（在控制器所在的執行緒呼叫），回傳套用的筆數。"""
+        count = 0
+        while True:
+            try:
+                floor, button_type, car = self.commands.get_nowait()
+            except queue.Empty:
+                return count
+            if car is None:
+                self.group.add_hall_call(floor, button_type)
+            else:
+                self.group.add_car_call(car, floor)
+            count += 1
+
+    # --- asyncio 執行緒 ---
+
+    def start(self):
+        """在背景執行緒啟動伺服器，等到開始接受連線後回傳 self；port 為 0 時會更新成實際的埠號。"""
+        self._thread = threading.Thread(target=self._run, name="control-api", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._serve())
+        finally:
+            # 結束時取消仍在串流的連線
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+    async def _serve(self):
+        self._serve_task = asyncio.current_task()
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()  # 綁定失敗時也不要讓 start() 永遠等待
+        broadcaster = asyncio.ensure_future(self._broadcast_loop())
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            broadcaster.cancel()
+            self._server.close()
+
+    async def _broadcast_loop(self):
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                current = {car: dict(self._state[car]) for car in dirty}
+            changes = {}
+            for car, state in current.items():
+                diff = {key: value for key, value in state.items() if self._sent[car][key] != value}
+                if diff:
+                    changes[str(car)] = diff
+                    self._sent[car].update(diff)
+            if not changes:
+                continue
+            self._seq += 1
+            self.broadcasts += 1
+            frame = _sse_frame("delta", self._seq, {"seq": self._seq, "cars": changes})
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.queue.put_nowait((self._seq, frame))
+                except asyncio.QueueFull:
+                    # 跟不上的訂閱者丟棄排隊中的 delta，下一則改送快照
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait((self._seq, None))
+                    subscriber.resyncs += 1
+
+    def _snapshot_payload(self):
+        return {"seq": self._seq, "cars": self._sent}
+
+    def _snapshot_frame(self):
+        """目前 seq 的快照，同一個 seq 只編碼一次。"""
+        if self._snapshot is None or self._snapshot[0] != self._seq:
+            self._snapshot = (self._seq, _sse_frame("snapshot", self._seq, self._snapshot_payload()))
+        return self._snapshot[1]
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            path = path.split("?")[0]
+            if path == "/events" and method == "GET":
+                await self._stream(writer)
+            elif path == "/state" and method == "GET":
+                await self._respond(writer, 200, self._snapshot_payload())
+            elif path == "/calls" and method == "POST":
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "內容過大"})
+                else:
+                    await self._accept_calls(writer, await reader.readexactly(length))
+            elif path in ("/events", "/state", "/calls"):
+                await self._respond(writer, 405, {"error": f"不支援 {method}"})
+            else:
+                await self._respond(writer, 404, {"error": f"{path} 不存在"})
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError,
+                asyncio.CancelledError):  # 伺服器停止時取消串流中的連線
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _accept_calls(self, writer, body):
+        try:
+            calls, errors = parse_calls(json.loads(body), self.group.building)
+        except ValueError as e:  # json.JSONDecodeError 也是 ValueError
+            await self._respond(writer, 400, {"error": str(e)})
+            return
+        for call in calls:
+            self.commands.put(call)
+        self.calls_received += len(calls)
+        await self._respond(writer, 202, {"accepted": len(calls), "rejected": errors})
+
+    async def _stream(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\n\r\n")
+        subscriber = _Subscriber(self.backlog)
+        self._subscribers.add(subscriber)
+        try:
+            synced = self._seq
+            writer.write(self._snapshot_frame())
+            await writer.drain()
+            while True:
+                try:
+                    seq, frame = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                if frame is None:
+                    synced = self._seq
+                    frame = self._snapshot_frame()
+                elif seq <= synced:
+                    continue  # 已包含在剛送出的快照中
+                writer.write(frame)
+                await writer.drain()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._serve_task.cancel)
+        self._thread.join(timeout=2.0)
+        self._thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from elevator_core import ElevatorController, VirtualClock
+    from group_dispatch import Building, GroupController
+
+    parser = argparse.ArgumentParser(description="以即時虛擬時鐘執行群組控制器並提供 HTTP／SSE 介面")
+    parser.add_argument("--floors", type=int, default=10, help="樓層數")
+    parser.add_argument("--cars", type=int, default=3, help="車廂數")
+    parser.add_argument("--host", default="127.0.0.1", help="監聽位址（0.0.0.0 開放給區域網路）")
+    parser.add_argument("--port", type=int, default=8080, help="監聽埠")
+    parser.add_argument("--interval", type=float, default=0.1, help="廣播間隔（秒）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    clock = VirtualClock(time.time())
+    group = GroupController(clock, Building(args.floors, args.cars), verbose=False)
+    server = ControlServer(group, args.host, args.port, broadcast_interval=args.interval).start()
+    print(f"http://{args.host}:{server.port}/events（Ctrl+C 結束）")
+    try:
+        while True:
+            server.process_commands()
+            clock.run_until(time.time())
+            time.sleep(ElevatorController.FRAME_INTERVAL)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,119 @@
+"""依電梯狀態調整偵測頻率，並以低成本的畫面差異判斷是否需要完整偵測。
+
+完整的突破量偵測（MOG2、模糊、兩次形態學運算）只在乘客可能改變時才有意義：
+- doors_open：剛抵達、門開著讓乘客進出，維持最高頻率，不延遲滿載判斷
+- emergency：緊急模式中持續追蹤突破量是否降低
+- idle：沒有請求、門關著待命，乘客不會改變，大幅降低頻率
+- moving：行進中門關著，只做低頻率的確認
+
+到了排程時間後，先把畫面縮成很小的灰階圖，與上一次完整偵測時的參考圖比較平均差異；
+差異低於 change_threshold 時沿用上一次的突破量，不執行完整偵測。
+為了讓背景模型持續更新，距離上一次完整偵測超過 max_skip 秒時一律執行。
+"""
+import cv2
+import numpy as np
+
+STATES = ("idle", "doors_open", "moving", "emergency")
+
+
+class ChangeGate:
+    """以縮小的灰階畫面判斷場景是否有變化。
+
+    size：比較用的縮圖大小 (寬, 高)
+    threshold：平均灰階差異（0~255）超過此值才算有變化
+    """
+
+    def __init__(self, size=(32, 24), threshold=3.0):
+        self.size = tuple(size)
+        self.threshold = threshold
+        self.reference = None
+        self._small = np.empty(self.size[::-1], np.uint8)
+        self._gray = None
+        self._diff = np.empty_like(self._small)
+
+    def _downsample(self, frame):
+        if frame.ndim == 3:
+            if self._gray is None or self._gray.shape != frame.shape[:2]:
+                self._gray = np.empty(frame.shape[:2], np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            frame = self._gray
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        return self._small
+
+    def changed(self, frame):
+        """與參考圖比較；沒有參考圖時視為有變化。"""
+        small = self._downsample(frame)
+        if self.reference is None:
+            return True
+        cv2.absdiff(small, self.reference, dst=self._diff)
+        return float(self._diff.mean()) >= self.threshold
+
+    def update_reference(self):
+        """把最近一次 changed() 的縮圖設為參考圖（完整偵測後呼叫）。"""
+        if self.reference is None:
+            self.reference = self._small.copy()
+        else:
+            self.reference[...] = self._small
+
+    def reset(self):
+        self.reference = None
+
+
+class DetectionScheduler:
+    """決定這一次是否執行完整偵測。
+
+    intervals：{狀態: 兩次完整偵測的最短間隔（秒）}，未指定的狀態使用 INTERVALS
+    door_open_time：抵達後視為開門的秒數
+    max_skip：變化判斷最多可以連續略過幾秒
+    """
+
+    INTERVALS = {"idle": 1.0, "doors_open": 0.1, "moving": 2.0, "emergency": 0.2}
+
+    def __init__(self, intervals=None, door_open_time=8.0, max_skip=5.0, gate=None):
+        self.intervals = dict(self.INTERVALS, **(intervals or {}))
+        self.door_open_time = door_open_time
+        self.max_skip = max_skip
+        self.gate = ChangeGate() if gate is None else gate
+        self.last_arrival = None
+        self.last_run = None
+        self.frames_checked = 0
+        self.frames_gated = 0  # 到了排程時間但畫面沒有變化而略過的次數
+        self.frames_run = 0
+
+    def on_arrival(self, now):
+        """車廂抵達樓層（開門）時呼叫。"""
+        self.last_arrival = now
+
+    def state(self, controller, now):
+        if controller.full_load:
+            return "emergency"
+        if controller.is_moving_flag:
+            return "moving"
+        if self.last_arrival is not None and now - self.last_arrival < self.door_open_time:
+            return "doors_open"
+        return "idle"
+
+    def should_run(self, frame, controller, now, force=False):
+        """是否要對 frame 執行完整偵測；回傳 False 時沿用上一次的突破量。
+
+        force 為 True 時（例如背景基準建立中）一律執行。
+        """
+        self.frames_checked += 1
+        if not force and self.last_run is not None:
+            if now - self.last_run < self.intervals[self.state(controller, now)]:
+                return False
+            changed = self.gate.changed(frame)
+            if not changed and now - self.last_run < self.max_skip:
+                self.frames_gated += 1
+                return False
+        else:
+            self.gate.changed(frame)  # 更新縮圖，作為下一次比較的參考
+        self.gate.update_reference()
+        self.last_run = now
+        self.frames_run += 1
+        return True
+
+    def reset(self):
+        """背景重設後呼叫，下一張畫面立刻執行完整偵測。"""
+        self.gate.reset()
+        self.last_run = None
@@ -0,0 +1,157 @@
+"""派車策略：決定車廂的下一個停靠樓層、行進中的順路停靠，以及外部呼叫指派給哪台車廂。
+
+策略只讀取車廂（ElevatorController）的狀態並回傳決定，移動與緊急模式仍由控制器處理：
+緊急模式中控制器只前往第一個內部請求，不會詢問策略。
+
+- NearestStopPolicy：原本的規則（預設）。沿行進方向取最近的請求，沒有時取最近的請求；
+  行進中攔截前方同方向的請求；外部呼叫指派給 ETA 最短的車廂。
+- LookAheadPolicy：以動態規劃比較各種停靠順序，選擇預估乘客總等待時間最短的順序，
+  子問題結果會記住重複使用；子問題數超過每次決策的上限時退回 NearestStopPolicy 的決定。
+  實驗用，不建議取代預設值：成本模型不考慮呼叫方向，指派仍沿用 ETA 最短，
+  在一般負載的基準測試上沒有可量測的改善，只有超載的上行尖峰提高運輸能力
+  （見 LookAheadPolicy 說明）。
+"""
+import math
+import time
+from collections import Counter
+
+from elevator_core import DOWN_TYPES, INTERNAL_TYPES, UP_TYPES, Direction
+
+
+class NearestStopPolicy:
+    """原本的派車規則。"""
+
+    def next_stop(self, car):
+        """停止中的車廂下一個要前往的樓層，沒有請求時回傳 None。"""
+        if car.direction == Direction.UP:
+            upper_stop = car.requests.nearest_above(car.current_floor)
+            if upper_stop is not None:
+                return upper_stop
+        elif car.direction == Direction.DOWN:
+            lower_stop = car.requests.nearest_below(car.current_floor)
+            if lower_stop is not None:
+                return lower_stop
+        return car.requests.nearest(car.current_floor)
+
+    def intermediate_stop(self, car):
+        """行進中可以改為先停靠的樓層，沒有時回傳 None。"""
+        if car.direction == Direction.UP:
+            # 還停得下、低於目前目標的最低同向請求
+            types = INTERNAL_TYPES if car.full_load else UP_TYPES
+            floor = car.requests.nearest_above(car.stoppable_floor() - 1, types)
+            if floor is not None and floor < car.target_floor:
+                return floor
+        elif car.direction == Direction.DOWN:
+            types = INTERNAL_TYPES if car.full_load else DOWN_TYPES
+            floor = car.requests.nearest_below(car.stoppable_floor() + 1, types)
+            if floor is not None and floor > car.target_floor:
+                return floor
+        return None
+
+    def assign(self, cars, floor, button_type):
+        """外部呼叫要指派的車廂索引與其 ETA。"""
+        best, best_eta = 0, None
+        for index, car in enumerate(cars):
+            eta = car.estimate_arrival(floor, button_type)
+            if best_eta is None or eta < best_eta:
+                best, best_eta = index, eta
+        return best, best_eta
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class LookAheadPolicy(NearestStopPolicy):
+    """以預估乘客總等待時間選擇停靠順序。
+
+    每個有請求的樓層依請求數加權；從目前位置出發，每一段移動（travel_time + ARRIVAL_DELAY）
+    的時間由所有尚未服務的請求一起等待。max_floors 限制一次最多考慮幾個最近的樓層，
+    max_states 為每次決策最多計算的子問題數；決定只取決於車廂狀態，與主機速度無關，
+    虛擬時鐘的模擬與日誌重播可以重現。time_budget（秒）是額外的實際時間上限，
+    只適合即時執行的 GUI，預設為 None（不限制）。
+
+    成本模型只看各樓層的請求數，不考慮外部呼叫的方向（上車乘客接著要往哪裡），
+    外部呼叫的指派也與 NearestStopPolicy 相同（ETA 最短，不計對車廂既有請求的影響）。
+    以 traffic.py 量測（平均等待／旅程秒數，停靠/趟）：
+    - 10F-2car-up：nearest 14.8／33.5，lookahead 15.2／33.4
+    - 20F-4car-poisson：nearest 14.5／48.4／1.87，lookahead 14.9／49.5／1.98
+    - 10 層單車廂 inter_floor 0.2 人/秒（種子 1–4）：平均等待兩者相差在 ±1.5 秒內，互有勝負
+    - 10F-2car-up-sat（超載，車廂限載 13 人，種子 6–10）：5 分鐘最大送達
+      nearest 90–107，lookahead 98–116；平均等待 385–622 秒降為 341–446 秒
+    改用「新增呼叫造成的總等待增量」指派也只在雜訊範圍內變動。一般負載下沒有好處、
+    計算量較大，因此預設仍為 NearestStopPolicy。
+    """
+
+    def __init__(self, max_floors=7, max_states=2000, time_budget=None):
+        self.max_floors = max_floors
+        self.max_states = max_states
+        self.time_budget = time_budget
+        self.decisions = 0
+        self.fallbacks = 0  # 超過上限而改用 NearestStopPolicy 的次數
+
+    def _weights(self, car, position):
+        weights = Counter(request.floor for request in car.requests.requests(car.active_types()))
+        floors = sorted(weights, key=lambda f: abs(f - position))[:self.max_floors]
+        return {floor: weights[floor] for floor in floors}
+
+    def _solver(self, car, weights):
+        """回傳 cost(position, remaining) -> (總等待, 下一站)，同一次決策內記住子問題。"""
+        memo = {}
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+
+        def leg(start, end):
+            return car.travel_time(start, end) + car.ARRIVAL_DELAY
+
+        def cost(position, remaining):
+            if not remaining:
+                return 0.0, None
+            key = (position, remaining)
+            if key in memo:
+                return memo[key]
+            if len(memo) >= self.max_states or (deadline is not None and time.perf_counter() > deadline):
+                raise _BudgetExceeded
+            waiting = sum(weights[f] for f in remaining)
+            best = (math.inf, None)
+            for floor in sorted(remaining, key=lambda f: abs(f - position)):
+                total = waiting * leg(position, floor) + cost(floor, remaining - {floor})[0]
+                if total < best[0]:
+                    best = (total, floor)
+            memo[key] = best
+            return best
+
+        return cost
+
+    def next_stop(self, car):
+        weights = self._weights(car, car.current_floor)
+        if not weights:
+            return None
+        self.decisions += 1
+        try:
+            return self._solver(car, weights)(car.current_floor, frozenset(weights))[1]
+        except _BudgetExceeded:
+            self.fallbacks += 1
+            return super().next_stop(car)
+
+    def intermediate_stop(self, car):
+        """只在先停順路樓層的預估總等待不比直接前往目標多時才攔截。"""
+        candidate = super().intermediate_stop(car)
+        if candidate is None or car.full_load:
+            return candidate
+        weights = self._weights(car, car.target_floor)
+        weights.setdefault(candidate, 1)
+        weights.setdefault(car.target_floor, 0)
+        remaining = frozenset(weights)
+        self.decisions += 1
+        try:
+            cost = self._solver(car, weights)
+            # 兩種順序抵達第一站所需的剩餘時間相同，只需比較之後的部分
+            via_candidate = cost(candidate, remaining - {candidate})[0]
+            direct = cost(car.target_floor, remaining - {car.target_floor})[0]
+        except _BudgetExceeded:
+            self.fallbacks += 1
+            return candidate
+        return candidate if via_candidate <= direct else None
+
+
+POLICIES = {"nearest": NearestStopPolicy, "lookahead": LookAheadPolicy}
@@ -0,0 +1,598 @@
+"""電梯控制核心：與 Tkinter 無關的離散事件模擬引擎。
+
+控制邏輯（派車、中途停靠、緊急模式）全部在這裡，透過 clock 物件排程事件：
+- VirtualClock：虛擬時鐘 + 事件佇列，可在無顯示器環境下以遠快於實際時間的速度執行
+- TkClock：以 master.after() 即時驅動，給 GUI 使用
+
+GUI、Arduino 序列埠、音效等都只是透過 subscribe() 註冊的訂閱者。
+"""
+import heapq
+import itertools
+import logging
+import math
+import random
+import time
+from collections import deque
+from enum import Enum
+
+from metrics import CONTROLLER_METRICS, ControllerMetrics
+from motion import MotionProfile
+from request_index import RequestIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ButtonType(Enum):
+    UP = 1
+    DOWN = -1
+    INTERNAL = 0
+
+
+class Direction(Enum):
+    UP = 1
+    DOWN = -1
+    IDLE = 0
+
+
+class Request:
+    def __init__(self, floor, button_type, timestamp=None):
+        self.floor = floor
+        self.button_type = button_type
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+
+INTERNAL_TYPES = (ButtonType.INTERNAL,)
+EXTERNAL_TYPES = (ButtonType.UP, ButtonType.DOWN)
+ALL_TYPES = INTERNAL_TYPES + EXTERNAL_TYPES
+UP_TYPES = (ButtonType.INTERNAL, ButtonType.UP)  # 上行時可中途停靠的請求
+DOWN_TYPES = (ButtonType.INTERNAL, ButtonType.DOWN)  # 下行時可中途停靠的請求
+
+
+class VirtualClock:
+    """虛擬時鐘：事件依時間排序，執行時直接跳到下一個事件的時間點。"""
+
+    realtime = False
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._queue = []
+        self._seq = itertools.count()
+
+    def now(self):
+        return self._now
+
+    def call_later(self, delay, callback, *args):
+        heapq.heappush(self._queue, (self._now + delay, next(self._seq), callback, args))
+
+    def pending(self):
+        return len(self._queue)
+
+    def step(self):
+        """執行下一個事件，佇列為空時回傳 False。"""
+        if not self._queue:
+            return False
+        when, _, callback, args = heapq.heappop(self._queue)
+        self._now = when
+        callback(*args)
+        return True
+
+    def run_until(self, end_time):
+        """執行所有在 end_time 之前（含）的事件，並把時間推進到 end_time。"""
+        while self._queue and self._queue[0][0] <= end_time:
+            self.step()
+        self._now = max(self._now, end_time)
+
+    def run(self, max_events=None):
+        """執行到佇列清空（或達到 max_events），回傳執行的事件數。"""
+        count = 0
+        while (max_events is None or count < max_events) and self.step():
+            count += 1
+        return count
+
+
+class TkClock:
+    """即時時鐘：以 Tk 的 after() 排程，讓 GUI 與核心共用同一套控制邏輯。"""
+
+    realtime = True
+
+    def __init__(self, master):
+        self.master = master
+
+    def now(self):
+        return time.time()
+
+    def call_later(self, delay, callback, *args):
+        self.master.after(int(delay * 1000), callback, *args)
+
+
+def default_metrics(clock):
+    """即時時鐘使用全域的 CONTROLLER_METRICS；其他時鐘（模擬、重播）使用獨立的一份。"""
+    return CONTROLLER_METRICS if getattr(clock, "realtime", False) else ControllerMetrics()
+
+
+class ElevatorController:
+    """單車廂電梯控制器，車廂位置以樓層為單位保存在 position。
+
+    floors 必須是連續的樓層號碼（例如 range(1, 51)）。
+    motion 為 MotionProfile，預設依樓層數以預設的速度、加速度與 jerk 建立。
+    metrics 為 metrics.ControllerMetrics，預設為 default_metrics(clock)。
+    """
+
+    FRAME_INTERVAL = 0.05   # 每 50ms 更新一次
+    CHECK_INTERVAL = 20     # 行進中每 20 幀（約 1 秒）發送一次狀態
+    REQUEST_DELAY = 0.1     # 新請求後開始處理的延遲
+    ARRIVAL_DELAY = 0.5     # 抵達後處理下一個請求的延遲
+
+    def __init__(self, clock, floors=(1, 2, 3), penetration_threshold=0.50, verbose=True, policy=None,
+                 motion=None, metrics=None):
+        self.clock = clock
+        self.metrics = default_metrics(clock) if metrics is None else metrics
+        self.floors = tuple(floors)
+        self.verbose = verbose
+        if motion is None:
+            motion = MotionProfile(len(self.floors), frame_interval=self.FRAME_INTERVAL)
+        self.motion = motion
+        if policy is None:
+            from dispatch_policy import NearestStopPolicy  # dispatch_policy 依賴本模組，延後匯入
+            policy = NearestStopPolicy()
+        self.policy = policy
+
+        self.current_floor = self.floors[0]
+        self.position = float(self.current_floor)
+        self.target_floor = None
+        self.final_target_floor = None
+        self.direction = Direction.IDLE
+        self.is_moving_flag = False
+
+        # 內部請求排在外部請求之前，與原本 internal_requests + external_requests 的順序一致
+        self.requests = RequestIndex(((ButtonType.INTERNAL,), (ButtonType.UP, ButtonType.DOWN)))
+        self.pending_external_requests = deque()
+
+        self.full_load = False
+        self.manual_emergency = False
+        self.auto_emergency = False
+        self.auto_emergency_active = False  # 追蹤自動緊急模式是否正在執行
+
+        self.penetration_ratio = 0
+        self.penetration_threshold = penetration_threshold
+
+        self._listeners = []
+        self._process_scheduled = False
+
+    # --- 訂閱者 ---
+
+    def subscribe(self, listener):
+        """註冊訂閱者，listener(event, *args)。
+
+        事件：status(status, floor, direction, target)、info(text)、
+        position(position)、arrived(floor)
+        輸入事件（給 journal 記錄與重播）：request(floor, button_type)、
+        emergency(enabled)、penetration(ratio)；penetration 只在突破量越過閾值
+        或改變自動緊急模式時發出，其餘呼叫不影響狀態
+        """
+        self._listeners.append(listener)
+
+    def _emit(self, event, *args):
+        for listener in self._listeners:
+            listener(event, *args)
+
+    def _log(self, message):
+        if self.verbose:
+            logger.info(message)
+
+    def notify_status(self):
+        target = self.target_floor if self.target_floor else self.current_floor
+        self._emit("status", self.get_current_module_status(), self.current_floor, self.direction, target)
+
+    def _info(self, text):
+        self._emit("info", text)
+
+    # --- 狀態 ---
+
+    def get_current_module_status(self):
+        """根據電梯狀態決定要傳送給模組的狀態字串。"""
+        if self.manual_emergency:
+            return "EMERGENCY"  # 手動緊急優先級最高
+        elif self.auto_emergency:
+            return "FULL"  # 自動偵測滿載
+        else:
+            return "NORMAL"
+
+    @property
+    def internal_requests(self):
+        return self.requests.requests(INTERNAL_TYPES)
+
+    @property
+    def external_requests(self):
+        return self.requests.requests(EXTERNAL_TYPES)
+
+    def active_types(self):
+        """目前參與派車的按鈕種類；緊急模式只處理內部請求。"""
+        return INTERNAL_TYPES if self.full_load else ALL_TYPES
+
+    def get_active_requests(self):
+        return self.requests.requests(self.active_types())
+
+    def get_status_text(self):
+        if self.full_load:
+            first = self.requests.first(ButtonType.INTERNAL)
+            if first is None:
+                return f"🚨 緊急模式：在 {self.current_floor} 樓待命，等待緊急內部請求"
+            else:
+                target = first.floor
+                if self.is_moving_flag:
+                    return f"🚨 緊急救援：前往 {target} 樓"
+                else:
+                    return f"🚨 緊急模式：準備前往 {target} 樓"
+        else:
+            active = self.get_active_requests()
+            reqs = "無請求" if not active else ", ".join(f"{req.floor}({req.button_type.name})" for req in active)
+            overall = "啟動" if self.full_load else "解除"
+            manual = "啟動" if self.manual_emergency else "解除"
+            auto = "啟動" if self.auto_emergency else "解除"
+            return (f"{'Moving' if self.is_moving_flag else 'IDLE'}（{self.current_floor} 樓），請求：{reqs}；"
+                    f" Emergency Mode(All:{overall}, Manual:{manual}, Auto:{auto})")
+
+    # --- 緊急模式 ---
+
+    def update_emergency_mode(self):
+        prev_full_load = self.full_load
+        self.full_load = self.manual_emergency or self.auto_emergency
+        if self.full_load and not prev_full_load:
+            self.metrics.emergency_activations.inc()
+        if prev_full_load != self.full_load:
+            self.notify_status()
+        if prev_full_load and not self.full_load and self.is_moving_flag:
+            # 緊急模式期間不攔截，解除後立刻檢查前方的請求
+            self._check_intermediate_stop()
+
+    def _resume_pending_requests(self):
+        # 仍在緊急模式（例如手動解除但自動緊急仍啟動）時繼續暫存，否則 _add_request 會再放回佇列
+        if self.full_load or not self.pending_external_requests:
+            return
+        pending, self.pending_external_requests = self.pending_external_requests, deque()
+        self._log(f"重新處理 {len(pending)} 個暫存的外部請求")
+        for req in pending:
+            # 保留原本的 Request，等待時間從按下按鈕時起算（含緊急模式期間）
+            self._queue_request(req)
+
+    def set_manual_emergency(self, enabled):
+        self._emit("emergency", enabled)
+        prev_emergency = self.full_load
+        self.manual_emergency = enabled
+        self.update_emergency_mode()
+
+        if self.manual_emergency:
+            self._log("🚨 手動：電梯已進入緊急模式 - 等待緊急內部請求")
+        else:
+            self._log("✅ 手動：電梯已解除緊急模式")
+            if prev_emergency and not self.full_load:
+                self._log("電梯從緊急待命狀態恢復正常運作")
+                self._resume_pending_requests()
+                if not self.is_moving_flag:
+                    self.schedule_processing()
+
+        self.notify_status()
+
+    def update_penetration(self, penetration_ratio):
+        """輸入最新突破量（百分比），依閾值自動啟動／解除緊急模式。"""
+        before = (self.penetration_ratio / 100 >= self.penetration_threshold, self.auto_emergency)
+        self.penetration_ratio = penetration_ratio
+        if self.penetration_ratio / 100 >= self.penetration_threshold:
+            if not self.auto_emergency:
+                self._log(f"偵測到突破量 {self.penetration_ratio:.2f}% 已超過閾值 {self.penetration_threshold * 100:.0f}%")
+                self._log("🚨 自動啟動緊急模式 (滿載)")
+                self.auto_emergency = True
+                self.auto_emergency_active = True  # 標記自動緊急模式已啟動
+                self.notify_status()
+        else:
+            # 只有在電梯靜止且自動緊急模式已啟動時才解除
+            if self.auto_emergency and not self.is_moving_flag and self.auto_emergency_active:
+                prev_emergency = self.full_load
+                self._log(f"偵測到突破量 {self.penetration_ratio:.2f}% 已低於閾值 {self.penetration_threshold * 100:.0f}%")
+                self._log("✅ 自動解除緊急模式")
+                self.auto_emergency = False
+                self.auto_emergency_active = False  # 標記自動緊急模式已解除
+                self.update_emergency_mode()
+                self.notify_status()
+
+                if prev_emergency and not self.full_load:
+                    self._log("電梯從緊急待命狀態恢復正常運作")
+                    self._resume_pending_requests()
+                    if not self.is_moving_flag:
+                        self.schedule_processing()
+
+        self.update_emergency_mode()
+        if (self.penetration_ratio / 100 >= self.penetration_threshold, self.auto_emergency) != before:
+            self._emit("penetration", penetration_ratio)
+
+    # --- 請求 ---
+
+    def add_request(self, floor, button_type):
+        self._emit("request", floor, button_type)
+        self._add_request(floor, button_type)
+
+    def _add_request(self, floor, button_type):
+        if floor == self.current_floor and button_type == ButtonType.INTERNAL:
+            self._log(f"忽略當前樓層 {floor} 的內部請求。")
+            return
+
+        self._queue_request(Request(floor, button_type, self.clock.now()))
+
+    def _queue_request(self, new_request):
+        """把請求加入索引（緊急模式時依規則接受、忽略或暫存），並安排處理。"""
+        floor, button_type = new_request.floor, new_request.button_type
+        if button_type == ButtonType.INTERNAL:
+            if self.full_load:
+                if self.requests.count(INTERNAL_TYPES) == 0:
+                    self.requests.add(new_request)
+                    self._log(f"緊急模式：接受緊急內部請求 - 樓層 {floor}")
+                else:
+                    self._log(f"緊急模式：忽略額外的內部請求 - 樓層 {floor}（緊急救援進行中）")
+                    return
+            else:
+                if self.requests.add(new_request):
+                    self._log(f"內部請求：樓層 {floor}")
+        else:
+            if self.full_load:
+                self.pending_external_requests.append(new_request)
+                self._log(f"外部請求：樓層 {floor}（緊急模式，暫存）")
+            else:
+                if self.requests.add(new_request):
+                    self._log(f"外部請求：樓層 {floor}，方向：{button_type.name}")
+
+        self._info(f"Status：{self.get_status_text()}")
+        if not self.is_moving_flag:
+            self.schedule_processing()
+        elif not self.full_load:
+            # 新請求一進來就判斷是否順路停靠，不必等下一次定期檢查
+            self._check_intermediate_stop()
+
+    def schedule_processing(self, delay=None):
+        """排程 process_requests，同一時間只保留一個待執行的排程。"""
+        if self._process_scheduled:
+            return
+        self._process_scheduled = True
+        self.clock.call_later(self.REQUEST_DELAY if delay is None else delay, self._run_processing)
+
+    def _run_processing(self):
+        self._process_scheduled = False
+        self.process_requests()
+
+    def process_requests(self):
+        if self.is_moving_flag:
+            return
+        if not self.requests.mask(self.active_types()):
+            self._info(f"Status：waiting in {self.current_floor}F ")
+            self.direction = Direction.IDLE
+            self.notify_status()
+            return
+        next_stop = self.get_next_stop()
+        if next_stop is not None:
+            self.target_floor = next_stop
+            if self.target_floor > self.current_floor:
+                self.direction = Direction.UP
+            elif self.target_floor < self.current_floor:
+                self.direction = Direction.DOWN
+            else:
+                self.direction = Direction.IDLE
+            self._info(f"Moving {self.direction.name} to {self.target_floor} F")
+            self.notify_status()
+            self.start_movement(self.current_floor, self.target_floor)
+        else:
+            self._info("No next stop")
+
+    def get_next_stop(self):
+        if self.full_load:
+            return self.get_next_internal_stop()
+        return self.policy.next_stop(self)
+
+    def get_next_internal_stop(self):
+        first = self.requests.first(ButtonType.INTERNAL)
+        if first is None:
+            return None
+        target_floor = first.floor
+        self._log(f"Emergency Mode：moving to {target_floor} F")
+        return target_floor
+
+    def remove_completed_requests(self):
+        now = self.clock.now()
+        for request in self.requests.clear_floor(self.current_floor, self.active_types()):
+            self.metrics.request_wait.observe(now - request.timestamp)
+
+    # --- 移動 ---
+
+    def start_movement(self, start_floor, end_floor):
+        self.is_moving_flag = True
+        self.anim_start_floor = start_floor
+        self.anim_sign = 1 if end_floor >= start_floor else -1
+        self.animation_frame = 0
+        self.trajectory = self.motion.trajectory(end_floor - start_floor)
+        self.total_frames = len(self.trajectory)
+        self.movement_start_time = self.clock.now()
+        self._log(f"電梯開始移動：從 {start_floor} 樓到 {end_floor} 樓，"
+                  f"預計時間 {self.travel_time(start_floor, end_floor):.2f} 秒")
+
+        # 保存最終目標樓層，不讓中途停靠改變它
+        self.final_target_floor = end_floor
+        self.target_floor = end_floor
+        if not self.full_load:
+            self._check_intermediate_stop()
+        self._step()
+
+    def _check_intermediate_stop(self):
+        """檢查行進方向前方是否有可順路停靠的請求。"""
+        new_target = self.policy.intermediate_stop(self)
+
+        if new_target is not None:
+            self._log(f"中途請求：改為先停 {new_target} 樓")
+            # 只改變當前目標，不改變最終目標
+            self.target_floor = new_target
+            # 立即發送狀態更新
+            self.notify_status()
+            # 新軌跡在煞車點之前與原軌跡相同，從目前這一幀接續即可
+            self.trajectory = self.motion.trajectory(new_target - self.anim_start_floor)
+            self.total_frames = len(self.trajectory)
+
+    def stoppable_floor(self):
+        """行進中還來得及停靠的最近樓層（行進方向前方，最遠為目前目標）。"""
+        distance = min(self.motion.stopping_distance(self.animation_frame),
+                       abs(self.target_floor - self.anim_start_floor))
+        return self.anim_start_floor + self.anim_sign * distance
+
+    def _floor_at_position(self):
+        """依行進方向回傳車廂最後經過的樓層。"""
+        if self.direction == Direction.UP:
+            floor = math.floor(self.position + 1e-9)
+        elif self.direction == Direction.DOWN:
+            floor = math.ceil(self.position - 1e-9)
+        else:
+            return self.current_floor
+        return min(max(floor, self.floors[0]), self.floors[-1])
+
+    # --- 到達時間估計（給群組派車使用） ---
+
+    def travel_time(self, start_floor, end_floor):
+        """從靜止出發到停在 end_floor 的移動時間（查表）。"""
+        return self.motion.flight_time(end_floor - start_floor)
+
+    def has_request(self, floor, button_type):
+        return self.requests.contains(floor, button_type)
+
+    def estimate_arrival(self, floor, button_type):
+        """估計從現在起到車廂停靠 floor 所需的秒數。
+
+        依 get_next_stop 的規則模擬剩餘停靠順序（抵達後方向重設為 IDLE，所以每站取最近的請求），
+        緊急模式中的車廂不服務外部請求，回傳 inf。
+        """
+        if self.full_load and button_type != ButtonType.INTERNAL:
+            return math.inf
+
+        eta = 0.0
+        position = self.current_floor
+        if self.is_moving_flag:
+            elapsed = self.clock.now() - self.movement_start_time
+            remaining = self.travel_time(self.anim_start_floor, self.target_floor) - elapsed
+            # 行進方向前方、還停得下且同方向的呼叫會被中途停靠攔截
+            intercept = self.travel_time(self.anim_start_floor, floor) - elapsed
+            if self.direction == Direction.UP and button_type != ButtonType.DOWN:
+                if self.stoppable_floor() <= floor <= self.target_floor:
+                    return intercept
+            elif self.direction == Direction.DOWN and button_type != ButtonType.UP:
+                if self.target_floor <= floor <= self.stoppable_floor():
+                    return intercept
+            eta += remaining + self.ARRIVAL_DELAY
+            position = self.target_floor
+        elif self._process_scheduled:
+            eta += self.REQUEST_DELAY
+
+        stops = [f for f in self.requests.floors(self.active_types()) if f != position]
+        while stops:
+            if floor == position:
+                return eta
+            nearest = min(stops, key=lambda f: abs(f - position))
+            if abs(floor - position) <= abs(nearest - position):
+                break
+            eta += self.travel_time(position, nearest) + self.ARRIVAL_DELAY
+            position = nearest
+            stops = [f for f in stops if f != position]
+        return eta + self.travel_time(position, floor)
+
+    def _step(self):
+        if self.animation_frame < self.total_frames:
+            self.position = self.anim_start_floor + self.anim_sign * self.trajectory[self.animation_frame]
+            self.animation_frame += 1
+            self._emit("position", self.position)
+
+            # 更新當前樓層並發送狀態
+            current_floor = self._floor_at_position()
+            if current_floor != self.current_floor:
+                self.current_floor = current_floor
+                self.notify_status()
+
+            # 每20幀（約1秒）發送一次狀態更新
+            if self.animation_frame % self.CHECK_INTERVAL == 0:
+                self.notify_status()
+
+            self.clock.call_later(self.FRAME_INTERVAL, self._step)
+        else:
+            self._arrive()
+
+    def _arrive(self):
+        if self.target_floor is not None:
+            self.position = float(self.target_floor)
+            self.current_floor = self.target_floor
+            self._emit("position", self.position)
+        self.is_moving_flag = False
+        self.remove_completed_requests()
+
+        # 計算實際移動時間
+        actual_time = self.clock.now() - self.movement_start_time
+        self.metrics.trip_duration.observe(actual_time)
+        self._log(f"電梯已到達 {self.current_floor} 樓，實際移動時間：{actual_time:.2f} 秒")
+
+        self._emit("arrived", self.current_floor)
+
+        self.direction = Direction.IDLE
+        self.notify_status()
+
+        # 如果是自動緊急模式，在抵達目標樓層後重置狀態
+        if self.auto_emergency_active:
+            self._log("🎯 自動緊急模式：已抵達目標樓層，重置緊急模式狀態")
+            self.auto_emergency_active = False
+            # 檢查當前突破量，如果仍然超過閾值則保持緊急模式
+            if self.penetration_ratio / 100 < self.penetration_threshold:
+                self._log("✅ 突破量已降低，自動解除緊急模式")
+                self.auto_emergency = False
+                self.update_emergency_mode()
+                self.notify_status()
+            else:
+                self._log("⚠️ 突破量仍然過高，保持緊急模式")
+
+        if self.full_load:
+            self.requests.clear(INTERNAL_TYPES)
+            self._log("🚨 緊急救援完成！電梯將在此樓層待命，等待緊急情況解除")
+            self._info(f"緊急救援完成 - 在 {self.current_floor} 樓待命")
+            return
+
+        self._info(f"已到 {self.current_floor} 樓。{self.get_status_text()}")
+
+        if not self.full_load and self.pending_external_requests:
+            self._log("緊急模式已解除")
+            self._resume_pending_requests()
+
+        self.schedule_processing(self.ARRIVAL_DELAY)
+
+
+def run_headless(duration=24 * 3600, mean_interval=60.0, seed=None, verbose=False):
+    """以虛擬時鐘執行一段隨機交通，回傳 (controller, 抵達次數)。"""
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    controller = ElevatorController(clock, verbose=verbose)
+    arrivals = []
+    controller.subscribe(lambda event, *args: arrivals.append(args[0]) if event == "arrived" else None)
+
+    lowest, highest = controller.floors[0], controller.floors[-1]
+
+    def inject():
+        floor = rng.choice(controller.floors)
+        if rng.random() < 0.5:
+            controller.add_request(rng.choice([f for f in controller.floors if f != floor]), ButtonType.INTERNAL)
+        elif floor == lowest:
+            controller.add_request(floor, ButtonType.UP)
+        elif floor == highest:
+            controller.add_request(floor, ButtonType.DOWN)
+        else:
+            controller.add_request(floor, rng.choice([ButtonType.UP, ButtonType.DOWN]))
+        clock.call_later(rng.expovariate(1.0 / mean_interval), inject)
+
+    clock.call_later(rng.expovariate(1.0 / mean_interval), inject)
+    clock.run_until(duration)
+    return controller, len(arrivals)
+
+
+if __name__ == "__main__":
+    start = time.time()
+    controller, served = run_headless(seed=1)
+    elapsed = time.time() - start
+    print(f"模擬 24 小時完成：抵達 {served} 次，實際耗時 {elapsed:.2f} 秒")
@@ -0,0 +1,164 @@
+"""控制器狀態變化的事件匯流排：發布端只登記，訂閱者依各自的頻率收到合併後的最新值。
+
+控制核心一個節拍內可能對同一台車廂發出好幾次 status／info／position（請求加入、
+開始移動、越過樓層……），畫面標籤、序列埠與日誌原本每次都立即更新。
+EventBus 以 (車廂, 事件) 為鍵只保留最後一次的內容（COALESCED_EVENTS），
+flush() 時每個訂閱者對每個鍵最多更新一次，而且與上次送給它的值相同時不送
+（dedupe=False 的訂閱者例外，例如靠重複的狀態驅動保持連線與重送的 StatusLink）；
+arrived、request 等離散事件不合併，依序送出。
+
+    bus = EventBus(clock.now).attach(clock, 1 / 30)   # 每個畫面 flush 一次
+    group.subscribe(bus.publish)
+    bus.subscribe(show_status, events=("status",), cars=(0,))
+    bus.subscribe(log_status, events=("status",), interval=1.0)  # 最多每秒一次
+
+發布與 flush 必須在同一個執行緒（控制核心所在的執行緒）。需要每一筆事件的訂閱者
+（journal、control_api）仍直接訂閱 GroupController。
+"""
+import itertools
+import time
+
+from metrics import EVENTS_COALESCED, EVENTS_PUBLISHED
+
+
+class Subscription:
+    """一個訂閱者的過濾條件、頻率限制與尚未送出的事件。
+
+    received：符合條件的事件數；delivered：實際呼叫 callback 的次數
+    """
+
+    def __init__(self, callback, interval=0.0, events=None, cars=None, dedupe=True):
+        self.callback = callback
+        self.interval = interval
+        self.dedupe = dedupe
+        self.events = None if events is None else frozenset(events)
+        self.cars = None if cars is None else frozenset(cars)
+        self.pending = {}  # 鍵 -> (車廂, 事件, 參數)，依最後一次發布的順序
+        self.last_values = {}  # 可合併事件的鍵 -> 上次送出的參數
+        self.last_delivery = None
+        self.received = 0
+        self.delivered = 0
+
+    def wants(self, car, event):
+        return (self.events is None or event in self.events) and (self.cars is None or car in self.cars)
+
+    def due(self, now):
+        return bool(self.pending) and (self.last_delivery is None or now - self.last_delivery >= self.interval)
+
+
+class EventBus:
+    """合併狀態變化的事件匯流排；publish(car, event, *args) 可直接作為 GroupController 的訂閱者。
+
+    now：取得目前時間（秒）的函式，頻率限制以它計算
+    """
+
+    COALESCED_EVENTS = frozenset({"status", "info", "position", "penetration"})
+
+    def __init__(self, now=time.monotonic):
+        self.now = now
+        self.subscriptions = []
+        self.published = 0
+        self._seq = itertools.count()  # 離散事件的鍵，永遠不會重複
+
+    def subscribe(self, callback, interval=0.0, events=None, cars=None, dedupe=True):
+        """註冊 callback(car, event, *args)，回傳 Subscription。
+
+        interval：兩次送出之間的最短間隔（秒），期間的事件合併到下一次
+        events、cars：只接收這些事件／車廂（None 為全部）
+        dedupe：與上次送出的值相同時不送；為 False 時每個畫面仍送出最新值
+        """
+        subscription = Subscription(callback, interval, events, cars, dedupe)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.remove(subscription)
+
+    def publish(self, car, event, *args):
+        self.published += 1
+        EVENTS_PUBLISHED.inc()
+        key = (car, event) if event in self.COALESCED_EVENTS else next(self._seq)
+        for subscription in self.subscriptions:
+            if subscription.wants(car, event):
+                subscription.received += 1
+                # 取代舊值並移到最後，維持與發布順序一致
+                if subscription.pending.pop(key, None) is not None:
+                    EVENTS_COALESCED.inc()
+                subscription.pending[key] = (car, event, args)
+
+    def flush(self):
+        """把到期的訂閱者累積的事件送出，回傳呼叫 callback 的次數。"""
+        now = self.now()
+        count = 0
+        for subscription in self.subscriptions:
+            if not subscription.due(now):
+                continue
+            pending, subscription.pending = subscription.pending, {}
+            subscription.last_delivery = now
+            last_values = subscription.last_values
+            for key, (car, event, args) in pending.items():
+                if subscription.dedupe and isinstance(key, tuple):
+                    if last_values.get(key) == args:
+                        continue  # 值沒有改變
+                    last_values[key] = args
+                subscription.callback(car, event, *args)
+                subscription.delivered += 1
+                count += 1
+        return count
+
+    def attach(self, clock, interval):
+        """以 clock.call_later 每 interval 秒 flush 一次，回傳 self。"""
+        def tick():
+            self.flush()
+            clock.call_later(interval, tick)
+
+        clock.call_later(interval, tick)
+        return self
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    from collections import Counter
+
+    from elevator_core import VirtualClock
+    from group_dispatch import Building, GroupController
+
+    parser = argparse.ArgumentParser(description="比較直接訂閱與經過 EventBus 合併後的更新次數")
+    parser.add_argument("--floors", type=int, default=20, help="樓層數")
+    parser.add_argument("--cars", type=int, default=4, help="車廂數")
+    parser.add_argument("--duration", type=float, default=3600, help="模擬秒數")
+    parser.add_argument("--fps", type=float, default=30, help="每秒 flush 次數")
+    parser.add_argument("--seed", type=int, default=1, help="隨機種子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = VirtualClock()
+    building = Building(args.floors, args.cars)
+    group = GroupController(clock, building, verbose=False)
+    bus = EventBus(clock.now).attach(clock, 1 / args.fps)
+    group.subscribe(bus.publish)
+    direct = Counter()
+    group.subscribe(lambda car, event, *_: direct.update((event,)))
+    delivered = {name: Counter() for name in ("ui", "serial", "logger")}
+    bus.subscribe(lambda car, event, *_: delivered["ui"].update((event,)), events=("info", "position", "arrived"))
+    bus.subscribe(lambda car, event, *_: delivered["serial"].update((event,)), events=("status",), cars=(0,),
+                  dedupe=False)
+    bus.subscribe(lambda car, event, *_: delivered["logger"].update((event,)), events=("status",), interval=1.0)
+
+    def inject():
+        if rng.random() < 0.5:
+            group.add_car_call(rng.randrange(args.cars), rng.choice(building.floors))
+        else:
+            group.add_hall_call(*rng.choice(building.hall_buttons()))
+        clock.call_later(rng.expovariate(1 / 5.0), inject)
+
+    clock.call_later(0, inject)
+    start = time.perf_counter()
+    clock.run_until(args.duration)
+    elapsed = time.perf_counter() - start
+    print(f"{args.floors} 層 × {args.cars} 台車廂，模擬 {args.duration:.0f} 秒（實際耗時 {elapsed:.2f} 秒），"
+          f"flush {args.fps:g} 次／秒")
+    print("直接訂閱：" + "、".join(f"{event} {count}" for event, count in sorted(direct.items())))
+    for name, counts in delivered.items():
+        print(f"{name:<7}：" + "、".join(f"{event} {count}" for event, count in sorted(counts.items())))
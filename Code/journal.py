@@ -0,0 +1,350 @@
+"""控制器事件日誌：把所有輸入與狀態變化寫成精簡的二進位檔，並可快速重播。
+
+日誌檔格式（小端序）：
+- 檔頭 32 bytes：MAGIC（8 bytes）＋ 開始時間（float64）＋ 樓層數、車廂數（各 uint16）
+  ＋ 突破量閾值（float32），其餘補 0
+- 之後為固定 24 bytes 的紀錄：timestamp（float64）、種類、車廂（各 uint8）、
+  a、b、c（各 int16）、value（float64，突破量需與控制器看到的值完全相同）
+
+紀錄種類：
+- 輸入（重播時重新送進控制器）：REQUEST(a=樓層, b=按鈕)、EMERGENCY(a=開/關)、
+  PENETRATION(value=突破量)
+- 註記（重播時略過）：SERIAL(a=樓層，-1／-2 為緊急按鈕開／關)
+- 時鐘：TICK(value=該車廂第幾個排程)，車廂排程的 callback（每一幀、處理請求）實際執行的時間
+- 狀態變化（重播時用來比對）：STATUS(a=樓層, b=方向, c=目標, value=狀態代碼)、ARRIVED(a=樓層)
+
+紀錄先累積在記憶體緩衝區，由寫入執行緒每 sync_interval 秒（或累積到 buffer_size 時提早）
+寫入檔案並 fsync；控制執行緒每筆紀錄的成本只有一次 struct.pack，不會被磁碟 I/O 卡住，
+閒置時最後一段紀錄也會在 sync_interval 內落地。緩衝區超過 max_pending 時 record() 會
+等寫入執行緒追上，記憶體用量有上限。
+
+控制器以「幀」推進移動，Tk 的 after() 總是會晚一點觸發，所以只按輸入的時間在虛擬時鐘上
+重播無法重現即時執行的結果。Journal 因此也記錄每台車廂排程的 callback 實際觸發的時間（TICK），
+重播時依日誌的順序交錯執行輸入與這些 callback，時間也設為紀錄的時間；
+沒有 TICK 的舊日誌仍以虛擬時鐘重播（只有計時精準時才一致）。
+Journal 需要在車廂收到第一個輸入之前建立。
+
+    python journal.py PATH                 # 摘要並重播整份日誌，檢查是否與紀錄一致
+    python journal.py PATH --at 1234.5     # 重建該時間點各車廂的狀態
+    python journal.py --check              # 在計時延遲的時鐘上記錄隨機輸入，檢查重播是否一致
+"""
+import itertools
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from elevator_core import ButtonType, VirtualClock
+from group_dispatch import Building, GroupController
+
+MAGIC = b"ELVJRN1\0"
+HEADER = struct.Struct("<8sdHHf")
+HEADER_SIZE = 32
+RECORD = struct.Struct("<dBBhhhd")
+RECORD_DTYPE = np.dtype([("timestamp", "<f8"), ("kind", "u1"), ("car", "u1"),
+                         ("a", "<i2"), ("b", "<i2"), ("c", "<i2"), ("value", "<f8")])
+
+REQUEST, EMERGENCY, PENETRATION, SERIAL, TICK = 1, 2, 3, 4, 5
+STATUS, ARRIVED = 16, 17
+INPUT_KINDS = (REQUEST, EMERGENCY, PENETRATION)
+KIND_NAMES = {REQUEST: "request", EMERGENCY: "emergency", PENETRATION: "penetration", SERIAL: "serial",
+              TICK: "tick", STATUS: "status", ARRIVED: "arrived"}
+STATUS_CODES = {"NORMAL": 0, "FULL": 1, "EMERGENCY": 2}
+SERIAL_CODES = {"BUTTON:EMERGENCY_ON": -1, "BUTTON:EMERGENCY_OFF": -2}
+
+
+class Journal:
+    """把 GroupController 的事件寫入日誌檔。
+
+    journal = Journal(path, group)   # 訂閱 group 的所有車廂
+    journal.close()                  # 結束時寫出剩餘的紀錄
+    """
+
+    def __init__(self, path, group, buffer_size=64 * 1024, sync_interval=1.0, max_pending=4 * 1024 * 1024):
+        self.clock = group.clock
+        self.buffer_size = buffer_size
+        self.sync_interval = sync_interval
+        self.max_pending = max_pending
+        self.records_written = 0
+        self.syncs = 0
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._running = True
+        self._file = open(path, "wb")
+        building = group.building
+        header = HEADER.pack(MAGIC, self.clock.now(), building.num_floors, building.num_cars,
+                             group.cars[0].penetration_threshold)
+        self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self._sync_file()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+        for index, car in enumerate(group.cars):
+            car.clock = _TickClock(car.clock, lambda seq, index=index: self.record(TICK, index, value=seq))
+        group.subscribe(self._on_event)
+
+    def _on_event(self, car, event, *args):
+        if event == "request":
+            self.record(REQUEST, car, args[0], args[1].value)
+        elif event == "emergency":
+            self.record(EMERGENCY, car, int(args[0]))
+        elif event == "penetration":
+            self.record(PENETRATION, car, value=args[0])
+        elif event == "status":
+            status, floor, direction, target = args
+            self.record(STATUS, car, floor, direction.value, target, STATUS_CODES.get(status, -1))
+        elif event == "arrived":
+            self.record(ARRIVED, car, args[0])
+
+    def record_serial(self, car, line):
+        """記錄 Arduino 按鈕事件（只做註記，實際的請求另有 REQUEST 紀錄）。"""
+        value = line[len("BUTTON:"):]
+        code = int(value) if value.isdigit() else SERIAL_CODES.get(line)
+        if code is not None:
+            self.record(SERIAL, car, code)
+
+    def record(self, kind, car, a=0, b=0, c=0, value=0.0):
+        data = RECORD.pack(self.clock.now(), kind, car, a, b, c, value)
+        with self._cond:
+            while len(self._buffer) >= self.max_pending and self._running:
+                self._cond.wait()  # 磁碟跟不上時等寫入執行緒，避免緩衝區無限成長
+            self._buffer += data
+            self.records_written += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._buffer) < self.buffer_size:
+                    self._cond.wait(self.sync_interval)
+                running = self._running
+                data, self._buffer = self._buffer, bytearray()
+                self._cond.notify_all()
+            if data:
+                self._file.write(data)
+                self._sync_file()
+            if not running:
+                return
+
+    def _sync_file(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+
+    def close(self):
+        """停止寫入執行緒，寫出剩餘的紀錄並關閉檔案。"""
+        if self._file is None:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+        self._file = None
+
+
+class _TickClock:
+    """包住車廂的時鐘，每個排程的 callback 執行前先以 on_fire(序號) 記錄。"""
+
+    def __init__(self, clock, on_fire):
+        self.clock = clock
+        self.on_fire = on_fire
+        self._seq = itertools.count()
+
+    def now(self):
+        return self.clock.now()
+
+    def call_later(self, delay, callback, *args):
+        self.clock.call_later(delay, self._fire, next(self._seq), callback, args)
+
+    def _fire(self, seq, callback, args):
+        self.on_fire(seq)
+        callback(*args)
+
+
+class _ReplayClock:
+    """重播用的車廂時鐘：排程的 callback 不自行觸發，等日誌中對應序號的 TICK 才執行。"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.pending = {}
+        self._seq = itertools.count()
+
+    def now(self):
+        return self.clock.now()
+
+    def call_later(self, delay, callback, *args):
+        self.pending[next(self._seq)] = (callback, args)
+
+    def fire(self, seq):
+        entry = self.pending.pop(seq, None)
+        if entry is not None:  # 沒有對應的排程時重播已經分歧，留給抵達序列比對
+            callback, args = entry
+            callback(*args)
+
+
+def read_journal(path):
+    """回傳 (檔頭 dict, 紀錄的 numpy 結構陣列)；不完整的最後一筆會被忽略。"""
+    with open(path, "rb") as f:
+        magic, start, num_floors, num_cars, threshold = HEADER.unpack(f.read(HEADER_SIZE)[:HEADER.size])
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是控制器日誌檔")
+        data = f.read()
+    count = len(data) // RECORD.size
+    records = np.frombuffer(data, RECORD_DTYPE, count=count)
+    header = {"start": start, "num_floors": num_floors, "num_cars": num_cars, "penetration_threshold": threshold}
+    return header, records
+
+
+def _apply(group, record):
+    car = group.cars[record["car"]]
+    kind = record["kind"]
+    if kind == REQUEST:
+        car.add_request(int(record["a"]), ButtonType(int(record["b"])))
+    elif kind == EMERGENCY:
+        car.set_manual_emergency(bool(record["a"]))
+    elif kind == PENETRATION:
+        car.update_penetration(float(record["value"]))
+
+
+def replay(path, until=None):
+    """以虛擬時鐘重播日誌中的輸入，回傳 (group, 比對結果)。
+
+    until 為要重建狀態的時間點（與紀錄相同的時間基準），預設為最後一筆紀錄。
+    比對結果：expected／replayed 為到 until 為止的抵達序列 [(車廂, 樓層)]，
+    first_mismatch 為第一個不同的位置（一致時為 None）。
+    """
+    header, records = read_journal(path)
+    if until is None:
+        until = float(records["timestamp"][-1]) if len(records) else header["start"]
+    clock = VirtualClock(header["start"])
+    group = GroupController(clock, Building(header["num_floors"], header["num_cars"]),
+                            penetration_threshold=header["penetration_threshold"], verbose=False)
+    replayed = []
+    group.subscribe(lambda car, event, *args: replayed.append((car, args[0])) if event == "arrived" else None)
+
+    selected = records[records["timestamp"] <= until]
+    if np.any(selected["kind"] == TICK):
+        # 依紀錄順序交錯執行輸入與車廂的 callback，時間設為紀錄的時間
+        car_clocks = [_ReplayClock(clock) for _ in group.cars]
+        for car, car_clock in zip(group.cars, car_clocks):
+            car.clock = car_clock
+        for record in selected[np.isin(selected["kind"], INPUT_KINDS + (TICK,))]:
+            clock.run_until(float(record["timestamp"]))
+            if record["kind"] == TICK:
+                car_clocks[record["car"]].fire(int(record["value"]))
+            else:
+                _apply(group, record)
+    else:
+        for record in selected[np.isin(selected["kind"], INPUT_KINDS)]:
+            clock.call_later(float(record["timestamp"]) - header["start"], _apply, group, record)
+    clock.run_until(until)
+
+    arrived = selected[selected["kind"] == ARRIVED]
+    expected = list(zip(arrived["car"].tolist(), arrived["a"].tolist()))
+    first_mismatch = next((i for i, (e, r) in enumerate(zip(expected, replayed)) if e != r), None)
+    if first_mismatch is None and len(expected) != len(replayed):
+        first_mismatch = min(len(expected), len(replayed))
+    return group, {"expected": expected, "replayed": replayed, "first_mismatch": first_mismatch}
+
+
+class _LateClock(VirtualClock):
+    """每個 callback 都比排定的時間晚 0–max_delay 秒觸發的虛擬時鐘（模擬 Tk 的 after()）。"""
+
+    def __init__(self, start=0.0, max_delay=0.01, seed=None):
+        super().__init__(start)
+        self.max_delay = max_delay
+        self._rng = random.Random(seed)
+
+    def call_later(self, delay, callback, *args):
+        super().call_later(delay + self._rng.uniform(0, self.max_delay), callback, *args)
+
+
+def check_replay(duration=600.0, max_delay=0.01, num_floors=10, num_cars=3, seed=1):
+    """在計時延遲的時鐘上記錄一段隨機輸入並重播，回傳 replay() 的比對結果。"""
+    rng = random.Random(seed)
+    clock = _LateClock(1000.0, max_delay, seed)
+    building = Building(num_floors, num_cars)
+    group = GroupController(clock, building, verbose=False)
+    fd, path = tempfile.mkstemp(suffix=".jrn")
+    os.close(fd)
+    try:
+        journal = Journal(path, group)
+
+        def inject():
+            car = group.cars[rng.randrange(num_cars)]
+            r = rng.random()
+            if r < 0.03 and not car.auto_emergency:
+                car.set_manual_emergency(not car.manual_emergency)
+            elif r < 0.15:
+                car.update_penetration(rng.random() * 100)
+            elif r < 0.55:
+                group.add_car_call(rng.randrange(num_cars), rng.choice(building.floors))
+            else:
+                group.add_hall_call(*rng.choice(building.hall_buttons()))
+            clock.call_later(rng.expovariate(1 / 6), inject)
+
+        clock.call_later(1, inject)
+        clock.run_until(1000.0 + duration)
+        journal.close()
+        return replay(path)[1]
+    finally:
+        os.remove(path)
+
+
+def describe(car):
+    """車廂狀態的摘要 dict。"""
+    return {
+        "floor": car.current_floor,
+        "position": round(car.position, 3),
+        "direction": car.direction.name,
+        "target": car.target_floor if car.is_moving_flag else None,
+        "requests": [(r.floor, r.button_type.name) for r in car.get_active_requests()],
+        "pending_external": [(r.floor, r.button_type.name) for r in car.pending_external_requests],
+        "manual_emergency": car.manual_emergency,
+        "auto_emergency": car.auto_emergency,
+        "penetration_ratio": car.penetration_ratio,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    parser = argparse.ArgumentParser(description="重播控制器日誌並重建狀態")
+    parser.add_argument("path", nargs="?", help="日誌檔路徑（main.py --journal 產生）")
+    parser.add_argument("--at", type=float, help="重建此時間點（日誌的時間基準）的狀態，預設為最後一筆紀錄")
+    parser.add_argument("--check", action="store_true", help="在計時延遲的時鐘上記錄隨機輸入，檢查重播是否一致")
+    parser.add_argument("--delay", type=float, default=0.01, help="--check 時每個 callback 最多延遲的秒數")
+    args = parser.parse_args()
+
+    if args.check:
+        check = check_replay(max_delay=args.delay)
+        ok = check["first_mismatch"] is None
+        print(f"計時延遲 {args.delay * 1000:.0f} ms：{len(check['expected'])} 次抵達，"
+              + ("重播一致" if ok else f"第 {check['first_mismatch'] + 1} 次開始不同"))
+        raise SystemExit(0 if ok else 1)
+    if args.path is None:
+        parser.error("需要日誌檔路徑（或 --check）")
+
+    header, records = read_journal(args.path)
+    counts = Counter(KIND_NAMES.get(kind, str(kind)) for kind in records["kind"].tolist())
+    span = float(records["timestamp"][-1]) - header["start"] if len(records) else 0.0
+    print(f"{header['num_floors']} 層 × {header['num_cars']} 台車廂，{len(records)} 筆紀錄，涵蓋 {span:.1f} 秒")
+    print("  " + "、".join(f"{name} {count}" for name, count in sorted(counts.items())))
+
+    start = time.perf_counter()
+    group, check = replay(args.path, args.at)
+    elapsed = time.perf_counter() - start
+    print(f"重播耗時 {elapsed:.3f} 秒（{span / elapsed if elapsed > 0 else float('inf'):.0f} 倍速）")
+    if check["first_mismatch"] is None:
+        print(f"抵達序列一致（{len(check['expected'])} 次）")
+    else:
+        i = check["first_mismatch"]
+        print(f"抵達序列在第 {i + 1} 次開始不同：紀錄 {check['expected'][i:i + 3]}，重播 {check['replayed'][i:i + 3]}")
+    for index, car in enumerate(group.cars):
+        print(f"{index + 1} 號車：{describe(car)}")
@@ -1,121 +1,117 @@
 import tkinter as tk
-from enum import Enum
-from collections import deque
+import logging
 import time
-import cv2
-import numpy as np
-from PIL import Image, ImageTk
-import serial
-import serial.tools.list_ports
-import subprocess
 import os
 
-# ... (ButtonType, Direction, Request 類別維持不變) ...
-class ButtonType(Enum):
-    UP = 1
-    DOWN = -1
-    INTERNAL = 0
+# cv2、numpy、PIL、serial 只在各子系統的背景初始化時才載入（見 startup.py）
+from audio_engine import LANGUAGES, AudioEngine, NullSink
+from elevator_core import ButtonType, TkClock
+from event_bus import EventBus
+from group_dispatch import Building, GroupController
+import metrics
+from startup import BackgroundTask
+from status_protocol import BAUD_RATE, StatusLink
 
-class Direction(Enum):
-    UP = 1
-    DOWN = -1
-    IDLE = 0
+logger = logging.getLogger(__name__)
 
-class Request:
-    def __init__(self, floor, button_type):
-        self.floor = floor
-        self.button_type = button_type
-        self.timestamp = time.time()
+# 與 occupancy.ENGINES 相同；在這裡列出，解析命令列時不必載入 cv2
+ENGINE_NAMES = ("mog2", "knn", "average", "grid")
 
 class ElevatorControlSim:
-    def __init__(self, master):
+    BUTTON_ROWS = 10  # 按鈕每欄最多幾列，樓層多時自動換欄
+    RENDER_INTERVAL = 33  # 事件匯流排 flush（畫面更新）間隔（毫秒），約 30 fps
+    LOG_INTERVAL = 1.0  # 車廂狀態寫入日誌的最短間隔（秒）
+    PREVIEW_SIZE = (240, 180)  # 攝影機預覽大小
+    STARTUP_POLL = 50  # 檢查背景初始化是否完成的間隔（毫秒）
+
+    def __init__(self, master, building=None, record_path=None, vision_process=False, serial_port=None,
+                 audio_language="zh", audio=True, preview_fps=10.0, engine="mog2", journal_path=None,
+                 api_port=None, api_host="127.0.0.1"):
         self.master = master
         master.title("Elevator Operation Preview Application")
-        self.cap = cv2.VideoCapture(0)
-        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)    
-        self.penetration_area = 0 
-        self.total_area = 0
+        self.started = time.perf_counter()
+        self.startup_times = {}  # 各背景子系統就緒時距離啟動的秒數
+        # 攝影機、偵測器、音效與序列埠就緒前維持 None，相關功能暫停但請求照常受理
+        self.camera = None  # 背景執行緒擷取，主執行緒只取最新畫面
+        self.detector = None
+        self.vision_worker = None
+        self.scheduler = None
+        self.recorder = None
+        self.preview = None
+        self.audio = None
+        self.last_frame_seq = 0
+        self.preview_fps = preview_fps
+        self.baseline_ready = False  # 背景基準建立前每張畫面都要偵測
         self.penetration_ratio = 0 
         self.penetration_threshold = 0.50 
-        self.prev_mask = None
-        self.baseline_established = False
-        self.stabilization_frames = 0
-        self.display_width = 240
-        self.display_height = 180
-        
-        # 辨識區域設定 (x, y, width, height)
-        # 將左邊邊界往右調整 20% 的畫面寬度
-        self.detection_roi = None  # 將在影像處理時動態設定
         
         # --- MODIFICATION START: Serial Communication Setup ---
-        self.arduino_serial = "/dev/tty.usbserial-1240"
-        self.setup_serial()
+        self.arduino_serial = None
+        self.serial_reader = None
+        self.status_link = None
         # --- MODIFICATION END ---
         
         self.canvas = tk.Canvas(master, width=300, height=600, bg="#808080")
         self.canvas.pack(side=tk.LEFT, padx=5, fill=tk.BOTH, expand=True)
 
-        # 繪製滿版電梯井背景（深灰色主題）
-        self.canvas.create_rectangle(0, 0, 300, 600, fill="#808080", outline="#666666", width=2)
-        
-        # 繪製磚頭風格背景
-        brick_width = 30
-        brick_height = 15
-        for y in range(0, 600, brick_height):
-            for x in range(0, 300, brick_width):
-                # 交錯排列磚頭
-                offset = brick_width // 2 if (y // brick_height) % 2 == 1 else 0
-                brick_x = x + offset
-                if brick_x < 300:
-                    self.canvas.create_rectangle(
-                        brick_x, y, brick_x + brick_width, y + brick_height,
-                        fill="#707070", outline="#606060", width=1
-                    )
-        
-        # 繪製樓層
-        self.floor_positions = {1: 500, 2: 300, 3: 100}
-        for floor, y in self.floor_positions.items():
-            # 樓層地板（深色）
-            self.canvas.create_line(0, y, 300, y, fill="#222222", width=3)
-            # 樓層門框（深色）
-            self.canvas.create_rectangle(50, y-5, 250, y+5, fill="#333333", outline="#222222", width=1)
-            # 樓層標示（深色）
-            self.canvas.create_text(270, y - 15, text=f"{floor}F", font=("Arial", 12, "bold"), fill="#111111")
-
-        # 電梯車廂設計（深色主題）
-        self.elevator_width = 80
-        self.elevator_height = 80  # 增加高度
-        initial_x = 110  # 保持在中央位置
+        # 靜態的電梯井（磚牆、樓層地板、門框、標示）預先畫成單一影像，依建築設定平均分配畫布高度
+        self.building = building or Building()
+        floor_spacing = 600 / self.building.num_floors
+        self.floor_positions = {floor: 600 - floor_spacing * (floor - 0.5) for floor in self.building.floors}
+        frame_half = min(5, floor_spacing / 10)
+        label_size = min(12, max(6, int(floor_spacing * 0.6)))
+        self.shaft_photo = None  # 背景畫好之前先顯示畫布底色
+
+        # 電梯車廂設計（深色主題），多台車廂時在門框範圍內並排
+        slot_width = 200 / self.building.num_cars
+        self.elevator_width = min(80, slot_width - 6)
+        self.elevator_height = min(80, int(floor_spacing * 0.8))  # 增加高度
         initial_y = self.floor_positions[1] - self.elevator_height
-        
-        # 電梯車廂主體（深色金屬質感）
-        self.elevator_rect = self.canvas.create_rectangle(
-            initial_x, initial_y, initial_x + self.elevator_width, initial_y + self.elevator_height, 
-            fill="#404040", outline="#666666", width=2
-        )
-        
-        # 電梯門（深色）
-        self.elevator_door_left = self.canvas.create_rectangle(
-            initial_x + 5, initial_y + 5, initial_x + 35, initial_y + self.elevator_height - 5,
-            fill="#555555", outline="#777777", width=1
-        )
-        self.elevator_door_right = self.canvas.create_rectangle(
-            initial_x + 45, initial_y + 5, initial_x + 75, initial_y + self.elevator_height - 5,
-            fill="#555555", outline="#777777", width=1
-        )
-        self.current_floor = 1
-        self.target_floor = None
-        self.direction = Direction.IDLE
-        self.is_moving_flag = False
-
-        self.internal_requests = []
-        self.external_requests = []
-        self.pending_external_requests = deque()
-
-        self.full_load = False        
-        self.manual_emergency = False   
-        self.auto_emergency = False
-        self.auto_emergency_active = False  # 追蹤自動緊急模式是否正在執行     
+        self.car_tags = []
+        self.car_y = []  # 各車廂目前畫在畫布上的頂端 Y 座標
+        for index in range(self.building.num_cars):
+            initial_x = 50 + slot_width * index + (slot_width - self.elevator_width) / 2  # 保持在中央位置
+            # 車廂主體與兩扇門共用一個標籤，移動時只需一次 canvas.move
+            tag = f"car{index}"
+            # 電梯車廂主體（深色金屬質感）
+            self.canvas.create_rectangle(
+                initial_x, initial_y, initial_x + self.elevator_width, initial_y + self.elevator_height,
+                fill="#404040", outline="#666666", width=2, tags=tag
+            )
+            # 電梯門（深色）
+            self.canvas.create_rectangle(
+                *self.door_coords(initial_x, initial_y, left=True), fill="#555555", outline="#777777", width=1, tags=tag
+            )
+            self.canvas.create_rectangle(
+                *self.door_coords(initial_x, initial_y, left=False), fill="#555555", outline="#777777", width=1, tags=tag
+            )
+            self.car_tags.append(tag)
+            self.car_y.append(initial_y)
+
+        # 控制邏輯由核心負責，GUI 只是其中一個訂閱者
+        # 外部呼叫交給群組派車；1 號車是裝有攝影機與 Arduino 模組的車廂
+        self.group = GroupController(TkClock(master), self.building, penetration_threshold=self.penetration_threshold)
+        # 畫面、Arduino 模組與日誌經由事件匯流排訂閱：每個畫面 flush 一次，
+        # 同一台車廂在一個畫面內的多次 status／info／position 只取最後一次
+        self.bus = EventBus(self.group.clock.now).attach(self.group.clock, self.RENDER_INTERVAL / 1000)
+        self.group.subscribe(self.bus.publish)
+        self.bus.subscribe(self.move_car, events=("position",))
+        self.bus.subscribe(self.on_controller_event, cars=(0,), events=("info", "arrived"))
+        # StatusLink 靠每秒重複的狀態判斷保持連線與重送，相同的值也要送到
+        self.bus.subscribe(self.on_car_status, cars=(0,), events=("status",), dedupe=False)
+        self.bus.subscribe(self.log_status, events=("status",), interval=self.LOG_INTERVAL)
+        # 所有輸入與狀態變化寫入日誌，事後可用 journal.py 重播
+        self.journal = None
+        if journal_path:
+            from journal import Journal
+            self.journal = Journal(journal_path, self.group)
+        # 區域網路控制介面：HTTP 注入呼叫、SSE 串流狀態，供大廳顯示器與測試程式使用
+        self.api = None
+        if api_port is not None:
+            from control_api import ControlServer
+            self.api = ControlServer(self.group, api_host, api_port).start()
+            logger.info(f"控制介面：http://{api_host}:{self.api.port}/events")
+        self.controller = self.group.cars[0]
 
         self.control_frame = tk.Frame(master)
         self.control_frame.pack(side=tk.RIGHT, fill=tk.Y, expand=True, padx=5)
@@ -151,583 +147,348 @@ class ElevatorControlSim:
         self.internal_frame = tk.Frame(self.buttons_frame)
         self.internal_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5)
         
-        tk.Label(self.internal_frame, text="Inside Request").pack(pady=2)
-        self.btn_internal_floor3 = tk.Button(
-            self.internal_frame, text="3", command=lambda: self.add_request(3, ButtonType.INTERNAL)
-        )
-        self.btn_internal_floor3.pack(fill=tk.X, padx=2, pady=1)
-        self.btn_internal_floor2 = tk.Button(
-            self.internal_frame, text="2", command=lambda: self.add_request(2, ButtonType.INTERNAL)
-        )
-        self.btn_internal_floor2.pack(fill=tk.X, padx=2, pady=1)
-        self.btn_internal_floor1 = tk.Button(
-            self.internal_frame, text="1", command=lambda: self.add_request(1, ButtonType.INTERNAL)
-        )
-        self.btn_internal_floor1.pack(fill=tk.X, padx=2, pady=1)
+        tk.Label(self.internal_frame, text="Inside Request").grid(row=0, column=0, columnspan=10, pady=2)
+        self.selected_car = tk.IntVar(value=1)
+        if self.building.num_cars > 1:
+            car_menu = tk.OptionMenu(self.internal_frame, self.selected_car, *range(1, self.building.num_cars + 1))
+            car_menu.grid(row=1, column=0, columnspan=10, pady=2)
+        self.internal_buttons = {}
+        for i, floor in enumerate(reversed(self.building.floors)):
+            button = tk.Button(
+                self.internal_frame, text=str(floor),
+                command=lambda floor=floor: self.group.add_car_call(self.selected_car.get() - 1, floor)
+            )
+            button.grid(row=2 + i % self.BUTTON_ROWS, column=i // self.BUTTON_ROWS, sticky="ew", padx=2, pady=1)
+            self.internal_buttons[floor] = button
 
         self.external_frame = tk.Frame(self.buttons_frame)
         self.external_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5)
         
-        tk.Label(self.external_frame, text="Outside Request").pack(pady=2)
-        self.btn_ext_3_down = tk.Button(
-            self.external_frame, text="3↓", width=4, command=lambda: self.add_request(3, ButtonType.DOWN)
-        )
-        self.btn_ext_3_down.pack(fill=tk.X, padx=2, pady=1)
-        self.btn_ext_2_up = tk.Button(
-            self.external_frame, text="2↑", width=4, command=lambda: self.add_request(2, ButtonType.UP)
-        )
-        self.btn_ext_2_up.pack(fill=tk.X, padx=2, pady=1)
-        self.btn_ext_2_down = tk.Button(
-            self.external_frame, text="2↓", width=4, command=lambda: self.add_request(2, ButtonType.DOWN)
-        )
-        self.btn_ext_2_down.pack(fill=tk.X, padx=2, pady=1)
-        self.btn_ext_1_up = tk.Button(
-            self.external_frame, text="1↑", width=4, command=lambda: self.add_request(1, ButtonType.UP)
-        )
-        self.btn_ext_1_up.pack(fill=tk.X, padx=2, pady=1)
+        tk.Label(self.external_frame, text="Outside Request").grid(row=0, column=0, columnspan=10, pady=2)
+        self.external_buttons = {}
+        for i, (floor, button_type) in enumerate(self.building.hall_buttons()):
+            arrow = "↑" if button_type == ButtonType.UP else "↓"
+            button = tk.Button(
+                self.external_frame, text=f"{floor}{arrow}", width=4,
+                command=lambda floor=floor, button_type=button_type: self.group.add_hall_call(floor, button_type)
+            )
+            button.grid(row=1 + i % self.BUTTON_ROWS, column=i // self.BUTTON_ROWS, sticky="ew", padx=2, pady=1)
+            self.external_buttons[(floor, button_type)] = button
 
         self.info_label = tk.Label(self.control_frame, text="Status：Idle", wraplength=280)
         self.info_label.pack(pady=10)
 
+        # 耗時的初始化放到背景執行緒，完成後由 poll_startup 在主執行緒接上
+        self.startup_tasks = [
+            BackgroundTask("shaft", lambda: self.render_shaft_image(frame_half, label_size), self.on_shaft_ready),
+            BackgroundTask("vision", lambda: self.open_vision(engine, vision_process, record_path),
+                           self.on_vision_ready),
+            BackgroundTask("audio", lambda: AudioEngine(audio_language, sink=None if audio else NullSink()),
+                           self.on_audio_ready),
+            BackgroundTask("serial", lambda: self.setup_serial(serial_port), self.on_serial_ready),
+        ]
+        for task in self.startup_tasks:
+            task.start()
+
+        self.master.after(self.STARTUP_POLL, self.poll_startup)
         self.master.after(100, self.simulation_loop)
         self.master.after(100, self.update_penetration_detection)
         self.master.after(100, self.start_arduino_button_check)  # 啟動 Arduino 按鈕檢查
+        if self.api is not None:
+            self.master.after(100, self.process_api_commands)
     
+    def poll_startup(self):
+        """把已完成的背景初始化結果接上（on_ready 在主執行緒執行）。"""
+        for task in self.startup_tasks:
+            if task.done() and task.name not in self.startup_times:
+                self.startup_times[task.name] = time.perf_counter() - self.started
+                logger.debug(f"{task.name} 就緒（初始化 {task.elapsed:.2f} 秒）")
+        self.startup_tasks = [task for task in self.startup_tasks if not task.poll()]
+        if self.startup_tasks:
+            self.master.after(self.STARTUP_POLL, self.poll_startup)
+
+    def render_shaft_image(self, frame_half, label_size):
+        """（背景執行緒）畫出靜態的電梯井背景。"""
+        from shaft_image import render_shaft
+        return render_shaft(300, 600, self.floor_positions, frame_half, label_size)
+
+    def on_shaft_ready(self, image):
+        from PIL import ImageTk
+        self.shaft_photo = ImageTk.PhotoImage(image)
+        shaft = self.canvas.create_image(0, 0, image=self.shaft_photo, anchor=tk.NW)
+        self.canvas.tag_lower(shaft)  # 放在車廂下方
+
+    def open_vision(self, engine, vision_process, record_path):
+        """（背景執行緒）開啟攝影機並建立偵測器，回傳 (攝影機, 偵測器, 偵測行程, 排程, 錄製器)。"""
+        from camera_capture import LatestFrameCapture
+        from detection_scheduler import DetectionScheduler
+        from penetration_detector import PenetrationDetector
+        from vision_worker import VisionWorker
+
+        camera = LatestFrameCapture(0).start()
+        # 偵測在縮小的辨識區域上進行，預覽只在 240x180 上繪製
+        detector = PenetrationDetector(preview_size=self.PREVIEW_SIZE, detection_scale=0.5, engine=engine)
+        # vision_process 時改由獨立行程偵測，UI 行程只負責擷取與顯示
+        vision_worker = VisionWorker(preview_size=self.PREVIEW_SIZE, detection_scale=0.5,
+                                     engine=engine) if vision_process else None
+        # 依電梯狀態調整偵測頻率，畫面沒有變化時略過完整偵測
+        scheduler = DetectionScheduler()
+        recorder = None
+        if record_path:
+            # 把辨識區域畫面與突破量錄下來，供 camera_replay.py 離線重播
+            from camera_replay import SessionRecorder
+            recorder = SessionRecorder(record_path)
+        return camera, detector, vision_worker, scheduler, recorder
+
+    def on_vision_ready(self, parts):
+        from camera_preview import CameraPreview
+        # 預覽重複使用同一個 PhotoImage，更新頻率與 100ms 的偵測頻率分開
+        self.preview = CameraPreview(self.camera_label, self.PREVIEW_SIZE, self.preview_fps)
+        self.camera, self.detector, self.vision_worker, self.scheduler, self.recorder = parts
+
+    def on_audio_ready(self, audio):
+        # 音效已全部解碼，由混音執行緒播放
+        self.audio = audio.start()
+
+    def on_serial_ready(self, port):
+        if port is None:
+            return
+        from serial_reader import SerialReader
+        self.arduino_serial = port
+        # 背景執行緒持續讀取序列埠，主執行緒只處理 BUTTON／PLAY_SOUND 事件
+        self.serial_reader = SerialReader(port).start()
+        # 精簡狀態協定：只送出改變的狀態與低頻率的保持連線訊框
+        self.status_link = StatusLink(port.write)
+        self.controller.notify_status()  # 模組連上時先同步目前狀態
+
     # --- FIX 1: MODIFIED setup_serial ---
-    def setup_serial(self):
-        """自動尋找並連接到 Arduino，如果失敗則提供除錯資訊。"""
-        print("Finding Arduino...")
+    def setup_serial(self, serial_port=None):
+        """（背景執行緒）自動尋找並連接到 Arduino，回傳 serial.Serial；失敗時回傳 None 並提供除錯資訊。
+
+        serial_port 指定時直接連線（例如 car_module_emulator.py 建立的虛擬序列埠）。
+        """
+        import serial
+        import serial.tools.list_ports
+
+        logger.info("Finding Arduino...")
         ports = serial.tools.list_ports.comports()
-        arduino_port = "/dev/tty.usbserial-1240"
+        arduino_port = serial_port or "/dev/tty.usbserial-1240"
         
-        if not ports:
-            print("Error：Can't find any serial.")
-            return
+        if not ports and serial_port is None:
+            logger.error("Error：Can't find any serial.")
+            return None
 
-        for port in ports:
+        for port in ports if serial_port is None else []:
             # 在 MacBook 上，Arduino 通常顯示為 'usbmodem'
             # 在 Windows 上，可能是 'Arduino' in port.description
             # 某些仿製版可能沒有可識別的名稱
             if 'usbmodem' in port.device or 'Arduino' in str(port.description):
                 arduino_port = port.device
-                print(f"Found Arduino in: {arduino_port}")
+                logger.info(f"Found Arduino in: {arduino_port}")
                 break
         
         if arduino_port:
             try:
-                self.arduino_serial = serial.Serial(arduino_port, 9600, timeout=1)
+                port = serial.Serial(arduino_port, BAUD_RATE, timeout=1)
                 time.sleep(2) # 等待 Arduino 重啟
-                print("Connect Success。")
+                logger.info("Connect Success。")
+                return port
             except serial.SerialException as e:
-                print(f"Failed to connect Arduino: {e}")
-                self.arduino_serial = None
+                logger.error(f"Failed to connect Arduino: {e}")
+                return None
         else:
             # 如果找不到自動識別的Arduino，嘗試使用預設埠
             try:
-                self.arduino_serial = serial.Serial("/dev/tty.usbserial-1240", 9600, timeout=1)
+                port = serial.Serial("/dev/tty.usbserial-1240", BAUD_RATE, timeout=1)
                 time.sleep(2) # 等待 Arduino 重啟
-                print("Connect Success using default port。")
+                logger.info("Connect Success using default port。")
+                return port
             except serial.SerialException as e:
-                print(f"Failed to connect Arduino: {e}")
-                print("Error：找不到可自動識別的 Arduino 模組。")
-                print("請檢查連接，並從以下可用埠列表中找到您的 Arduino：")
+                logger.error(f"Failed to connect Arduino: {e}")
+                logger.error("Error：找不到可自動識別的 Arduino 模組。")
+                logger.error("請檢查連接，並從以下可用埠列表中找到您的 Arduino：")
                 for port in ports:
-                    print(f" - {port.device}: {port.description}")
-                print("\nPlease modify the serial in the 45 & 161 in the code")
-                self.arduino_serial = None
+                    logger.error(f" - {port.device}: {port.description}")
+                logger.error("Please modify the serial in the 45 & 161 in the code")
+                return None
 
     # --- FIX 2: MODIFIED send_to_arduino with better error handling ---
     # 在 main_elevator_simulator.py 中修改
 
     def send_to_arduino(self, status, floor, direction):
         """格式化並發送狀態給 Arduino，包含更安全的檢查。"""
-        if isinstance(self.arduino_serial, serial.Serial) and self.arduino_serial.is_open:
+        if self.status_link is not None and self.arduino_serial.is_open:
             # 獲取目標樓層，使用當前目標樓層（包括中途停靠）
-            if hasattr(self, 'target_floor') and self.target_floor:
-                target_floor = self.target_floor
+            if self.controller.target_floor:
+                target_floor = self.controller.target_floor
             else:
                 target_floor = floor
-            command = f"STATUS:{status};FLOOR:{floor};DIR:{direction.name};TARGET:{target_floor};\n"
             try:
-                # --- 在這裡加入一行 print 語句 ---
-                print(f"--> [PYTHON SENDS] Sending command: {command.strip()}")
-                self.arduino_serial.write(command.encode('utf-8'))
-            except serial.SerialException as e:
-                print(f"Command send error: {e}")
-                self.arduino_serial.close()
-                self.arduino_serial = None
-
-    def get_current_module_status(self):
-        """根據電梯狀態決定要傳送給模組的狀態字串。"""
-        if self.manual_emergency:
-            return "EMERGENCY" # 手動緊急優先級最高
-        elif self.auto_emergency:
-            return "FULL" # 自動偵測滿載
-        else:
-            return "NORMAL"
-    
+                frame = self.status_link.update(status, floor, direction.name, target_floor)
+                if frame is not None:
+                    logger.debug(f"--> [PYTHON SENDS] {status} {floor}F {direction.name} -> {target_floor}F: {frame.decode().strip()}")
+            except OSError as e:  # serial.SerialException 是 OSError 的子類別
+                logger.warning(f"Command send error: {e}")
+                self.drop_serial()
+
+    def drop_serial(self):
+        """關閉序列埠並停止讀取執行緒，之後不再與 Arduino 通訊。"""
+        if self.arduino_serial is not None:
+            self.arduino_serial.close()  # 讓讀取執行緒的 readline 立即結束
+        if self.serial_reader is not None:
+            self.serial_reader.stop()
+        self.arduino_serial = None
+        self.serial_reader = None
+        self.status_link = None
+
     def reset_background(self):
-        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
-        self.baseline_established = False
-        self.stabilization_frames = 0
-        print("Background Reset")
+        if self.detector is None:
+            return
+        self.detector.reset()
+        self.scheduler.reset()
+        self.baseline_ready = False
+        if self.vision_worker is not None:
+            self.vision_worker.reset()
+        logger.info("Background Reset")
     
 
 
-    def update_emergency_mode(self):
-        prev_full_load = self.full_load
-        self.full_load = self.manual_emergency or self.auto_emergency
-        if prev_full_load != self.full_load:
-            self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
+    def on_car_status(self, car_index, event, status, floor, direction, target):
+        """把 1 號車的狀態交給 Arduino 模組（事件匯流排每個畫面最多呼叫一次）。"""
+        self.send_to_arduino(status, floor, direction)
+
+    def on_controller_event(self, car_index, event, *args):
+        """更新 1 號車的狀態文字與音效（事件匯流排每個畫面最多呼叫一次）。"""
+        if event == "info":
+            self.info_label.config(text=args[0])
+        elif event == "arrived":
+            if self.scheduler is not None:
+                self.scheduler.on_arrival(time.monotonic())
+            # 播放樓層音效
+            self.play_floor_sound(args[0])
+
+    def floor_to_y(self, position):
+        """將以樓層為單位的車廂位置換算成車廂頂端的畫布 Y 座標。"""
+        floors = self.building.floors  # 連續樓層，直接換算不必搜尋
+        lower = min(max(int(position), floors[0]), floors[-1])
+        upper = min(lower + 1, floors[-1])
+        floor_y = self.floor_positions[lower]
+        if upper != lower:
+            floor_y += (self.floor_positions[upper] - floor_y) * (position - lower)
+        return floor_y - self.elevator_height
+
+    def door_coords(self, x, y, left):
+        """依車廂左上角座標計算左／右門的矩形座標。"""
+        half = self.elevator_width / 2
+        inset = min(5, self.elevator_height / 8)
+        door_x = x + 5 if left else x + half + 5
+        return door_x, y + inset, door_x + half - 10, y + self.elevator_height - inset
+
+    def move_car(self, car_index, event, position):
+        """把車廂畫到最新位置（事件匯流排每個畫面最多呼叫一次）。"""
+        y = self.floor_to_y(position)
+        self.canvas.move(self.car_tags[car_index], 0, y - self.car_y[car_index])
+        self.car_y[car_index] = y
+
+    def log_status(self, car_index, event, status, floor, direction, target):
+        logger.debug(f"{car_index + 1} 號車：{status} {floor}F {direction.name} -> {target}F")
 
     def toggle_full_load(self):
-        prev_emergency = self.full_load
-        self.manual_emergency = self.full_load_var.get()
-        self.update_emergency_mode()
-        
-        if self.manual_emergency:
-            print("🚨 手動：電梯已進入緊急模式 - 等待緊急內部請求")
-        else:
-            print("✅ 手動：電梯已解除緊急模式")
-            if prev_emergency:
-                print("電梯從緊急待命狀態恢復正常運作")
-                if self.pending_external_requests:
-                    pending_count = len(self.pending_external_requests)
-                    print(f"重新處理 {pending_count} 個暫存的外部請求")
-                    while self.pending_external_requests:
-                        req = self.pending_external_requests.popleft()
-                        self.add_request(req.floor, req.button_type)
-                if not self.is_moving_flag:
-                    self.master.after(100, self.process_requests)
-        
-        self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-
+        self.controller.set_manual_emergency(self.full_load_var.get())
 
-    def add_request(self, floor, button_type):
-        if floor == self.current_floor and button_type == ButtonType.INTERNAL:
-            print(f"忽略當前樓層 {floor} 的內部請求。")
-            return
-            
-        new_request = Request(floor, button_type)
-        
-        if button_type == ButtonType.INTERNAL:
-            if self.full_load:
-                if len(self.internal_requests) == 0:
-                    self.internal_requests.append(new_request)
-                    print(f"緊急模式：接受緊急內部請求 - 樓層 {floor}")
-                else:
-                    print(f"緊急模式：忽略額外的內部請求 - 樓層 {floor}（緊急救援進行中）")
-                    return
-            else:
-                if not any(req.floor == floor for req in self.internal_requests):
-                    self.internal_requests.append(new_request)
-                    print(f"內部請求：樓層 {floor}")
-        else:
-            if self.full_load:
-                self.pending_external_requests.append(new_request)
-                print(f"外部請求：樓層 {floor}（緊急模式，暫存）")
-            else:
-                if not any(req.floor == floor and req.button_type == button_type for req in self.external_requests):
-                    self.external_requests.append(new_request)
-                    print(f"外部請求：樓層 {floor}，方向：{button_type.name}")
-                    
-        self.info_label.config(text=f"Status：{self.get_status_text()}")
-        if not self.is_moving_flag:
-            self.master.after(100, self.process_requests)
-
-    def get_active_requests(self):
-        if self.full_load:
-            return self.internal_requests
-        return self.internal_requests + self.external_requests
-
-    def get_status_text(self):
-        if self.full_load:
-            if len(self.internal_requests) == 0:
-                return f"🚨 緊急模式：在 {self.current_floor} 樓待命，等待緊急內部請求"
-            else:
-                target = self.internal_requests[0].floor
-                if self.is_moving_flag:
-                    return f"🚨 緊急救援：前往 {target} 樓"
-                else:
-                    return f"🚨 緊急模式：準備前往 {target} 樓"
-        else:
-            active = self.get_active_requests()
-            reqs = "無請求" if not active else ", ".join(f"{req.floor}({req.button_type.name})" for req in active)
-            overall = "啟動" if self.full_load else "解除"
-            manual = "啟動" if self.manual_emergency else "解除"
-            auto = "啟動" if self.auto_emergency else "解除"
-            return (f"{'Moving' if self.is_moving_flag else 'IDLE'}（{self.current_floor} 樓），請求：{reqs}；"
-                    f" Emergency Mode(All:{overall}, Manual:{manual}, Auto:{auto})")
-
-    def process_requests(self):
-        active_requests = self.get_active_requests()
-        if not active_requests:
-            self.info_label.config(text=f"Status：waiting in {self.current_floor}F ")
-            self.direction = Direction.IDLE
-            self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
+    def update_penetration_detection(self):
+        if self.camera is None:
+            # 攝影機仍在背景開啟中
+            self.master.after(100, self.update_penetration_detection)
             return
-        next_stop = self.get_next_stop()
-        if next_stop is not None:
-            self.target_floor = next_stop
-            if self.target_floor > self.current_floor:
-                self.direction = Direction.UP
-            elif self.target_floor < self.current_floor:
-                self.direction = Direction.DOWN
-            else:
-                self.direction = Direction.IDLE
-            self.info_label.config(text=f"Moving {self.direction.name} to {self.target_floor} F")
-            self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-            self.animate_movement(self.current_floor, self.target_floor, frames=60)
-        else:
-            self.info_label.config(text="No next stop")
+        frame, timestamp, seq = self.camera.latest()
+        if frame is not None and seq != self.last_frame_seq:
+            self.last_frame_seq = seq
+            # 未到排程時間或畫面沒有變化時不偵測，沿用上一次的突破量
+            if self.scheduler.should_run(frame, self.controller, time.monotonic(), force=not self.baseline_ready):
+                self.detect(frame, timestamp)
+        if self.vision_worker is not None:
+            for result in self.vision_worker.poll():
+                self.apply_detection(result.ratio, result.roi_frame, result.timestamp, result.preview)
 
-    def get_next_stop(self):
-        active_requests = self.get_active_requests()
-        if not active_requests:
-            return None
-        
-        if self.full_load:
-            return self.get_next_internal_stop(active_requests)
-        
-        if self.direction == Direction.UP:
-            upper_stops = [req.floor for req in active_requests if req.floor > self.current_floor]
-            if upper_stops:
-                return min(upper_stops)
-        elif self.direction == Direction.DOWN:
-            lower_stops = [req.floor for req in active_requests if req.floor < self.current_floor]
-            if lower_stops:
-                return max(lower_stops)
-        nearest_stop = min(active_requests, key=lambda req: abs(req.floor - self.current_floor)).floor
-        return nearest_stop
-    
-    def get_next_internal_stop(self, internal_requests):
-        if not internal_requests:
-            return None
-        target_floor = internal_requests[0].floor
-        print(f"Emergency Mode：moving to {target_floor} F")
-        return target_floor
-
-    def remove_completed_requests(self):
-        self.internal_requests = [req for req in self.internal_requests if req.floor != self.current_floor]
-        if not self.full_load:
-            self.external_requests = [req for req in self.external_requests if req.floor != self.current_floor]
-
-    def animate_movement(self, start_floor, end_floor, frames):
-        self.is_moving_flag = True
-        self.anim_start_floor = start_floor
-        start_y = self.floor_positions[start_floor] - self.elevator_height
-        end_y = self.floor_positions[end_floor] - self.elevator_height
-        self.animation_frame = 0
-        
-        # 設定移動時間為 7.5 秒，每 50ms 更新一次
-        frame_interval = 50  # 毫秒
-        movement_time = 7.5  # 秒
-        self.total_frames = int((movement_time * 1000) / frame_interval)
-        
-        # 記錄開始時間用於除錯
-        self.movement_start_time = time.time()
-        print(f"電梯開始移動：從 {start_floor} 樓到 {end_floor} 樓，預計時間 {movement_time} 秒")
-        
-        # 保存最終目標樓層，不讓中途停靠改變它
-        self.final_target_floor = end_floor
-        self.target_floor = end_floor
-        self.dy = (end_y - start_y) / self.total_frames
-
-        def step():
-            if self.animation_frame < self.total_frames:
-                if not self.full_load and self.animation_frame % 20 == 0:
-                    # ... (中途停靠邏輯不變) ...
-                    active = self.get_active_requests()
-                    coords = self.canvas.coords(self.elevator_rect)
-                    current_y = coords[1]
-                    if self.direction == Direction.UP:
-                        possible = []
-                        for req in active:
-                            if req.button_type in (ButtonType.UP, ButtonType.INTERNAL):
-                                if (self.anim_start_floor < req.floor < self.target_floor):
-                                    stop_y = self.floor_positions[req.floor] - self.elevator_height
-                                    if current_y > stop_y:
-                                        possible.append(req.floor)
-                        if possible:
-                            new_target = min(possible)
-                            if new_target < self.target_floor:
-                                print(f"中途請求：改為先停 {new_target} 樓")
-                                # 只改變當前目標，不改變最終目標
-                                self.target_floor = new_target
-                                # 立即發送狀態更新
-                                self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-                                # 保持原有移動速度，不延長總時間
-                                new_end_y = self.floor_positions[new_target] - self.elevator_height
-                                remaining_frames = self.total_frames - self.animation_frame
-                                self.dy = (new_end_y - current_y) / remaining_frames
-                    elif self.direction == Direction.DOWN:
-                        possible = []
-                        for req in active:
-                            if req.button_type in (ButtonType.DOWN, ButtonType.INTERNAL):
-                                if (self.anim_start_floor > req.floor > self.target_floor):
-                                    stop_y = self.floor_positions[req.floor] - self.elevator_height
-                                    if current_y < stop_y:
-                                        possible.append(req.floor)
-                        if possible:
-                            new_target = max(possible)
-                            if new_target > self.target_floor:
-                                print(f"中途請求：改為先停 {new_target} 樓")
-                                self.target_floor = new_target
-                                # 立即發送狀態更新
-                                self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-                                # 保持原有移動速度，不延長總時間
-                                new_end_y = self.floor_positions[new_target] - self.elevator_height
-                                remaining_frames = self.total_frames - self.animation_frame
-                                self.dy = (new_end_y - current_y) / remaining_frames
-
-                self.canvas.move(self.elevator_rect, 0, self.dy)
-                self.canvas.move(self.elevator_door_left, 0, self.dy)
-                self.canvas.move(self.elevator_door_right, 0, self.dy)
-                self.animation_frame += 1
-                
-                # 計算當前樓層位置
-                coords = self.canvas.coords(self.elevator_rect)
-                current_y = coords[1]
-                
-                # 根據Y座標計算當前樓層
-                if self.direction == Direction.UP:
-                    # 上升時，根據Y座標判斷當前樓層
-                    if current_y <= self.floor_positions[2] - self.elevator_height:
-                        current_floor = 1
-                    elif current_y <= self.floor_positions[3] - self.elevator_height:
-                        current_floor = 2
-                    else:
-                        current_floor = 3
-                elif self.direction == Direction.DOWN:
-                    # 下降時，根據Y座標判斷當前樓層
-                    if current_y >= self.floor_positions[2] - self.elevator_height:
-                        current_floor = 3
-                    elif current_y >= self.floor_positions[1] - self.elevator_height:
-                        current_floor = 2
-                    else:
-                        current_floor = 1
-                else:
-                    current_floor = self.current_floor
-                
-                # 更新當前樓層並發送狀態
-                if current_floor != self.current_floor:
-                    self.current_floor = current_floor
-                    self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-                
-                # 每20幀（約1秒）發送一次狀態更新
-                if self.animation_frame % 20 == 0:
-                    self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-                
-                self.master.after(frame_interval, step)
-            else:
-                coords = self.canvas.coords(self.elevator_rect)
-                if self.target_floor is not None:
-                    final_y = self.floor_positions[self.target_floor] - self.elevator_height
-                    self.canvas.coords(self.elevator_rect, coords[0], final_y,
-                                       coords[0] + self.elevator_width, final_y + self.elevator_height)
-                    
-                    # 同時定位電梯門
-                    door_left_coords = self.canvas.coords(self.elevator_door_left)
-                    door_right_coords = self.canvas.coords(self.elevator_door_right)
-                    self.canvas.coords(self.elevator_door_left, door_left_coords[0], final_y + 5,
-                                       door_left_coords[2], final_y + self.elevator_height - 5)
-                    self.canvas.coords(self.elevator_door_right, door_right_coords[0], final_y + 5,
-                                       door_right_coords[2], final_y + self.elevator_height - 5)
-                    self.current_floor = self.target_floor
-                self.is_moving_flag = False
-                self.remove_completed_requests()
-                
-                # 計算實際移動時間
-                actual_time = time.time() - self.movement_start_time
-                print(f"電梯已到達 {self.current_floor} 樓，實際移動時間：{actual_time:.2f} 秒")
-                
-                # 播放樓層音效
-                self.play_floor_sound(self.current_floor)
-                
-                self.direction = Direction.IDLE
-                self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-
-                # 如果是自動緊急模式，在抵達目標樓層後重置狀態
-                if self.auto_emergency_active:
-                    print("🎯 自動緊急模式：已抵達目標樓層，重置緊急模式狀態")
-                    self.auto_emergency_active = False
-                    # 檢查當前突破量，如果仍然超過閾值則保持緊急模式
-                    if self.penetration_ratio / 100 < self.penetration_threshold:
-                        print("✅ 突破量已降低，自動解除緊急模式")
-                        self.auto_emergency = False
-                        self.update_emergency_mode()
-                        self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-                    else:
-                        print("⚠️ 突破量仍然過高，保持緊急模式")
-                
-                if self.full_load:
-                    self.internal_requests.clear()
-                    print("🚨 緊急救援完成！電梯將在此樓層待命，等待緊急情況解除")
-                    self.info_label.config(text=f"緊急救援完成 - 在 {self.current_floor} 樓待命")
-                    return 
-                
-                self.info_label.config(text=f"已到 {self.current_floor} 樓。{self.get_status_text()}")
-                
-                if not self.full_load and self.pending_external_requests:
-                    pending_count = len(self.pending_external_requests)
-                    print(f"緊急模式已解除，重新處理 {pending_count} 個暫存的外部請求")
-                    while self.pending_external_requests:
-                        req = self.pending_external_requests.popleft()
-                        self.add_request(req.floor, req.button_type)
-                
-                self.master.after(500, self.process_requests)
-        step()
+        self.master.after(100, self.update_penetration_detection)
 
-    def update_penetration_detection(self):
-        ret, frame = self.cap.read()
-        if ret:
-            # ... (影像處理邏輯不變，除了 send_to_arduino 的呼叫) ...
-            if not self.baseline_established:
-                self.stabilization_frames += 1
-                if self.stabilization_frames > 10:
-                    self.baseline_established = True
-                    print("背景基準已建立完成。")
-                self.background_subtractor.apply(frame)
-                
-                display_frame = frame.copy()
-                cv2.putText(display_frame, f"建立背景基準中 ({self.stabilization_frames}/10)...", 
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                
-                display_frame = cv2.resize(display_frame, (self.display_width, self.display_height))
-                
-                rgb_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(rgb_frame)
-                photo = ImageTk.PhotoImage(image)
-                self.camera_label.config(image=photo)
-                self.camera_label.image = photo
-                
-                self.master.after(100, self.update_penetration_detection)
-                return
-            
-            # 設定辨識區域 - 調整左右邊界
-            height, width = frame.shape[:2]
-            left_offset = int(width * 0.1)  # 左邊邊界往右調整 10%（比之前往左調整）
-            right_offset = int(width * 0.03)  # 右邊邊界往左調整 3%（比之前往右調整）
-            self.detection_roi = (left_offset, 0, width - left_offset - right_offset, height)
-            
-            # 只處理辨識區域內的影像
-            x, y, w, h = self.detection_roi
-            roi_frame = frame[y:y+h, x:x+w]
-            
-            self.total_area = w * h  # 只計算辨識區域的面積
-            fg_mask = self.background_subtractor.apply(roi_frame)
-            fg_mask = cv2.GaussianBlur(fg_mask, (5, 5), 0)
-            _, fg_mask = cv2.threshold(fg_mask, 128, 255, cv2.THRESH_BINARY)
-            kernel = np.ones((5, 5), np.uint8)
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
-            self.penetration_area = cv2.countNonZero(fg_mask)
-            self.penetration_ratio = (self.penetration_area / self.total_area) * 100
+    def detect(self, frame, timestamp):
+        threshold = self.controller.penetration_threshold
+        draw_preview = self.preview.due()  # 未到預覽更新時間時不畫預覽
+        if self.vision_worker is not None:
+            self.vision_worker.submit(frame, timestamp, threshold, draw_preview)
+        else:
+            ratio = self.detector.process(frame, threshold, draw_preview)
+            self.apply_detection(ratio, self.detector.roi_frame(frame), timestamp, self.detector.preview_rgb())
+
+    def apply_detection(self, ratio, roi_frame, timestamp, preview):
+        """套用一張畫面的偵測結果：更新突破量、錄製並顯示預覽。"""
+        if ratio is not None:
+            self.baseline_ready = True
+            self.penetration_ratio = ratio
             self.penetration_info_label.config(text=f"BS Value: {self.penetration_ratio:.2f}%")
-            
-            # 將處理後的遮罩放回原始影像位置
-            full_mask = np.zeros((height, width), dtype=np.uint8)
-            full_mask[y:y+h, x:x+w] = fg_mask
-            
-            fg_mask_colored = cv2.cvtColor(full_mask, cv2.COLOR_GRAY2BGR)
-            fg_mask_colored[np.where((fg_mask_colored == [255, 255, 255]).all(axis=2))] = [0, 0, 255]
-            alpha = 0.5
-            visualization = cv2.addWeighted(frame, 1, fg_mask_colored, alpha, 0)
-            
-            # 在畫面上繪製辨識區域邊界
-            cv2.rectangle(visualization, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv2.putText(visualization, "Detection Area", (x + 5, y - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-            cv2.putText(visualization, f"BS Value: {self.penetration_ratio:.2f}%", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            if self.penetration_ratio / 100 >= self.penetration_threshold:
-                cv2.putText(visualization, "⚠️ 物體過多", (10, 60),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                if not self.auto_emergency:
-                    print(f"偵測到突破量 {self.penetration_ratio:.2f}% 已超過閾值 {self.penetration_threshold * 100:.0f}%")
-                    print("🚨 自動啟動緊急模式 (滿載)")
-                    self.auto_emergency = True
-                    self.auto_emergency_active = True  # 標記自動緊急模式已啟動
-                    self.send_to_arduino("FULL", self.current_floor, self.direction)
-            else:
-                # 只有在電梯靜止且自動緊急模式已啟動時才解除
-                if self.auto_emergency and not self.is_moving_flag and self.auto_emergency_active:
-                    prev_emergency = self.full_load
-                    print(f"偵測到突破量 {self.penetration_ratio:.2f}% 已低於閾值 {self.penetration_threshold * 100:.0f}%")
-                    print("✅ 自動解除緊急模式")
-                    self.auto_emergency = False
-                    self.auto_emergency_active = False  # 標記自動緊急模式已解除
-                    self.update_emergency_mode()
-                    self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
-
-                    if prev_emergency and not self.full_load:
-                        print("電梯從緊急待命狀態恢復正常運作")
-                        if self.pending_external_requests:
-                            pending_count = len(self.pending_external_requests)
-                            print(f"重新處理 {pending_count} 個暫存的外部請求")
-                            while self.pending_external_requests:
-                                req = self.pending_external_requests.popleft()
-                                self.add_request(req.floor, req.button_type)
-                        if not self.is_moving_flag:
-                            self.master.after(100, self.process_requests)
-            
-            self.update_emergency_mode()
-            
-            visualization = cv2.resize(visualization, (self.display_width, self.display_height))
-            
-            rgb_frame = cv2.cvtColor(visualization, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(rgb_frame)
-            photo = ImageTk.PhotoImage(image)
-            self.camera_label.config(image=photo)
-            self.camera_label.image = photo
-            
-        self.master.after(100, self.update_penetration_detection)
+            # 閾值判斷與緊急模式切換交給控制核心
+            self.controller.update_penetration(self.penetration_ratio)
+        if self.recorder is not None:
+            self.recorder.write(roi_frame, ratio, timestamp)
+
+        self.preview.show(preview)
 
     def simulation_loop(self):
-        self.info_label.config(text=f"Status：{self.get_status_text()}")
-        self.send_to_arduino(self.get_current_module_status(), self.current_floor, self.direction)
+        # 經由匯流排更新，與同一個畫面內的其他狀態文字合併
+        self.bus.publish(0, "info", f"Status：{self.controller.get_status_text()}")
+        self.controller.notify_status()
         self.master.after(1000, self.simulation_loop)
     
+    def process_api_commands(self):
+        """在 Tk 主執行緒套用控制介面收到的呼叫"""
+        self.api.process_commands()
+        self.master.after(100, self.process_api_commands)
+
     def start_arduino_button_check(self):
         """開始定期檢查 Arduino 按鈕"""
         self.check_arduino_buttons()
         self.master.after(100, self.start_arduino_button_check)  # 每 100ms 檢查一次
     
     def check_arduino_buttons(self):
-        """檢查 Arduino 傳來的按鈕訊號"""
-        if isinstance(self.arduino_serial, serial.Serial) and self.arduino_serial.is_open:
-            try:
-                if self.arduino_serial.in_waiting > 0:
-                    line = self.arduino_serial.readline().decode('utf-8').strip()
-                    print(f"<-- [ARDUINO SENDS] {line}")
-                    
-                    if line.startswith("BUTTON:"):
-                        self.handle_arduino_button(line)
-                    elif line.startswith("PLAY_SOUND:"):
-                        # 處理音效播放指令
-                        sound_file = line.split(":")[1]
-                        self.play_sound(sound_file)
-            except serial.SerialException as e:
-                print(f"Arduino 通訊錯誤: {e}")
+        """處理背景讀取執行緒收到的 Arduino 事件"""
+        if self.serial_reader is None:
+            return
+        for kind, line in self.serial_reader.drain():
+            if kind == "ACK":
+                if self.status_link is not None:
+                    self.status_link.acknowledge(line)
+                continue
+            logger.debug(f"<-- [ARDUINO SENDS] {line}")
+            if kind == "BUTTON":
+                if self.journal is not None:
+                    self.journal.record_serial(0, line)
+                self.handle_arduino_button(line)
+            elif kind == "PLAY_SOUND":
+                # 處理音效播放指令
+                sound_file = line.split(":")[1]
+                self.play_sound(sound_file)
+        if self.serial_reader is not None and not self.serial_reader.is_alive():
+            logger.warning(f"Arduino 通訊錯誤: {self.serial_reader.error}")
+            self.drop_serial()
     
     def handle_arduino_button(self, button_signal):
         """處理 Arduino 按鈕訊號"""
-        if button_signal == "BUTTON:1":
-            print("Arduino 一樓按鈕被按下")
-            self.add_request(1, ButtonType.INTERNAL)
-        elif button_signal == "BUTTON:2":
-            print("Arduino 二樓按鈕被按下")
-            self.add_request(2, ButtonType.INTERNAL)
-        elif button_signal == "BUTTON:3":
-            print("Arduino 三樓按鈕被按下")
-            self.add_request(3, ButtonType.INTERNAL)
+        value = button_signal[len("BUTTON:"):]
+        if value.isdigit():
+            floor = int(value)
+            if floor in self.building.floors:
+                logger.info(f"Arduino {floor} 樓按鈕被按下")
+                self.controller.add_request(floor, ButtonType.INTERNAL)
+            else:
+                logger.warning(f"Arduino 按鈕樓層 {floor} 超出範圍，忽略")
         elif button_signal == "BUTTON:EMERGENCY_ON":
-            print("Arduino 緊急按鈕被按下 - 進入緊急模式")
+            logger.info("Arduino 緊急按鈕被按下 - 進入緊急模式")
             self.full_load_var.set(True)
             self.toggle_full_load()
         elif button_signal == "BUTTON:EMERGENCY_OFF":
-            print("Arduino 緊急按鈕被按下 - 解除緊急模式")
+            logger.info("Arduino 緊急按鈕被按下 - 解除緊急模式")
             self.full_load_var.set(False)
             self.toggle_full_load()
         elif button_signal.startswith("PLAY_SOUND:"):
@@ -741,32 +502,72 @@ class ElevatorControlSim:
         self.play_sound(sound_file)
     
     def play_sound(self, sound_file):
-        """播放音效檔案"""
-        try:
-            # 檢查音效檔案是否存在（在 Code 資料夾下）
-            sound_path = os.path.join(os.path.dirname(__file__), sound_file)
-            print(f"嘗試播放音效: {sound_file}")
-            print(f"音效檔案路徑: {sound_path}")
-            print(f"檔案是否存在: {os.path.exists(sound_path)}")
-            
-            if os.path.exists(sound_path):
-                # 使用 afplay 播放音效 (macOS)
-                subprocess.Popen(["afplay", sound_path])
-                print(f"✅ 成功播放音效: {sound_file}")
-            else:
-                print(f"❌ 音效檔案不存在: {sound_path}")
-        except Exception as e:
-            print(f"❌ 播放音效失敗: {e}")
+        """播放音效檔案（例如 "1f.mp3"），依目前語言選擇版本"""
+        name = os.path.splitext(sound_file)[0]
+        if self.audio is None:
+            logger.debug(f"音效尚未載入完成，略過: {sound_file}")
+        elif self.audio.play(name):
+            logger.debug(f"播放音效: {sound_file}")
 
     def on_closing(self):
-        if isinstance(self.arduino_serial, serial.Serial) and self.arduino_serial.is_open:
-            print("關閉 Arduino 連接...")
+        # 仍在初始化的裝置等它開啟後再一併關閉，避免留下開著的攝影機或序列埠
+        for task in self.startup_tasks:
+            task.wait(timeout=3.0)
+            task.poll()
+        self.startup_tasks = []
+        if self.arduino_serial is not None and self.arduino_serial.is_open:
+            logger.info("關閉 Arduino 連接...")
             self.arduino_serial.close()
-        self.cap.release()
+        if self.serial_reader is not None:
+            self.serial_reader.stop()
+        if self.camera is not None:
+            self.camera.release()
+        if self.audio is not None:
+            self.audio.stop()
+        if self.vision_worker is not None:
+            self.vision_worker.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.api is not None:
+            self.api.stop()
         self.master.destroy()
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Elevator Operation Preview Application")
+    parser.add_argument("--floors", type=int, default=3, help="樓層數")
+    parser.add_argument("--cars", type=int, default=1, help="車廂數")
+    parser.add_argument("--record", metavar="PATH", help="錄製攝影機辨識區域畫面與突破量")
+    parser.add_argument("--journal", metavar="PATH", help="把控制器的輸入與狀態變化寫入日誌（journal.py 重播）")
+    parser.add_argument("--api-port", type=int, help="在此埠提供 HTTP／SSE 控制介面（control_api.py）")
+    parser.add_argument("--api-host", default="127.0.0.1", help="控制介面的監聽位址（0.0.0.0 開放給區域網路）")
+    parser.add_argument("--vision-process", action="store_true", help="在獨立行程執行影像偵測")
+    parser.add_argument("--port", help="Arduino 序列埠（預設自動尋找）")
+    parser.add_argument("--audio-lang", choices=sorted(LANGUAGES), default="zh", help="語音語言")
+    parser.add_argument("--no-audio", action="store_true", help="停用音效")
+    parser.add_argument("--engine", choices=ENGINE_NAMES, default="mog2",
+                        help="佔用估計引擎（可先用 camera_replay.py --engines 比較）")
+    parser.add_argument("--preview-fps", type=float, default=10.0, help="攝影機預覽每秒更新次數（0 為關閉）")
+    parser.add_argument("--no-preview", action="store_true", help="關閉攝影機預覽（偵測照常進行）")
+    parser.add_argument("--log-level", default="INFO", help="日誌層級（DEBUG 會顯示每筆序列埠通訊）")
+    parser.add_argument("--metrics-port", type=int, help="在 http://127.0.0.1:PORT/metrics 提供 Prometheus 指標")
+    parser.add_argument("--metrics-snapshot", metavar="PATH", help="每分鐘把指標快照寫到 PATH（JSON）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    if args.metrics_port:
+        metrics.REGISTRY.serve_http(args.metrics_port)
+    if args.metrics_snapshot:
+        metrics.REGISTRY.start_snapshots(args.metrics_snapshot)
+
     root = tk.Tk()
-    sim = ElevatorControlSim(root)
+    sim = ElevatorControlSim(root, Building(args.floors, args.cars), record_path=args.record,
+                             vision_process=args.vision_process, serial_port=args.port,
+                             audio_language=args.audio_lang, audio=not args.no_audio,
+                             preview_fps=0 if args.no_preview else args.preview_fps, engine=args.engine,
+                             journal_path=args.journal, api_port=args.api_port, api_host=args.api_host)
     root.protocol("WM_DELETE_WINDOW", sim.on_closing)
     root.mainloop()
\ No newline at end of file
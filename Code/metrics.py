@@ -0,0 +1,206 @@
+"""執行期量測：計數器與固定區間直方圖，以 Prometheus 文字格式或快照檔匯出。
+
+每個執行緒寫入自己的計數格，記錄時不需要鎖；只有執行緒第一次寫入某個指標時
+才會在鎖內登記它的計數格，讀取時再把所有計數格加總。
+
+    from metrics import TRIP_DURATION
+    TRIP_DURATION.observe(5.05)
+
+serve_http(port) 在 http://127.0.0.1:port/metrics 提供 Prometheus 格式；
+start_snapshots(path) 定期把所有指標寫成 JSON 檔。
+"""
+import bisect
+import json
+import threading
+import time
+
+
+class _Metric:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def _cell(self):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._new_cell()
+            self._local.cell = cell
+            with self._lock:
+                self._cells.append(cell)
+        return cell
+
+
+class Counter(_Metric):
+    """只會增加的計數器。"""
+
+    kind = "counter"
+
+    def _new_cell(self):
+        return [0]
+
+    def inc(self, amount=1):
+        self._cell()[0] += amount
+
+    @property
+    def value(self):
+        return sum(cell[0] for cell in list(self._cells))
+
+    def render(self):
+        return [f"{self.name} {self.value}"]
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram(_Metric):
+    """固定區間的直方圖，buckets 為由小到大的上界（秒）。"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def _new_cell(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]  # 各區間次數、超出最大上界的次數、總和
+
+    def observe(self, value):
+        cell = self._cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def _totals(self):
+        totals = [0] * (len(self.buckets) + 2)
+        for cell in list(self._cells):
+            for i, count in enumerate(cell):
+                totals[i] += count
+        return totals[:-1], totals[-1]
+
+    def render(self):
+        counts, total = self._totals()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total:.6f}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+    def snapshot(self):
+        counts, total = self._totals()
+        return {"buckets": dict(zip([f"{b:g}" for b in self.buckets] + ["+Inf"], counts)),
+                "sum": total, "count": sum(counts)}
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"指標 {metric.name} 已存在")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {"time": time.time(), "metrics": {name: m.snapshot() for name, m in self.metrics.items()}}
+
+    def write_snapshot(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def serve_http(self, port, host="127.0.0.1"):
+        """在背景執行緒提供 /metrics，回傳 HTTP 伺服器（呼叫 shutdown() 停止）。"""
+        # 大多數執行不開 HTTP 端點，http.server 到這裡才載入以縮短啟動時間
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def start_snapshots(self, path, interval=60.0):
+        """每 interval 秒把快照寫到 path，回傳可用來停止的 threading.Event。"""
+        stopped = threading.Event()
+
+        def run():
+            while not stopped.wait(interval):
+                self.write_snapshot(path)
+
+        threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+        return stopped
+
+
+class ControllerMetrics:
+    """ElevatorController 記錄的指標，登記在 registry（None 時建立一份獨立的 Registry）。
+
+    全域的 CONTROLLER_METRICS 登記在 REGISTRY，只給即時時鐘的控制器使用；
+    虛擬時鐘的模擬各自使用獨立的一份，模擬時間不會混進匯出的指標。
+    """
+
+    def __init__(self, registry=None):
+        self.registry = Registry() if registry is None else registry
+        self.request_wait = self.registry.histogram(
+            "elevator_request_wait_seconds", "從請求建立到電梯抵達該樓層的時間",
+            (5, 10, 20, 30, 45, 60, 90, 120, 180, 300))
+        self.trip_duration = self.registry.histogram(
+            "elevator_trip_duration_seconds", "每趟移動的實際時間",
+            (2, 4, 6, 8, 10, 15, 20, 30, 45, 60))
+        self.emergency_activations = self.registry.counter(
+            "elevator_emergency_activations_total", "進入緊急模式的次數")
+
+
+REGISTRY = Registry()
+
+CONTROLLER_METRICS = ControllerMetrics(REGISTRY)
+REQUEST_WAIT = CONTROLLER_METRICS.request_wait
+TRIP_DURATION = CONTROLLER_METRICS.trip_duration
+EMERGENCY_ACTIVATIONS = CONTROLLER_METRICS.emergency_activations
+SERIAL_WRITE = REGISTRY.histogram(
+    "elevator_serial_write_seconds", "寫入車廂模組序列埠的時間",
+    (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.05, 0.1))
+DETECTION_FRAME = REGISTRY.histogram(
+    "elevator_detection_frame_seconds", "突破量偵測處理一張畫面的時間",
+    (0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2))
+EVENTS_PUBLISHED = REGISTRY.counter(
+    "elevator_events_published_total", "送進事件匯流排的控制器事件數")
+EVENTS_COALESCED = REGISTRY.counter(
+    "elevator_events_coalesced_total", "在事件匯流排中被較新的值取代、不必送出的事件數")
@@ -0,0 +1,155 @@
+"""加加速度（jerk）受限的車廂移動模型與預先計算的飛行時間表。
+
+每趟移動都從靜止出發、停在目標樓層，速度曲線為對稱的 S 曲線：
+以 jerk 把加速度拉到 acceleration，維持到接近 max_velocity 後再以 jerk 收回，
+等速行駛，最後以相同的方式減速。距離太短時達不到最高速度（或最大加速度），
+各段會依距離縮短。
+
+MotionProfile 在建立時為每一種樓層距離計算：
+- flight_times：飛行時間（以控制器的幀間隔取整，與動畫實際花費的時間一致）
+- trajectories：每一幀相對出發樓層的位移（樓層為單位）
+- brake_times：該趟開始偏離「全力加速再等速」曲線的時間；較長的一趟在這之前
+  與它的軌跡完全相同，所以仍可改為停在這個距離
+- stopping_distances：出發後第 n 幀還來得及停靠的最短距離
+
+查詢都是查表，派車時取得 ETA 或判斷「還停得下 k 樓嗎」都是 O(1)。
+"""
+import math
+
+
+class MotionProfile:
+    """S 曲線移動模型。
+
+    num_floors：樓層數，決定要計算的最長距離
+    max_velocity（m/s）、acceleration（m/s²）、jerk（m/s³）、floor_height（m）
+    frame_interval：動畫每一幀的秒數，需與 ElevatorController.FRAME_INTERVAL 相同
+    """
+
+    def __init__(self, num_floors, max_velocity=1.0, acceleration=0.8, jerk=1.0,
+                 floor_height=3.0, frame_interval=0.05):
+        if min(max_velocity, acceleration, jerk, floor_height, frame_interval) <= 0:
+            raise ValueError("速度、加速度、jerk、樓高與幀間隔都必須大於 0")
+        self.num_floors = num_floors
+        self.max_velocity = max_velocity
+        self.acceleration = acceleration
+        self.jerk = jerk
+        self.floor_height = floor_height
+        self.frame_interval = frame_interval
+
+        self.flight_times = []
+        self.trajectories = []
+        self.brake_times = []
+        for distance in range(num_floors):
+            segments, brake_time = self._plan(distance * floor_height)
+            trajectory = self._sample(segments, distance)
+            self.trajectories.append(trajectory)
+            self.flight_times.append(len(trajectory) * frame_interval)
+            self.brake_times.append(brake_time)
+
+        # 第 n 幀還停得下的最短距離；brake_times 隨距離遞增，用單一指標掃過即可
+        longest = max(len(t) for t in self.trajectories)
+        self.stopping_distances = []
+        distance = 1
+        for frame in range(longest + 1):
+            elapsed = frame * frame_interval
+            while distance < num_floors - 1 and elapsed > self.brake_times[distance] + 1e-9:
+                distance += 1
+            self.stopping_distances.append(distance)
+
+    # --- 預先計算 ---
+
+    def _accel_phase(self, peak_velocity):
+        """從靜止加速到 peak_velocity 的 (jerk 段時間, 等加速段時間)。"""
+        a, j = self.acceleration, self.jerk
+        if peak_velocity * j >= a * a:
+            return a / j, peak_velocity / a - a / j
+        return math.sqrt(peak_velocity / j), 0.0
+
+    def _plan(self, length):
+        """回傳 [(jerk, 持續時間)] 片段與開始偏離全力加速曲線的時間。"""
+        if length <= 0:
+            return [], 0.0
+        j, v = self.jerk, self.max_velocity
+
+        def accel_time(peak):
+            t_j, t_a = self._accel_phase(peak)
+            return 2 * t_j + t_a
+
+        # 加速段與減速段對稱，兩段共走 peak * accel_time(peak)
+        if v * accel_time(v) <= length:
+            peak, cruise = v, (length - v * accel_time(v)) / v
+        else:
+            low, high = 0.0, v
+            for _ in range(60):
+                mid = (low + high) / 2
+                if mid * accel_time(mid) < length:
+                    low = mid
+                else:
+                    high = mid
+            peak, cruise = (low + high) / 2, 0.0
+
+        t_j, t_a = self._accel_phase(peak)
+        segments = [(j, t_j), (0.0, t_a), (-j, t_j), (0.0, cruise), (-j, t_j), (0.0, t_a), (j, t_j)]
+        if peak >= v:
+            brake_time = 2 * t_j + t_a + cruise  # 開始減速
+        elif t_a > 0:
+            brake_time = t_j + t_a               # 提早收回加速度
+        else:
+            brake_time = t_j                     # 還沒到最大加速度就開始收回
+        return segments, brake_time
+
+    def _sample(self, segments, distance):
+        """依幀間隔取樣位移（樓層），最後一幀剛好落在 distance。"""
+        total = sum(duration for _, duration in segments)
+        frames = math.ceil(total / self.frame_interval - 1e-9)
+        trajectory = []
+        for frame in range(1, frames):
+            t = frame * self.frame_interval
+            s = v = a = 0.0
+            for j, duration in segments:
+                dt = min(duration, t)
+                s += v * dt + a * dt * dt / 2 + j * dt ** 3 / 6
+                v += a * dt + j * dt * dt / 2
+                a += j * dt
+                t -= dt
+                if t <= 0:
+                    break
+            trajectory.append(min(s / self.floor_height, distance))
+        if frames:
+            trajectory.append(float(distance))
+        return tuple(trajectory)
+
+    # --- 查詢 ---
+
+    def flight_time(self, distance):
+        """移動 distance 層所需的秒數。"""
+        return self.flight_times[abs(distance)]
+
+    def trajectory(self, distance):
+        """移動 distance 層時每一幀的位移（不含出發點）。"""
+        return self.trajectories[abs(distance)]
+
+    def can_stop(self, frame, distance):
+        """出發後第 frame 幀時，是否還能改為停在距出發樓層 distance 層的位置。"""
+        return frame * self.frame_interval <= self.brake_times[abs(distance)] + 1e-9
+
+    def stopping_distance(self, frame):
+        """出發後第 frame 幀時還來得及停靠的最短距離（樓層）。"""
+        return self.stopping_distances[min(frame, len(self.stopping_distances) - 1)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="列出 S 曲線移動模型的飛行時間表")
+    parser.add_argument("--floors", type=int, default=10, help="樓層數")
+    parser.add_argument("--velocity", type=float, default=1.0, help="最高速度（m/s）")
+    parser.add_argument("--acceleration", type=float, default=0.8, help="最大加速度（m/s²）")
+    parser.add_argument("--jerk", type=float, default=1.0, help="最大 jerk（m/s³）")
+    parser.add_argument("--floor-height", type=float, default=3.0, help="樓高（m）")
+    args = parser.parse_args()
+
+    profile = MotionProfile(args.floors, args.velocity, args.acceleration, args.jerk, args.floor_height)
+    print(f"{'距離':>4}{'飛行時間':>10}{'煞車時間點':>10}")
+    for distance in range(1, args.floors):
+        print(f"{distance:>6}{profile.flight_time(distance):>12.2f}{profile.brake_times[distance]:>14.2f}")
@@ -0,0 +1,162 @@
+"""車廂佔用估計引擎：把縮小後的辨識區域畫面轉成前景遮罩。
+
+PenetrationDetector 負責縮放、統計與預覽，前景判斷交給引擎：
+- mog2：原本的 cv2 MOG2 背景相減（偵測陰影），需要 10 張畫面建立背景
+- knn：cv2 KNN 背景相減，對光線緩慢變化較穩定
+- average：灰階滑動平均背景，第一張畫面即為背景，重設後不必等待
+- grid：以積分影像計算每個小區塊的亮度平均與標準差，與背景比較後整塊標記，
+  不做逐像素的模糊與形態學運算，成本最低
+
+每個引擎提供：
+- warmup：第一張畫面之後，建立背景還需要的畫面數（期間 apply 的結果不採用）
+- smooth：遮罩是否需要再經過模糊、二值化與形態學運算去雜訊
+- apply(frame, mask)：以 frame（BGR）更新背景並把前景（0 或 255）寫入 mask
+- reset()：丟棄背景模型
+"""
+import cv2
+import numpy as np
+
+
+class MOG2Engine:
+    name = "mog2"
+    warmup = 10
+    smooth = True
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
+
+    def apply(self, frame, mask):
+        self.subtractor.apply(frame, fgmask=mask)
+
+
+class KNNEngine(MOG2Engine):
+    name = "knn"
+
+    def reset(self):
+        self.subtractor = cv2.createBackgroundSubtractorKNN(history=500, dist2Threshold=400.0, detectShadows=True)
+
+
+class _GrayEngine:
+    """先把畫面轉成灰階的引擎共用部分。"""
+
+    def __init__(self):
+        self._gray = None
+        self.reset()
+
+    def _to_gray(self, frame):
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+
+class RunningAverageEngine(_GrayEngine):
+    """灰階滑動平均背景；只有判斷為背景的像素會併入背景，乘客不會被慢慢吸收。
+
+    alpha：背景更新速率；threshold：與背景的灰階差異超過此值視為前景
+    """
+
+    name = "average"
+    warmup = 0
+    smooth = True
+
+    def __init__(self, alpha=0.02, threshold=25):
+        self.alpha = alpha
+        self.threshold = threshold
+        super().__init__()
+
+    def reset(self):
+        self.background = None
+
+    def apply(self, frame, mask):
+        gray = self._to_gray(frame)
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self._background_u8 = np.empty_like(gray)
+            self._still = np.empty_like(gray)
+            mask[...] = 0
+            return
+        cv2.convertScaleAbs(self.background, dst=self._background_u8)
+        cv2.absdiff(gray, self._background_u8, dst=mask)
+        cv2.threshold(mask, self.threshold, 255, cv2.THRESH_BINARY, dst=mask)
+        cv2.bitwise_not(mask, dst=self._still)
+        cv2.accumulateWeighted(gray, self.background, self.alpha, mask=self._still)
+
+
+class GridEngine(_GrayEngine):
+    """以積分影像比較 block×block 像素小區塊的亮度平均與標準差。
+
+    mean_threshold、std_threshold：區塊平均／標準差與背景的差異超過任一閾值即視為前景
+    """
+
+    name = "grid"
+    warmup = 0
+    smooth = False
+
+    def __init__(self, block=8, mean_threshold=18.0, std_threshold=12.0, alpha=0.02):
+        self.block = block
+        self.mean_threshold = mean_threshold
+        self.std_threshold = std_threshold
+        self.alpha = alpha
+        super().__init__()
+
+    def reset(self):
+        self.background = None  # (區塊平均, 區塊標準差)
+
+    def _block_stats(self, gray):
+        block = self.block
+        rows, cols = max(1, gray.shape[0] // block), max(1, gray.shape[1] // block)
+        total, squares = cv2.integral2(gray, sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        area = float(block * block)
+
+        def block_sums(integral):
+            # 區塊邊界間隔固定，用切片取出角點即可，不必逐塊查表
+            corners = integral[:rows * block + 1:block, :cols * block + 1:block]
+            return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+        mean = block_sums(total) / area
+        std = np.sqrt(np.maximum(block_sums(squares) / area - mean * mean, 0.0))
+        return mean, std
+
+    def apply(self, frame, mask):
+        mean, std = self._block_stats(self._to_gray(frame))
+        if self.background is None or self.background[0].shape != mean.shape:
+            self.background = (mean, std)
+            mask[...] = 0
+            return
+        bg_mean, bg_std = self.background
+        occupied = (np.abs(mean - bg_mean) > self.mean_threshold) | (np.abs(std - bg_std) > self.std_threshold)
+        # 只有背景區塊會更新背景
+        rate = np.where(occupied, 0.0, self.alpha)
+        bg_mean += rate * (mean - bg_mean)
+        bg_std += rate * (std - bg_std)
+        # 邊緣不足一個區塊的像素併入最近的區塊
+        cv2.resize(occupied.view(np.uint8) * np.uint8(255), mask.shape[::-1], dst=mask,
+                   interpolation=cv2.INTER_NEAREST)
+
+
+ENGINES = {engine.name: engine for engine in (MOG2Engine, KNNEngine, RunningAverageEngine, GridEngine)}
+
+
+def create_engine(name):
+    if name not in ENGINES:
+        raise ValueError(f"未知的佔用估計引擎：{name}（可用：{', '.join(ENGINES)}）")
+    return ENGINES[name]()
+
+
+def cell_occupancy(mask, grid_shape, out=None):
+    """遮罩在 grid_shape (列, 欄) 每一格中前景像素的比例（0~1）。"""
+    rows, cols = grid_shape
+    ys = np.linspace(0, mask.shape[0], rows + 1).astype(np.intp)
+    xs = np.linspace(0, mask.shape[1], cols + 1).astype(np.intp)
+    integral = cv2.integral(mask, sdepth=cv2.CV_32S)
+    sums = (integral[np.ix_(ys[1:], xs[1:])] - integral[np.ix_(ys[:-1], xs[1:])]
+            - integral[np.ix_(ys[1:], xs[:-1])] + integral[np.ix_(ys[:-1], xs[:-1])])
+    area = np.outer(np.diff(ys), np.diff(xs)) * 255.0
+    if out is None:
+        return sums / area
+    np.divide(sums, area, out=out)
+    return out
@@ -0,0 +1,175 @@
+"""以背景相減估計車廂內的突破量（前景面積佔辨識區域的百分比）與各分區的佔用比例。
+
+偵測在縮小後的辨識區域上進行，預覽疊圖只在顯示尺寸上計算；
+所有中間影像都預先配置並重複使用，畫面尺寸改變時才重新配置。
+"""
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from metrics import DETECTION_FRAME
+from occupancy import cell_occupancy, create_engine
+
+logger = logging.getLogger(__name__)
+
+
+def detection_roi(frame_shape, roi_margins):
+    """依左右邊界比例計算辨識區域 (x, y, w, h)。"""
+    height, width = frame_shape[:2]
+    left = int(width * roi_margins[0])
+    right = int(width * roi_margins[1])
+    return (left, 0, width - left - right, height)
+
+
+class PenetrationDetector:
+    """背景相減偵測器。
+
+    preview_size：預覽影像大小 (寬, 高)
+    detection_scale：辨識區域縮小的倍率（1.0 為原始解析度）
+    roi_margins：辨識區域左、右邊界往內縮的比例（相對於畫面寬度）
+    profile：為 True 時把各階段耗時（秒）累加到 stage_times
+    engine：occupancy.ENGINES 中的前景估計引擎名稱
+    grid_shape：grid（各格佔用比例）的 (列, 欄)，對應車廂地板的分區
+    """
+
+    OVERLAY_COLOR = (0, 0, 127)  # 前景區域疊加的顏色（BGR，等同原本紅色遮罩 alpha 0.5）
+    STAGES = ("resize", "subtract", "filter", "overlay")  # profile 時統計耗時的階段
+
+    def __init__(self, preview_size=(240, 180), detection_scale=0.5, roi_margins=(0.1, 0.03), profile=False,
+                 engine="mog2", grid_shape=(3, 4)):
+        self.preview_size = preview_size
+        self.detection_scale = detection_scale
+        self.roi_margins = roi_margins
+        self.kernel = np.ones((5, 5), np.uint8)
+        self.penetration_ratio = 0
+        self.engine = create_engine(engine)
+        self.grid_shape = tuple(grid_shape)
+        self.grid = np.zeros(self.grid_shape)  # 最近一次偵測各格的佔用比例（0~1）
+        self.roi = None  # 原始畫面上的辨識區域 (x, y, w, h)
+        self._frame_shape = None
+        self.profile = profile
+        self.stage_times = dict.fromkeys(self.STAGES, 0.0)
+        self.last_frame_time = 0.0  # 最近一次 process() 的耗時（秒）
+        self.preview_drawn = False  # 最近一次 process() 是否畫了預覽影像
+        self.reset()
+
+    def reset(self):
+        """重新建立背景模型。"""
+        self.engine.reset()
+        self.baseline_established = False
+        self.stabilization_frames = 0
+
+    def _allocate(self, frame_shape):
+        height, width = frame_shape[:2]
+        self.roi = detection_roi(frame_shape, self.roi_margins)
+        x, y, w, h = self.roi
+
+        self._small_size = (max(1, round(w * self.detection_scale)), max(1, round(h * self.detection_scale)))
+        small_w, small_h = self._small_size
+        self._small = np.empty((small_h, small_w, 3), np.uint8)
+        self._mask = np.empty((small_h, small_w), np.uint8)
+
+        preview_w, preview_h = self.preview_size
+        sx, sy = preview_w / width, preview_h / height
+        self._preview_roi = (round(x * sx), round(y * sy), max(1, round(w * sx)), max(1, round(h * sy)))
+        px, py, pw, ph = self._preview_roi
+        self._preview = np.empty((preview_h, preview_w, 3), np.uint8)
+        self._preview_rgb = np.empty_like(self._preview)
+        self._preview_mask = np.zeros((preview_h, preview_w), np.uint8)
+        self._preview_mask_roi = np.empty((ph, pw), np.uint8)
+        self._text_scale = sx
+
+        self._frame_shape = frame_shape
+
+    def process(self, frame, threshold=None, draw_preview=True):
+        """處理一張畫面，回傳突破量（百分比）；建立背景基準期間回傳 None。
+
+        threshold 為觸發緊急模式的比例（0~1），超過時在預覽上標示警告。
+        draw_preview 為 False 時略過預覽影像的縮放與疊圖（預覽未顯示或未到更新時間時使用）。
+        """
+        start = time.perf_counter()
+        self.preview_drawn = draw_preview
+        ratio = self._process(frame, threshold)
+        self.last_frame_time = time.perf_counter() - start
+        DETECTION_FRAME.observe(self.last_frame_time)
+        return ratio
+
+    def _process(self, frame, threshold):
+        if frame.shape != self._frame_shape:
+            self._allocate(frame.shape)
+        self._mark = time.perf_counter() if self.profile else None
+        x, y, w, h = self.roi
+        cv2.resize(frame[y:y + h, x:x + w], self._small_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        if self.preview_drawn:
+            cv2.resize(frame, self.preview_size, dst=self._preview, interpolation=cv2.INTER_AREA)
+        self._lap("resize")
+
+        if not self.baseline_established:
+            self.stabilization_frames += 1
+            if self.stabilization_frames > self.engine.warmup:
+                self.baseline_established = True
+                logger.info("背景基準已建立完成。")
+            self.engine.apply(self._small, self._mask)
+            self._lap("subtract")
+            self._put_text(f"建立背景基準中 ({self.stabilization_frames}/{self.engine.warmup + 1})...",
+                           (10, 30), 0.7, (0, 0, 255), 2)
+            return None
+
+        mask = self._mask
+        self.engine.apply(self._small, mask)
+        self._lap("subtract")
+        if self.engine.smooth:
+            cv2.GaussianBlur(mask, (5, 5), 0, dst=mask)
+            cv2.threshold(mask, 128, 255, cv2.THRESH_BINARY, dst=mask)
+            cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel, dst=mask)
+            cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel, dst=mask)
+        self.penetration_ratio = cv2.countNonZero(mask) / mask.size * 100
+        cell_occupancy(mask, self.grid_shape, out=self.grid)
+        self._lap("filter")
+        if not self.preview_drawn:
+            return self.penetration_ratio
+
+        # 遮罩縮放到預覽尺寸後疊加在預覽影像上
+        px, py, pw, ph = self._preview_roi
+        cv2.resize(mask, (pw, ph), dst=self._preview_mask_roi, interpolation=cv2.INTER_NEAREST)
+        self._preview_mask[py:py + ph, px:px + pw] = self._preview_mask_roi
+        cv2.add(self._preview, self.OVERLAY_COLOR, dst=self._preview, mask=self._preview_mask)
+
+        cv2.rectangle(self._preview, (px, py), (px + pw - 1, py + ph - 1), (0, 255, 0), 1)
+        self._put_text("Detection Area", (x + 5, y + 20), 0.5, (0, 255, 0), 1)
+        self._put_text(f"BS Value: {self.penetration_ratio:.2f}%", (10, 30), 0.7, (0, 255, 0), 2)
+        if threshold is not None and self.penetration_ratio / 100 >= threshold:
+            self._put_text("⚠️ 物體過多", (10, 60), 0.7, (0, 0, 255), 2)
+        self._lap("overlay")
+        return self.penetration_ratio
+
+    def _lap(self, stage):
+        if self._mark is None:
+            return
+        now = time.perf_counter()
+        self.stage_times[stage] += now - self._mark
+        self._mark = now
+
+    def _put_text(self, text, origin, font_scale, color, thickness):
+        """以原始畫面座標與字級在預覽影像上寫字。"""
+        if not self.preview_drawn:
+            return
+        scale = self._text_scale
+        cv2.putText(self._preview, text, (round(origin[0] * scale), round(origin[1] * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale * scale, color, max(1, round(thickness * scale)))
+
+    def roi_frame(self, frame):
+        """frame 在辨識區域內的部分（view，不複製）；需先 process() 過同尺寸的畫面。"""
+        x, y, w, h = self.roi
+        return frame[y:y + h, x:x + w]
+
+    def preview_rgb(self):
+        """最近一次 process() 的預覽影像（RGB，緩衝區會被下一次 process() 覆寫）。
+
+        最近一次 process() 沒有畫預覽時回傳 None。
+        """
+        if not self.preview_drawn:
+            return None
+        return cv2.cvtColor(self._preview, cv2.COLOR_BGR2RGB, dst=self._preview_rgb)
@@ -0,0 +1,131 @@
+"""以樓層與方向建立索引的請求儲存區。
+
+每種按鈕（INTERNAL/UP/DOWN）各有一個 dict（floor -> Request，保留加入順序）與一個
+樓層點陣圖（第 n 個 bit 代表 n 樓有請求）：
+- 新增、去重、清除某樓層：O(1)
+- 最近的上方／下方請求：點陣圖位移加 bit_length，與請求數量無關
+
+樓層號碼必須是非負整數。
+"""
+import itertools
+
+
+class RequestIndex:
+    """groups 依排列優先順序列出按鈕種類，例如 ((INTERNAL,), (UP, DOWN))：
+
+    requests() 與距離相同時的 nearest() 以群組順序、再以加入順序決定先後，
+    與原本 internal_requests + external_requests 的串接順序一致。
+    """
+
+    def __init__(self, groups):
+        self._rank = {button_type: rank for rank, group in enumerate(groups) for button_type in group}
+        self.all_types = tuple(self._rank)
+        self._requests = {button_type: {} for button_type in self.all_types}
+        self._masks = {button_type: 0 for button_type in self.all_types}
+        self._order = {}  # (floor, button_type) -> 加入序號
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, request):
+        """加入請求，同樓層同按鈕已存在時回傳 False。"""
+        requests = self._requests[request.button_type]
+        if request.floor in requests:
+            return False
+        requests[request.floor] = request
+        self._masks[request.button_type] |= 1 << request.floor
+        self._order[(request.floor, request.button_type)] = next(self._seq)
+        return True
+
+    def contains(self, floor, button_type):
+        return floor in self._requests[button_type]
+
+    def count(self, button_types=None):
+        button_types = button_types or self.all_types
+        return sum(len(self._requests[button_type]) for button_type in button_types)
+
+    def requests(self, button_types=None):
+        """依 button_types 的順序回傳請求，同種類內依加入順序。"""
+        button_types = button_types or self.all_types
+        result = []
+        for button_type in button_types:
+            result.extend(self._requests[button_type].values())
+        return result
+
+    def first(self, button_type):
+        """最早加入且仍未完成的請求，沒有時回傳 None。"""
+        return next(iter(self._requests[button_type].values()), None)
+
+    def mask(self, button_types=None):
+        button_types = button_types or self.all_types
+        mask = 0
+        for button_type in button_types:
+            mask |= self._masks[button_type]
+        return mask
+
+    def floors(self, button_types=None):
+        """有請求的樓層（由低到高，不重複）。"""
+        mask = self.mask(button_types)
+        floors = []
+        while mask:
+            low = mask & -mask
+            floors.append(low.bit_length() - 1)
+            mask ^= low
+        return floors
+
+    def clear_floor(self, floor, button_types=None):
+        """清除 floor 上指定種類的請求，回傳被清除的請求。"""
+        button_types = button_types or self.all_types
+        removed = []
+        bit = 1 << floor
+        for button_type in button_types:
+            request = self._requests[button_type].pop(floor, None)
+            if request is not None:
+                self._masks[button_type] &= ~bit
+                del self._order[(floor, button_type)]
+                removed.append(request)
+        return removed
+
+    def clear(self, button_types=None):
+        for button_type in button_types or self.all_types:
+            for floor in self._requests[button_type]:
+                del self._order[(floor, button_type)]
+            self._requests[button_type].clear()
+            self._masks[button_type] = 0
+
+    def nearest_above(self, floor, button_types=None):
+        """高於 floor 的最低請求樓層，沒有時回傳 None。"""
+        mask = self.mask(button_types) >> (floor + 1)
+        if not mask:
+            return None
+        return floor + (mask & -mask).bit_length()
+
+    def nearest_below(self, floor, button_types=None):
+        """低於 floor 的最高請求樓層，沒有時回傳 None。"""
+        mask = self.mask(button_types) & ((1 << max(floor, 0)) - 1)
+        if not mask:
+            return None
+        return mask.bit_length() - 1
+
+    def nearest(self, floor, button_types=None):
+        """距離 floor 最近的請求樓層（含 floor 本身）。
+
+        距離相同時與原本的 min(active_requests, ...) 一致，取排列在前面的請求。
+        """
+        if self.mask(button_types) >> floor & 1:
+            return floor
+        above = self.nearest_above(floor, button_types)
+        below = self.nearest_below(floor, button_types)
+        if above is None:
+            return below
+        if below is None:
+            return above
+        if above - floor != floor - below:
+            return above if above - floor < floor - below else below
+        return min(above, below, key=lambda f: self._position(f, button_types or self.all_types))
+
+    def _position(self, floor, button_types):
+        """請求在串接後清單中的排序鍵。"""
+        return min((self._rank[button_type], self._order[(floor, button_type)])
+                   for button_type in button_types if floor in self._requests[button_type])
@@ -0,0 +1,112 @@
+"""背景執行緒持續讀取 Arduino 序列埠，只把需要處理的事件交給主執行緒。
+
+車廂模組除了 BUTTON:／PLAY_SOUND: 之外，還會送出 DEBUG: 訊息、每個狀態指令的
+RECEIVED: 回音，以及每 2 秒一次的緊急按鈕狀態。主執行緒每 100ms 只讀一行時，
+真正的按鈕事件會排在越來越長的訊息後面。SerialReader 在背景不斷讀取，
+依 LINE_TYPES 分類每一行，可處理的事件放進執行緒安全的佇列，其餘只計數。
+"""
+import queue
+import threading
+
+import serial
+
+# 以前綴分類 Arduino 傳來的每一行：(前綴, 事件種類)；事件種類為 None 的行只計數不處理
+LINE_TYPES = (
+    ("BUTTON:", "BUTTON"),
+    ("PLAY_SOUND:", "PLAY_SOUND"),
+    ("ACK:", "ACK"),
+    ("NAK", None),
+    ("DEBUG:", None),
+    ("RECEIVED:", None),
+    ("Emergency Button State", None),
+    ("EMERGENCY MODE", None),
+    ("AUTO EMERGENCY MODE", None),
+    ("MANUAL EMERGENCY MODE", None),
+    ("NORMAL MODE", None),
+    ("ELEVATOR_SYSTEM_READY", None),
+    ("ARDUINO_READY", None),
+)
+
+
+def classify(line):
+    """回傳 (事件種類, 是否為已知訊息)。"""
+    for prefix, kind in LINE_TYPES:
+        if line.startswith(prefix):
+            return kind, True
+    return None, False
+
+
+class SerialReader:
+    """持續讀取序列埠的執行緒，事件以 (種類, 原始行) 放進 events 佇列。
+
+    lines_read：讀到的行數
+    lines_ignored：已知但不需處理的行數（DEBUG、RECEIVED 等）
+    lines_unknown：無法辨識的行數
+    events_dropped：佇列已滿而丟棄的事件數
+    """
+
+    def __init__(self, port, max_events=256):
+        self.port = port
+        self.events = queue.Queue(maxsize=max_events)
+        self.lines_read = 0
+        self.lines_ignored = 0
+        self.lines_unknown = 0
+        self.events_dropped = 0
+        self.error = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="serial-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while self._running:
+            try:
+                raw = self.port.readline()  # 依序列埠的 timeout 最多等待一次
+            except (serial.SerialException, OSError, TypeError) as e:
+                # 連線中斷或主執行緒已關閉序列埠
+                self.error = e
+                break
+            if not raw:
+                continue
+            self.dispatch(raw.decode("utf-8", errors="replace").strip())
+        self._running = False
+
+    def dispatch(self, line):
+        """分類一行訊息，可處理的事件放進佇列。"""
+        if not line:
+            return
+        self.lines_read += 1
+        kind, known = classify(line)
+        if kind is None:
+            if known:
+                self.lines_ignored += 1
+            else:
+                self.lines_unknown += 1
+            return
+        try:
+            self.events.put_nowait((kind, line))
+        except queue.Full:
+            self.events_dropped += 1
+
+    def drain(self):
+        """不阻塞地取出目前佇列中的所有事件。"""
+        while True:
+            try:
+                yield self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -0,0 +1,58 @@
+"""電梯井靜態背景：磚牆、樓層地板、門框與樓層標示一次畫成一張圖。
+
+Tk 畫布上每個項目在重繪時都要走訪一次，原本約 800 個磚塊矩形讓啟動與每次重繪都變慢；
+背景改為單一影像後，畫布上只剩車廂與門等會移動的項目。
+"""
+from PIL import Image, ImageDraw, ImageFont
+
+BACKGROUND = "#808080"
+BRICK_FILL = "#707070"
+BRICK_OUTLINE = "#606060"
+BRICK_WIDTH = 30
+BRICK_HEIGHT = 15
+
+
+def _label_font(size):
+    for name in ("arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def render_shaft(width, height, floor_positions, frame_half=5, label_size=12):
+    """畫出電梯井背景，回傳 PIL Image。
+
+    floor_positions：{樓層: 地板的 Y 座標}
+    """
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    # 磚頭風格背景，奇數列交錯半塊
+    for y in range(0, height, BRICK_HEIGHT):
+        offset = BRICK_WIDTH // 2 if (y // BRICK_HEIGHT) % 2 == 1 else 0
+        for x in range(offset, width, BRICK_WIDTH):
+            draw.rectangle((x, y, x + BRICK_WIDTH, y + BRICK_HEIGHT), fill=BRICK_FILL, outline=BRICK_OUTLINE)
+    draw.rectangle((0, 0, width - 1, height - 1), outline="#666666", width=2)
+
+    font = _label_font(label_size)
+    for floor, y in floor_positions.items():
+        # 樓層地板、門框與樓層標示（深色）
+        draw.line((0, y, width, y), fill="#222222", width=3)
+        draw.rectangle((50, y - frame_half, 250, y + frame_half), fill="#333333", outline="#222222")
+        draw.text((270, y - 15 * label_size / 12), f"{floor}F", font=font, fill="#111111", anchor="mm")
+    return image
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="輸出電梯井背景圖")
+    parser.add_argument("output", help="輸出的圖檔路徑（例如 shaft.png）")
+    parser.add_argument("--floors", type=int, default=3, help="樓層數")
+    args = parser.parse_args()
+
+    spacing = 600 / args.floors
+    positions = {floor: 600 - spacing * (floor - 0.5) for floor in range(1, args.floors + 1)}
+    render_shaft(300, 600, positions, min(5, spacing / 10), min(12, max(6, int(spacing * 0.6)))).save(args.output)
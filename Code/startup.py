@@ -0,0 +1,150 @@
+"""啟動加速：裝置與重量級模組在背景執行緒初始化，並量測冷啟動時間。
+
+攝影機（cv2）、偵測器（numpy）、序列埠（列舉埠、開啟後等待 Arduino 重啟 2 秒）、
+音效解碼與電梯井背景圖（PIL）都交給 BackgroundTask，視窗與控制核心先建立，
+請求立刻就能受理；各子系統就緒後才在主執行緒接上。
+
+    python startup.py                    # 量測 import main 的冷啟動時間
+    python startup.py --budget 150       # 超過 150 毫秒或提早載入重量級模組時結束代碼為 1
+    python startup.py --gui              # 另外量測到第一次畫面與各裝置就緒的時間（需要顯示器）
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 啟動時不應載入的模組：只有用到的子系統在背景初始化時才載入
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "serial", "pygame")
+
+
+class BackgroundTask:
+    """在背景執行緒執行 factory()，主執行緒以 poll() 不阻塞地接收結果。
+
+    factory 不可碰觸 Tk 元件；on_ready(result) 由 poll() 在呼叫端的執行緒執行。
+    factory 拋出例外時記錄 error 並不呼叫 on_ready，該子系統維持停用。
+    """
+
+    def __init__(self, name, factory, on_ready=None):
+        self.name = name
+        self.factory = factory
+        self.on_ready = on_ready
+        self.result = None
+        self.error = None
+        self.elapsed = None  # factory 的耗時（秒）
+        self._done = threading.Event()
+        self._delivered = False
+        self._thread = threading.Thread(target=self._run, name=f"init-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.result = self.factory()
+        except Exception as e:
+            self.error = e
+            logger.warning(f"{self.name} 初始化失敗: {e}")
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def poll(self):
+        """完成時交付結果（只交付一次）並回傳 True；尚未完成時回傳 False。"""
+        if not self._done.is_set():
+            return False
+        if not self._delivered:
+            self._delivered = True
+            if self.error is None and self.on_ready is not None:
+                self.on_ready(self.result)
+        return True
+
+
+def measure_import(module="main", runs=5):
+    """在全新的直譯器中 import module，回傳 (每次耗時（秒）列表, 載入的重量級模組)。"""
+    import subprocess
+    import sys
+
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    times, heavy = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        times.append(float(output[0]))
+        heavy.update(output[1].split(",") if len(output) > 1 else [])
+    return times, sorted(heavy)
+
+
+def measure_gui(timeout=15.0):
+    """建立 ElevatorControlSim，回傳各階段距離開始的秒數；沒有顯示器時回傳 None。
+
+    first_frame：第一次畫面更新完成；first_request：控制核心受理第一個請求；
+    其餘為各背景子系統就緒的時間。
+    """
+    import tkinter as tk
+
+    start = time.perf_counter()
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from elevator_core import ButtonType
+    from group_dispatch import Building
+    from main import ElevatorControlSim
+
+    sim = ElevatorControlSim(root, Building(), audio=False)
+    sim.controller.add_request(2, ButtonType.INTERNAL)
+    times = {"first_request": time.perf_counter() - start}
+    root.update()
+    times["first_frame"] = time.perf_counter() - start
+    while sim.startup_tasks and time.perf_counter() - start < timeout:
+        root.update()
+        time.sleep(0.01)
+    times.update(sim.startup_times)
+    sim.on_closing()
+    return times
+
+
+if __name__ == "__main__":
+    import argparse
+    import statistics
+    import sys
+
+    parser = argparse.ArgumentParser(description="量測主程式的冷啟動時間")
+    parser.add_argument("--runs", type=int, default=5, help="import 量測次數（取中位數）")
+    parser.add_argument("--budget", type=float, help="import main 的時間上限（毫秒），超過時結束代碼為 1")
+    parser.add_argument("--gui", action="store_true", help="另外量測到第一次畫面與各裝置就緒的時間")
+    args = parser.parse_args()
+
+    times, heavy = measure_import("main", args.runs)
+    median = statistics.median(times) * 1000
+    print(f"import main：中位數 {median:.1f} ms（{', '.join(f'{t * 1000:.1f}' for t in times)}）")
+    print(f"啟動時載入的重量級模組：{', '.join(heavy) or '無'}")
+    if args.gui:
+        gui = measure_gui()
+        if gui is None:
+            print("沒有顯示器，略過 GUI 量測")
+        else:
+            for name, seconds in sorted(gui.items(), key=lambda item: item[1]):
+                print(f"  {name:<14} {seconds * 1000:8.1f} ms")
+
+    failed = bool(heavy) or (args.budget is not None and median > args.budget)
+    if failed:
+        print("冷啟動退步：請確認重量級模組只在背景初始化時載入")
+    sys.exit(1 if failed else 0)
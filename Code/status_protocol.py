@@ -0,0 +1,89 @@
+"""Python 與車廂模組之間的精簡狀態協定（第 1 版）。
+
+每個狀態是一行 12 bytes 的訊框：
+
+    @1 S D FF TT * CC \\n
+
+- @1：訊框開頭與協定版本
+- S：狀態（N=NORMAL、E=EMERGENCY、F=FULL）
+- D：方向（U=UP、D=DOWN、I=IDLE）
+- FF、TT：目前樓層與目標樓層（兩位十六進位）
+- CC：@ 與 * 之間所有字元的 XOR（兩位十六進位）
+
+車廂模組收到檢查碼正確的訊框後回覆 ACK:CC，檢查碼錯誤時回覆 NAK。
+StatusLink 記住最後一次被確認的狀態，只在狀態改變時送出；未被確認的訊框
+在 RESEND_INTERVAL 後重送，狀態不變時每 KEEPALIVE_INTERVAL 送一次保持連線。
+"""
+import time
+
+from metrics import SERIAL_WRITE
+
+VERSION = "1"
+BAUD_RATE = 115200
+
+STATUS_CODES = {"NORMAL": "N", "EMERGENCY": "E", "FULL": "F"}
+DIRECTION_CODES = {"UP": "U", "DOWN": "D", "IDLE": "I"}
+
+
+def checksum(payload):
+    value = 0
+    for byte in payload.encode("ascii"):
+        value ^= byte
+    return value
+
+
+def encode_status(status, floor, direction, target):
+    """編碼一個狀態訊框，direction 為 Direction 的名稱。"""
+    payload = f"{VERSION}{STATUS_CODES[status]}{DIRECTION_CODES[direction]}{floor:02X}{target:02X}"
+    return f"@{payload}*{checksum(payload):02X}\n".encode("ascii")
+
+
+class StatusLink:
+    """追蹤送出與已確認的狀態，決定是否需要送出新訊框。
+
+    write 為寫入序列埠的函式（例如 serial.Serial.write）。
+    """
+
+    RESEND_INTERVAL = 0.5     # 訊框未被確認時重送的間隔（秒）
+    KEEPALIVE_INTERVAL = 5.0  # 狀態未改變時保持連線的間隔（秒）
+
+    def __init__(self, write, clock=time.monotonic):
+        self.write = write
+        self.clock = clock
+        self.acked_state = None
+        self.pending_state = None
+        self.pending_checksum = None
+        self.last_sent = None
+        self.frames_sent = 0
+        self.frames_acked = 0
+
+    def update(self, status, floor, direction, target):
+        """提供最新狀態，需要時送出訊框並回傳該訊框，否則回傳 None。"""
+        state = (status, floor, direction, target)
+        now = self.clock()
+        if state == self.acked_state and state != self.pending_state:
+            due = now - self.last_sent >= self.KEEPALIVE_INTERVAL
+        elif state == self.pending_state:
+            due = now - self.last_sent >= self.RESEND_INTERVAL
+        else:
+            due = True
+        if not due:
+            return None
+        frame = encode_status(*state)
+        start = time.perf_counter()
+        self.write(frame)
+        SERIAL_WRITE.observe(time.perf_counter() - start)
+        self.pending_state = state
+        self.pending_checksum = frame[-3:-1].decode("ascii")
+        self.last_sent = now
+        self.frames_sent += 1
+        return frame
+
+    def acknowledge(self, line):
+        """處理車廂模組回覆的 ACK:CC；檢查碼與最後送出的訊框相符時記為已確認。"""
+        if self.pending_state is None or line[len("ACK:"):] != self.pending_checksum:
+            return False
+        self.acked_state = self.pending_state
+        self.pending_state = None
+        self.frames_acked += 1
+        return True
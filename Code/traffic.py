@@ -0,0 +1,221 @@
+"""乘客交通產生器與派車效能指標（KPI）基準測試。
+
+產生可重現的乘客流（每位乘客：出現時間、出發樓層、目的樓層），以虛擬時鐘
+透過 GroupController 的 add_hall_call／add_car_call 送進派車邏輯：
+乘客出現時按外部按鈕並等待群組指派的車廂（其他車廂停靠時不上車），
+上車後按下目的樓層，車廂停靠目的樓層時乘客離開。每台車廂最多載 capacity 人，
+上不了車的乘客在車廂離開後重新按外部按鈕。
+
+交通型態：
+- up_peak：上班尖峰，大多數乘客從 1 樓往上
+- down_peak：下班尖峰，大多數乘客往 1 樓
+- inter_floor：樓層之間隨機移動
+- poisson：三種型態混合
+
+報告：平均／95 百分位等待時間、平均／95 百分位旅程時間（出現到抵達）、
+每趟乘坐的停靠次數（上車到下車之間車廂停靠的次數，含目的樓層）、
+平均送達率（每 5 分鐘，從模擬開始到最後一位乘客送達；系統跟得上時只等於到達率），
+以及運輸能力（任何連續 5 分鐘內最多送達的乘客數；只有在超載的情境，
+例如 10F-2car-up-sat，才代表派車邏輯的上行尖峰運輸能力）。
+python traffic.py 以固定種子執行 SUITE 中的所有情境，可用來比較不同版本的派車邏輯；
+--policy 切換 dispatch_policy 中的派車策略。
+"""
+import math
+import random
+import time
+from collections import defaultdict, namedtuple
+
+from dispatch_policy import POLICIES
+from elevator_core import ButtonType, VirtualClock
+from group_dispatch import Building, GroupController
+
+Passenger = namedtuple("Passenger", "time origin destination")
+
+PATTERNS = ("up_peak", "down_peak", "inter_floor", "poisson")
+LOBBY_SHARE = 0.85  # 尖峰時段經過 1 樓的乘客比例
+CAR_CAPACITY = 13   # 每台車廂最多載客數（約 1000 kg）
+CAPACITY_WINDOW = 300.0  # 運輸能力的統計區間（秒）
+
+
+def _trip(rng, pattern, floors):
+    lobby, upper = floors[0], floors[1:]
+    if pattern == "up_peak" and rng.random() < LOBBY_SHARE:
+        return lobby, rng.choice(upper)
+    if pattern == "down_peak" and rng.random() < LOBBY_SHARE:
+        return rng.choice(upper), lobby
+    origin, destination = rng.sample(floors, 2)
+    return origin, destination
+
+
+def generate(pattern, num_floors, rate, duration, seed=None):
+    """產生乘客清單（依出現時間排序），rate 為每秒平均乘客數（卜瓦松到達）。"""
+    if pattern not in PATTERNS:
+        raise ValueError(f"未知的交通型態：{pattern}（可用：{', '.join(PATTERNS)}）")
+    rng = random.Random(seed)
+    floors = list(range(1, num_floors + 1))
+    passengers = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        trip_pattern = rng.choice(PATTERNS[:3]) if pattern == "poisson" else pattern
+        passengers.append(Passenger(t, *_trip(rng, trip_pattern, floors)))
+        t += rng.expovariate(rate)
+    return passengers
+
+
+def _percentile(values, p):
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def _max_in_window(times, window):
+    """排序後的時間序列中，任何長度為 window 的區間內最多有幾筆。"""
+    best = start = 0
+    for end, t in enumerate(times):
+        while t - times[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def simulate(passengers, num_floors, num_cars=1, drain=1800.0, policy="nearest", capacity=CAR_CAPACITY):
+    """以虛擬時鐘執行一組乘客流，回傳 KPI dict。
+
+    所有乘客出現後再多跑 drain 秒讓車廂送完乘客；仍未送達的乘客計入 unserved。
+    policy 為 dispatch_policy.POLICIES 中的名稱，capacity 為每台車廂的載客上限。
+    """
+    clock = VirtualClock()
+    group = GroupController(clock, Building(num_floors, num_cars), verbose=False, policy=POLICIES[policy]())
+    waiting = defaultdict(list)   # (出發樓層, ButtonType.UP/DOWN) -> [(乘客編號, Passenger)]
+    riding = defaultdict(list)    # 車廂 -> [(乘客編號, Passenger, 上車時間, 上車時的停靠數)]
+    stops = [0] * num_cars
+    left_behind = defaultdict(set)  # 車廂 -> 滿載時留下乘客的 {(樓層, 方向)}，車廂離開後重新按鈕
+    waits, journeys, ride_stops = [], [], []
+    delivered_passengers = []
+
+    def on_event(index, event, *args):
+        if event == "position" and left_behind[index]:
+            # 車廂離開該樓層後才重新按鈕，否則會再指派給停在原地的滿載車廂
+            for floor, direction in [key for key in left_behind[index] if key[0] != args[0]]:
+                left_behind[index].discard((floor, direction))
+                group.add_hall_call(floor, direction)
+            return
+        if event != "arrived":
+            return
+        floor = args[0]
+        stops[index] += 1
+        now = clock.now()
+        staying = []
+        for pid, passenger, boarded, boarded_stops in riding[index]:
+            if passenger.destination == floor:
+                journeys.append(now - passenger.time)
+                delivered_passengers.append(passenger)
+                ride_stops.append(stops[index] - boarded_stops)
+            else:
+                staying.append((pid, passenger, boarded, boarded_stops))
+        riding[index] = staying
+        # 只搭指派到自己外部呼叫的車廂：其他車廂停在這層時不上車，指派的車廂也就不會空停
+        for direction in (ButtonType.UP, ButtonType.DOWN):
+            if group.assignments.get((floor, direction)) != index:
+                continue
+            queue = waiting.pop((floor, direction), [])
+            room = max(capacity - len(riding[index]), 0)
+            for pid, passenger in queue[:room]:
+                waits.append(now - passenger.time)
+                riding[index].append((pid, passenger, now, stops[index]))
+                group.add_car_call(index, passenger.destination)
+            if queue[room:]:
+                # 車廂已滿：剩下的乘客等它離開後重新按鈕
+                waiting[(floor, direction)] = queue[room:]
+                left_behind[index].add((floor, direction))
+
+    group.subscribe(on_event)
+
+    def appear(pid, passenger):
+        direction = ButtonType.UP if passenger.destination > passenger.origin else ButtonType.DOWN
+        waiting[(passenger.origin, direction)].append((pid, passenger))
+        group.add_hall_call(passenger.origin, direction)
+
+    for pid, passenger in enumerate(passengers):
+        clock.call_later(passenger.time, appear, pid, passenger)
+    end = (passengers[-1].time if passengers else 0.0) + drain
+    clock.run_until(end)
+
+    delivered = len(journeys)
+    delivery_times = sorted(p.time + j for p, j in zip(delivered_passengers, journeys))
+    span = delivery_times[-1] if delivery_times else 0.0
+    return {
+        "passengers": len(passengers),
+        "delivered": delivered,
+        "unserved": len(passengers) - delivered,
+        "wait_avg": sum(waits) / len(waits) if waits else math.nan,
+        "wait_p95": _percentile(waits, 0.95),
+        "journey_avg": sum(journeys) / delivered if delivered else math.nan,
+        "journey_p95": _percentile(journeys, 0.95),
+        "stops_per_trip": sum(ride_stops) / len(ride_stops) if ride_stops else math.nan,
+        "delivered_rate_5min": delivered / (span / CAPACITY_WINDOW) if span > 0 else 0.0,
+        "handling_capacity_5min": _max_in_window(delivery_times, CAPACITY_WINDOW),
+    }
+
+
+# 基準測試情境：(名稱, 交通型態, 樓層數, 車廂數, 每秒乘客數, 模擬秒數, 種子)
+SUITE = (
+    ("3F-1car-inter", "inter_floor", 3, 1, 1 / 60, 3600, 1),
+    ("10F-2car-up", "up_peak", 10, 2, 1 / 20, 3600, 2),
+    ("10F-2car-down", "down_peak", 10, 2, 1 / 20, 3600, 3),
+    ("10F-2car-inter", "inter_floor", 10, 2, 1 / 20, 3600, 4),
+    ("20F-4car-poisson", "poisson", 20, 4, 1 / 10, 3600, 5),
+    # 超載的上行尖峰：到達率高於兩台車廂能載的量，用來量測運輸能力
+    ("10F-2car-up-sat", "up_peak", 10, 2, 1 / 2, 1200, 6),
+)
+
+
+def run_suite(suite=SUITE, policy="nearest"):
+    """執行所有情境，回傳 [(名稱, KPI dict)]。"""
+    results = []
+    for name, pattern, num_floors, num_cars, rate, duration, seed in suite:
+        passengers = generate(pattern, num_floors, rate, duration, seed)
+        results.append((name, simulate(passengers, num_floors, num_cars, policy=policy)))
+    return results
+
+
+def format_report(results):
+    header = (f"{'情境':<18}{'乘客':>6}{'送達':>6}{'等待平均':>10}{'等待P95':>10}"
+              f"{'旅程平均':>10}{'旅程P95':>10}{'停靠/趟':>8}{'送達/5分':>8}{'最大/5分':>8}")
+    lines = [header]
+    for name, kpi in results:
+        lines.append(f"{name:<20}{kpi['passengers']:>6}{kpi['delivered']:>6}"
+                     f"{kpi['wait_avg']:>10.1f}{kpi['wait_p95']:>10.1f}"
+                     f"{kpi['journey_avg']:>10.1f}{kpi['journey_p95']:>10.1f}"
+                     f"{kpi['stops_per_trip']:>8.2f}{kpi['delivered_rate_5min']:>8.2f}"
+                     f"{kpi['handling_capacity_5min']:>8d}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="派車 KPI 基準測試")
+    parser.add_argument("--pattern", choices=PATTERNS, help="只執行單一情境的交通型態（預設執行整套基準測試）")
+    parser.add_argument("--floors", type=int, default=10, help="樓層數")
+    parser.add_argument("--cars", type=int, default=2, help="車廂數")
+    parser.add_argument("--rate", type=float, default=1 / 20, help="每秒平均乘客數")
+    parser.add_argument("--duration", type=float, default=3600, help="產生乘客的秒數")
+    parser.add_argument("--seed", type=int, default=1, help="亂數種子")
+    parser.add_argument("--policy", choices=POLICIES, default="nearest", help="派車策略")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出，方便比較版本")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.pattern:
+        passengers = generate(args.pattern, args.floors, args.rate, args.duration, args.seed)
+        results = [(args.pattern, simulate(passengers, args.floors, args.cars, policy=args.policy))]
+    else:
+        results = run_suite(policy=args.policy)
+    if args.json:
+        print(json.dumps(dict(results), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(results))
+        print(f"實際耗時 {time.time() - start:.2f} 秒")
@@ -0,0 +1,148 @@
+"""在獨立行程執行突破量偵測，畫面透過共享記憶體交換。
+
+背景相減、模糊與形態學運算都受 GIL 限制，和 Tk 迴圈、序列埠放在同一個行程時會互搶 CPU。
+VisionWorker 啟動一個偵測行程，共享記憶體分成數個槽位（slot），每個槽位放一張原始畫面
+與一張預覽影像；佇列只傳槽位編號、突破量與處理時間，畫面本身不經過 pickle。
+每台車廂的攝影機各用一個 VisionWorker，就會各自佔用一個核心。
+
+槽位流程：空閒 → submit() 寫入畫面並送出工作 → 偵測行程處理完寫入預覽 →
+poll() 交給呼叫端 → 呼叫端處理完畢後槽位回到空閒。
+"""
+import multiprocessing as mp
+import queue
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from metrics import DETECTION_FRAME
+from penetration_detector import PenetrationDetector, detection_roi
+
+RESET = "reset"
+
+DetectionResult = namedtuple("DetectionResult", "timestamp ratio frame roi_frame preview")
+
+
+def _slot_arrays(buf, slots, frame_shape, preview_shape):
+    frames = np.ndarray((slots,) + frame_shape, np.uint8, buffer=buf)
+    previews = np.ndarray((slots,) + preview_shape, np.uint8, buffer=buf, offset=frames.nbytes)
+    return frames, previews
+
+
+def _worker_main(shm_name, slots, frame_shape, preview_shape, jobs, results, detector_options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames, previews = _slot_arrays(shm.buf, slots, frame_shape, preview_shape)
+    detector = PenetrationDetector(**detector_options)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            if job == RESET:
+                detector.reset()
+                continue
+            slot, threshold, draw_preview = job
+            ratio = detector.process(frames[slot], threshold, draw_preview)
+            if draw_preview:
+                previews[slot] = detector.preview_rgb()
+            results.put((slot, ratio, detector.last_frame_time, draw_preview))
+    finally:
+        del frames, previews
+        shm.close()
+
+
+class VisionWorker:
+    """單一攝影機的偵測行程。
+
+    第一次 submit() 時依畫面尺寸配置共享記憶體並啟動行程；之後尺寸不同的畫面會被略過。
+    detector_options 會原樣傳給行程內的 PenetrationDetector。
+    """
+
+    def __init__(self, slots=2, **detector_options):
+        self.slots = slots
+        self.detector_options = detector_options
+        self.preview_size = detector_options.get("preview_size", (240, 180))
+        self.roi_margins = detector_options.get("roi_margins", (0.1, 0.03))
+        self.frames_submitted = 0
+        self.frames_dropped = 0  # 沒有空閒槽位或尺寸不符而略過的畫面
+
+        self._ctx = mp.get_context("spawn")  # Tk 所在的行程不適合 fork
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._free = list(range(slots))
+        self._timestamps = [None] * slots
+        self._shm = None
+        self._process = None
+        self._frames = None
+        self._previews = None
+        self._frame_shape = None
+        self._roi = None
+
+    def _start(self, frame_shape):
+        preview_w, preview_h = self.preview_size
+        preview_shape = (preview_h, preview_w, 3)
+        frame_bytes = int(np.prod(frame_shape))
+        preview_bytes = int(np.prod(preview_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * (frame_bytes + preview_bytes))
+        self._frames, self._previews = _slot_arrays(self._shm.buf, self.slots, frame_shape, preview_shape)
+        self._frame_shape = frame_shape
+        self._roi = detection_roi(frame_shape, self.roi_margins)
+        self._process = self._ctx.Process(
+            target=_worker_main, name="vision-worker", daemon=True,
+            args=(self._shm.name, self.slots, frame_shape, preview_shape,
+                  self._jobs, self._results, self.detector_options))
+        self._process.start()
+
+    def submit(self, frame, timestamp, threshold=None, draw_preview=True):
+        """把畫面複製到空閒槽位並交給偵測行程；沒有空閒槽位時回傳 False。
+
+        draw_preview 為 False 時偵測行程不畫預覽，結果的 preview 為 None。
+        """
+        if self._shm is None:
+            self._start(frame.shape)
+        if frame.shape != self._frame_shape or not self._free:
+            self.frames_dropped += 1
+            return False
+        slot = self._free.pop()
+        self._frames[slot] = frame
+        self._timestamps[slot] = timestamp
+        self._jobs.put((slot, threshold, draw_preview))
+        self.frames_submitted += 1
+        return True
+
+    def poll(self):
+        """不阻塞地取出已完成的結果（DetectionResult）。
+
+        frame、roi_frame、preview（沒有畫預覽時為 None）都是共享記憶體的 view，只在迴圈的該次迭代內有效，
+        迭代結束後槽位就會交還給 submit()。
+        """
+        while True:
+            try:
+                slot, ratio, frame_time, drawn = self._results.get_nowait()
+            except queue.Empty:
+                return
+            DETECTION_FRAME.observe(frame_time)
+            x, y, w, h = self._roi
+            frame = self._frames[slot]
+            try:
+                yield DetectionResult(self._timestamps[slot], ratio, frame,
+                                      frame[y:y + h, x:x + w], self._previews[slot] if drawn else None)
+            finally:
+                self._free.append(slot)
+
+    def reset(self):
+        """重新建立偵測行程內的背景模型。"""
+        self._jobs.put(RESET)
+
+    def close(self):
+        if self._process is not None:
+            self._jobs.put(None)
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._shm is not None:
+            self._frames = self._previews = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None